@@ -36,6 +36,19 @@ class ModelResponse:
     response: str
 
 
+@dataclass(frozen=True)
+class Response:
+    id: int
+    model_id: int
+    prompt: str
+    response: str
+
+
+@dataclass(frozen=True)
+class ResponsesRequest:
+    response_ids: list[int]
+
+
 @dataclass(frozen=True)
 class ModelHeadToHeadStats:
     other_model_id: int
@@ -47,12 +60,33 @@ class ModelHeadToHeadStats:
     count_ties: int
 
 
+@dataclass(frozen=True)
+class Compression:
+    enabled: bool
+    dictionary_size: Optional[int]  # bytes of the trained dictionary, if one is used
+
+
+@dataclass(frozen=True)
+class UpdateCompressionRequest:
+    enabled: bool
+    train_dictionary: bool = False  # train a dictionary on existing responses, which helps most on short texts
+
+
 @dataclass(frozen=True)
 class HeadToHeadsRequest:
     model_a_id: int
     model_b_id: Optional[int] = None  # when empty, get all pairings
 
 
+@dataclass(frozen=True)
+class HeadToHeadsPageRequest:
+    model_a_id: int
+    model_b_id: Optional[int] = None  # when empty, get all pairings
+    cursor: Optional[str] = None  # next_cursor of the previous page, when empty start from the first page
+    limit: int = 100
+    ids_only: bool = False  # omit prompt and response text, which can be fetched separately by response ID
+
+
 WinnerType = Union[Literal["A", "B", "-"], str]  # should be one of the literal values, but could be anything
 
 
@@ -73,6 +107,19 @@ class HeadToHead:
     history: list[HeadToHeadHistoryItem] = dataclasses.field(default_factory=list)
 
 
+@dataclass(frozen=True)
+class HeadToHeadIds:
+    response_a_id: int
+    response_b_id: int
+    history: list[HeadToHeadHistoryItem] = dataclasses.field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class HeadToHeadsPage:
+    head_to_heads: list[Union[HeadToHead, HeadToHeadIds]]
+    next_cursor: Optional[str]  # None on the last page
+
+
 @dataclass(frozen=True)
 class HeadToHeadVoteRequest:  # this is always coming from humans
     response_a_id: int
@@ -81,10 +128,17 @@ class HeadToHeadVoteRequest:  # this is always coming from humans
     human_judge_name: str  # often 'AutoArena User' but may be a specific username if one is available
 
 
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+
+
 class TaskType(str, Enum):
     AUTO_JUDGE = "auto-judge"
     RECOMPUTE_LEADERBOARD = "recompute-leaderboard"
     FINE_TUNE = "fine-tune"
+    MAINTENANCE = "maintenance"
 
 
 class TaskStatus(str, Enum):
@@ -109,6 +163,15 @@ class HasActiveTasks:
     has_active: bool
 
 
+@dataclass(frozen=True)
+class LeaderboardQueue:
+    n_pending_votes: int  # applied incrementally, awaiting refreshed confidence intervals
+    n_pending_changes: int  # changed or deleted votes awaiting a full recompute
+    is_running: bool
+    seconds_until_run: Optional[float]
+    last_recomputed: datetime
+
+
 @dataclass(frozen=True)
 class TriggerAutoJudgeRequest:
     judge_ids: list[int]
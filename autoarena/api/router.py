@@ -1,22 +1,25 @@
 from collections import OrderedDict
-from io import BytesIO
 from typing import Optional
 
 import pandas as pd
-from fastapi import APIRouter, UploadFile, BackgroundTasks
+from fastapi import APIRouter, UploadFile, BackgroundTasks, Query
 from starlette.requests import Request
 from starlette.responses import StreamingResponse
 
 from autoarena.api import api
-from autoarena.api.utils import SSEStreamingResponse, download_csv_response, schedule_background_task
+from autoarena.api.utils import SSEStreamingResponse, download_response, read_upload, schedule_background_task
 from autoarena.error import NotFoundError, BadRequestError
+from autoarena.service.compression import CompressionService
 from autoarena.service.elo import EloService
+from autoarena.service.elo_history import EloHistoryService
 from autoarena.service.fine_tuning import FineTuningService
 from autoarena.service.head_to_head import HeadToHeadService
 from autoarena.service.project import ProjectService
 from autoarena.service.judge import JudgeService
 from autoarena.service.task import TaskService
 from autoarena.service.model import ModelService
+from autoarena.task.leaderboard_scheduler import LEADERBOARD_SCHEDULER
+from autoarena.task.maintenance_scheduler import MAINTENANCE_SCHEDULER
 
 
 def router(r: Optional[APIRouter] = None) -> APIRouter:
@@ -34,6 +37,16 @@ def router(r: Optional[APIRouter] = None) -> APIRouter:
     def delete_project(project_slug: str) -> None:
         return ProjectService.delete(project_slug)
 
+    @r.get("/project/{project_slug}/compression")
+    def get_compression(project_slug: str) -> api.Compression:
+        return CompressionService.get(project_slug)
+
+    @r.put("/project/{project_slug}/compression")
+    def update_compression(project_slug: str, request: api.UpdateCompressionRequest) -> api.Compression:
+        CompressionService.update(project_slug, request)
+        MAINTENANCE_SCHEDULER.after_write(project_slug)
+        return CompressionService.get(project_slug)
+
     @r.get("/project/{project_slug}/models")
     def get_models(project_slug: str) -> list[api.Model]:
         return ModelService.get_all(project_slug)
@@ -56,9 +69,7 @@ def router(r: Optional[APIRouter] = None) -> APIRouter:
             if not key.endswith(model_name_slug):
                 continue
             file: UploadFile = form[key[: -len(model_name_slug)]]
-            if file.content_type != "text/csv":
-                raise ValueError(f"unsupported file type: {file.content_type}")
-            df_response_by_model_name[value] = pd.read_csv(BytesIO(await file.read()))
+            df_response_by_model_name[value] = await read_upload(file)
         if len(df_response_by_model_name) == 0:
             raise BadRequestError("No valid model responses in body")
         # TODO: ideally this would all take place within a single transaction
@@ -66,6 +77,7 @@ def router(r: Optional[APIRouter] = None) -> APIRouter:
             ModelService.upload_responses(project_slug, model_name, df_response)
             for model_name, df_response in df_response_by_model_name.items()
         ]
+        MAINTENANCE_SCHEDULER.after_write(project_slug)
         schedule_background_task(background_tasks, TaskService.auto_judge, project_slug, models=new_models)
         return new_models
 
@@ -73,6 +85,10 @@ def router(r: Optional[APIRouter] = None) -> APIRouter:
     def get_model_responses(project_slug: str, model_id: int) -> list[api.ModelResponse]:
         return ModelService.get_responses(project_slug, model_id)
 
+    @r.put("/project/{project_slug}/responses")
+    def get_responses_by_id(project_slug: str, request: api.ResponsesRequest) -> list[api.Response]:
+        return ModelService.get_responses_by_id(project_slug, request.response_ids)
+
     # TODO: potentially remove this -- it's not intuitive to have this trigger exist at the per-model level
     @r.post("/project/{project_slug}/model/{model_id}/judge")
     def trigger_model_auto_judge(project_slug: str, model_id: int, background_tasks: BackgroundTasks) -> None:
@@ -80,48 +96,72 @@ def router(r: Optional[APIRouter] = None) -> APIRouter:
         schedule_background_task(background_tasks, TaskService.auto_judge, project_slug, models=[model])
 
     @r.delete("/project/{project_slug}/model/{model_id}")
-    def delete_model(project_slug: str, model_id: int, background_tasks: BackgroundTasks) -> None:
+    def delete_model(project_slug: str, model_id: int) -> None:
         try:
             ModelService.delete(project_slug, model_id)
-            schedule_background_task(background_tasks, TaskService.recompute_leaderboard, project_slug)
+            LEADERBOARD_SCHEDULER.trigger(project_slug)
+            MAINTENANCE_SCHEDULER.after_write(project_slug)
         except NotFoundError:
             pass
 
     # async for StreamingResponses to improve speed; see https://github.com/fastapi/fastapi/issues/2302
     @r.get("/project/{project_slug}/model/{model_id}/download/responses")
-    async def download_model_responses_csv(project_slug: str, model_id: int) -> StreamingResponse:
+    async def download_model_responses_csv(
+        project_slug: str,
+        model_id: int,
+        export_format: api.ExportFormat = Query(api.ExportFormat.CSV, alias="format"),
+        gzip: bool = False,
+    ) -> StreamingResponse:
         columns = ["prompt", "response"]
-        df_response = ModelService.get_df_response(project_slug, model_id)
-        return download_csv_response(df_response[columns], df_response.iloc[0].model)
+        model = ModelService.get_by_id(project_slug, model_id)
+        chunks = ModelService.iter_df_response(project_slug, model_id)
+        return download_response(chunks, columns, model.name, export_format=export_format, gzip=gzip)
 
     @r.get("/project/{project_slug}/model/{model_id}/download/head-to-heads")
-    async def download_model_head_to_heads_csv(project_slug: str, model_id: int) -> StreamingResponse:
+    async def download_model_head_to_heads_csv(
+        project_slug: str,
+        model_id: int,
+        export_format: api.ExportFormat = Query(api.ExportFormat.CSV, alias="format"),
+        gzip: bool = False,
+    ) -> StreamingResponse:
         columns = ["prompt", "model_a", "model_b", "response_a", "response_b", "judge", "winner"]
-        df_h2h = ModelService.get_df_head_to_head(project_slug, model_id)
         model = ModelService.get_by_id(project_slug, model_id)
-        return download_csv_response(df_h2h[columns], f"{model.name}-head-to-head")
+        chunks = ModelService.iter_df_head_to_head(project_slug, model_id)
+        stem = f"{model.name}-head-to-head"
+        return download_response(chunks, columns, stem, export_format=export_format, gzip=gzip)
 
     @r.get("/project/{project_slug}/model/{model_id}/head-to-head/stats")
     def get_head_to_head_stats(project_slug: str, model_id: int) -> list[api.ModelHeadToHeadStats]:
         return ModelService.get_head_to_head_stats(project_slug, model_id)
 
+    @r.get("/project/{project_slug}/model/{model_id}/elo-history")
+    def get_elo_history(project_slug: str, model_id: int, judge_id: Optional[int] = None) -> list[api.EloHistoryItem]:
+        return EloHistoryService.get_history(project_slug, model_id, judge_id=judge_id)
+
     @r.put("/project/{project_slug}/head-to-heads")
     def get_head_to_heads(project_slug: str, request: api.HeadToHeadsRequest) -> list[api.HeadToHead]:
         return HeadToHeadService.get(project_slug, request)
 
+    @r.put("/project/{project_slug}/head-to-heads/page")
+    def get_head_to_heads_page(project_slug: str, request: api.HeadToHeadsPageRequest) -> api.HeadToHeadsPage:
+        return HeadToHeadService.get_page(project_slug, request)
+
+    @r.post("/project/{project_slug}/head-to-heads")
+    async def upload_head_to_heads(project_slug: str, file: UploadFile) -> None:
+        df_h2h = await read_upload(file)
+        HeadToHeadService.upload_head_to_heads(project_slug, df_h2h)
+        LEADERBOARD_SCHEDULER.trigger(project_slug)
+        MAINTENANCE_SCHEDULER.after_write(project_slug)
+
     @r.get("/project/{project_slug}/head-to-head/count")
     def get_head_to_head_count(project_slug: str) -> int:
         return HeadToHeadService.get_count(project_slug)
 
     @r.post("/project/{project_slug}/head-to-head/vote")
-    def submit_head_to_head_vote(
-        project_slug: str,
-        request: api.HeadToHeadVoteRequest,
-        background_tasks: BackgroundTasks,
-    ) -> None:
+    def submit_head_to_head_vote(project_slug: str, request: api.HeadToHeadVoteRequest) -> None:
         HeadToHeadService.submit_vote(project_slug, request)
-        # recompute confidence intervals in the background if we aren't doing so already
-        schedule_background_task(background_tasks, TaskService.recompute_leaderboard, project_slug)
+        # votes are applied to scores incrementally, confidence intervals are refreshed in the background periodically
+        LEADERBOARD_SCHEDULER.trigger(project_slug)
 
     @r.get("/project/{project_slug}/tasks")
     def get_tasks(project_slug: str) -> list[api.Task]:
@@ -138,6 +178,10 @@ def router(r: Optional[APIRouter] = None) -> APIRouter:
     ) -> StreamingResponse:  # Iterator[api.HasActiveTasks]
         return SSEStreamingResponse(TaskService.has_active_stream(project_slug, timeout=timeout))
 
+    @r.get("/project/{project_slug}/tasks/leaderboard-queue")
+    def get_leaderboard_queue(project_slug: str) -> api.LeaderboardQueue:
+        return LEADERBOARD_SCHEDULER.get_queue(project_slug)
+
     @r.delete("/project/{project_slug}/tasks/completed")
     def delete_completed_tasks(project_slug: str) -> None:
         TaskService.delete_completed(project_slug)
@@ -158,6 +202,11 @@ def router(r: Optional[APIRouter] = None) -> APIRouter:
             skip_existing=request.skip_existing,
         )
 
+    @r.post("/project/{project_slug}/task/maintenance")
+    def trigger_maintenance(project_slug: str, background_tasks: BackgroundTasks) -> None:
+        # only run on request, as the full vacuum converting older project files blocks writers until it is done
+        schedule_background_task(background_tasks, MAINTENANCE_SCHEDULER.run, project_slug, full_vacuum=True)
+
     @r.get("/project/{project_slug}/judges")
     def get_judges(project_slug: str) -> list[api.Judge]:
         return JudgeService.get_all(project_slug)
@@ -180,20 +229,28 @@ def router(r: Optional[APIRouter] = None) -> APIRouter:
         return JudgeService.check_can_access(judge_type)
 
     @r.delete("/project/{project_slug}/judge/{judge_id}")
-    def delete_judge(project_slug: str, judge_id: int, background_tasks: BackgroundTasks) -> None:
+    def delete_judge(project_slug: str, judge_id: int) -> None:
         try:
             JudgeService.delete(project_slug, judge_id)
-            schedule_background_task(background_tasks, TaskService.recompute_leaderboard, project_slug)
+            LEADERBOARD_SCHEDULER.trigger(project_slug)
+            MAINTENANCE_SCHEDULER.after_write(project_slug)
         except NotFoundError:
             pass
 
     @r.get("/project/{project_slug}/judge/{judge_id}/download/votes")
-    async def download_judge_votes_csv(project_slug: str, judge_id: int) -> StreamingResponse:
+    async def download_judge_votes_csv(
+        project_slug: str,
+        judge_id: int,
+        export_format: api.ExportFormat = Query(api.ExportFormat.CSV, alias="format"),
+        gzip: bool = False,
+    ) -> StreamingResponse:
         columns = ["prompt", "model_a", "model_b", "response_a", "response_b", "winner"]
-        df_response = JudgeService.get_df_vote(project_slug, judge_id)
-        # TODO: handle case where no votes exist, not a big problem for now as UI buttons are disabled for 0-vote judges
-        judge_name = df_response.iloc[0].judge
-        return download_csv_response(df_response[columns], f"{judge_name}-judge-votes")
+        judge_names = {j.id: j.name for j in JudgeService.get_all(project_slug)}
+        if judge_id not in judge_names:
+            raise NotFoundError(f"Judge with ID '{judge_id}' not found")
+        chunks = JudgeService.iter_df_vote(project_slug, judge_id)
+        stem = f"{judge_names[judge_id]}-judge-votes"
+        return download_response(chunks, columns, stem, export_format=export_format, gzip=gzip)
 
     @r.put("/project/{project_slug}/elo/reseed-scores")
     def reseed_elo_scores(project_slug: str) -> None:
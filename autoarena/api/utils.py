@@ -1,29 +1,145 @@
 import contextvars
+import io
+import itertools
 import sys
-from io import StringIO
-from typing import TypeVar, AsyncIterator, Callable
+import zlib
+from typing import TypeVar, AsyncIterator, Callable, Iterator, Optional
 
 if sys.version_info[:2] >= (3, 10):
     from typing import ParamSpec
 else:
     from typing_extensions import ParamSpec
 
+if sys.version_info[:2] >= (3, 12):
+    from collections.abc import Buffer
+else:
+    from typing_extensions import Buffer
+
 import pandas as pd
-from fastapi import BackgroundTasks
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import BackgroundTasks, UploadFile
 from pydantic import RootModel
 from starlette.responses import StreamingResponse
 
+from autoarena.api import api
+from autoarena.error import BadRequestError
+
+
+EXPORT_MEDIA_TYPES = {
+    api.ExportFormat.CSV: "text/csv",
+    api.ExportFormat.NDJSON: "application/x-ndjson",
+    api.ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+PARQUET_MEDIA_TYPES = {"application/vnd.apache.parquet", "application/x-parquet"}
+
 
-def download_csv_response(df: pd.DataFrame, stem: str) -> StreamingResponse:
-    stream = StringIO()
-    df.to_csv(stream, index=False)
+async def read_upload(file: UploadFile) -> pd.DataFrame:
+    """Read an uploaded CSV or Parquet file, identified by its content type or else its extension"""
+    content = io.BytesIO(await file.read())
+    filename = file.filename or ""
+    if file.content_type in PARQUET_MEDIA_TYPES or filename.endswith(".parquet"):
+        return pd.read_parquet(content)
+    if file.content_type == "text/csv" or filename.endswith(".csv"):
+        return pd.read_csv(content)
+    raise BadRequestError(f"Unsupported file type: {file.content_type} (expected CSV or Parquet)")
+
+
+def download_response(
+    chunks: Iterator[pd.DataFrame],
+    columns: list[str],
+    stem: str,
+    export_format: api.ExportFormat = api.ExportFormat.CSV,
+    gzip: bool = False,
+) -> StreamingResponse:
+    """
+    Stream chunks of rows to the client as they are encoded (and optionally gzipped), such that memory use stays
+    constant regardless of the size of the export. The first chunk is read before returning, such that lookup errors
+    are raised from the endpoint and the database is opened using the endpoint's context.
+    """
+    first_chunk = next(chunks)
+    stream = _encode_chunks(itertools.chain([first_chunk], chunks), columns, export_format)
+    filename = f"{stem}.{export_format.value}"
+    media_type = EXPORT_MEDIA_TYPES[export_format]
+    if gzip:
+        stream = _gzip_stream(stream)
+        filename, media_type = f"{filename}.gz", "application/gzip"
     return StreamingResponse(
-        iter([stream.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f'attachment; filename="{stem}.csv"'},
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
+def _encode_chunks(
+    chunks: Iterator[pd.DataFrame],
+    columns: list[str],
+    export_format: api.ExportFormat,
+) -> Iterator[bytes]:
+    if export_format is api.ExportFormat.PARQUET:
+        yield from _encode_parquet(chunks, columns)
+        return
+    for i, df in enumerate(chunks):
+        if export_format is api.ExportFormat.NDJSON:
+            if len(df) > 0:
+                yield df[columns].to_json(orient="records", lines=True, force_ascii=False).encode()
+        else:
+            yield df[columns].to_csv(index=False, header=i == 0).encode()
+
+
+class _DrainedSink(io.RawIOBase):
+    """Writable file handing off what was written as it is drained, while reporting the position of the whole file"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._buffer: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Buffer) -> int:
+        chunk = bytes(data)
+        self._buffer.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._buffer = b"".join(self._buffer), []
+        return data
+
+
+def _encode_parquet(chunks: Iterator[pd.DataFrame], columns: list[str]) -> Iterator[bytes]:
+    # write each chunk as its own row group and send it on, as only the footer refers back to earlier row groups
+    sink = _DrainedSink()
+    writer: Optional[pq.ParquetWriter] = None
+    for df in chunks:
+        if writer is not None and len(df) == 0:
+            continue
+        # later chunks are conformed to the schema of the first
+        schema = writer.schema if writer is not None else None
+        table = pa.Table.from_pandas(df[columns], schema=schema, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+    yield sink.drain()
+
+
+def _gzip_stream(stream: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for data in stream:
+        compressed = compressor.compress(data)
+        if len(compressed) > 0:
+            yield compressed
+    yield compressor.flush()
+
+
 TDataclass = TypeVar("TDataclass")  # should be a Pydantic dataclass
 
 
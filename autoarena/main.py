@@ -1,9 +1,12 @@
 import argparse
+import os
 from pathlib import Path
 
 import uvicorn
 
 from autoarena.seed import seed_head_to_heads
+from autoarena.service.elo import RATING_METHOD_ENV, RatingMethod
+from autoarena.store.database import DEFAULT_STORAGE_PROFILE, STORAGE_PROFILE_ENV, STORAGE_PROFILES
 
 
 def parse_args(args: list[str]) -> argparse.Namespace:
@@ -13,6 +16,16 @@ def parse_args(args: list[str]) -> argparse.Namespace:
 
     serve_parser = sp.add_parser("serve", help="[Default] Serve the AutoArena app")
     serve_parser.add_argument("-d", "--dev", action="store_true", help="Run in development mode")
+    serve_parser.add_argument(
+        "--storage-profile",
+        choices=list(STORAGE_PROFILES),
+        help=f"SQLite settings for project databases (default: ${STORAGE_PROFILE_ENV} or '{DEFAULT_STORAGE_PROFILE}')",
+    )
+    serve_parser.add_argument(
+        "--rating-method",
+        choices=[method.value for method in RatingMethod],
+        help=f"How leaderboard scores are computed (default: ${RATING_METHOD_ENV} or '{RatingMethod.ELO.value}')",
+    )
 
     seed_parser = sp.add_parser(
         "seed",
@@ -32,7 +45,13 @@ The following columns are required:
     )
     seed_parser.add_argument("head_to_heads", type=Path, help="Path to head-to-heads CSV or Parquet file")
 
-    return ap.parse_args(args)
+    parsed_args = ap.parse_args(args)
+    # flags are checked against their choices above, whereas the environment is otherwise only read on use
+    rating_methods = [method.value for method in RatingMethod]
+    rating_method = os.environ.get(RATING_METHOD_ENV)
+    if getattr(parsed_args, "rating_method", None) is None and rating_method not in {None, *rating_methods}:
+        ap.error(f"invalid ${RATING_METHOD_ENV}: '{rating_method}' (choose from {', '.join(rating_methods)})")
+    return parsed_args
 
 
 def main(args: list[str]) -> None:
@@ -40,6 +59,10 @@ def main(args: list[str]) -> None:
     if parsed_args.command == "seed":
         seed_head_to_heads(parsed_args.head_to_heads)
     if parsed_args.command == "serve":
+        if getattr(parsed_args, "storage_profile", None) is not None:
+            os.environ[STORAGE_PROFILE_ENV] = parsed_args.storage_profile  # inherited by worker processes
+        if getattr(parsed_args, "rating_method", None) is not None:
+            os.environ[RATING_METHOD_ENV] = parsed_args.rating_method
         uvicorn.run(
             "autoarena.server:server",
             host="localhost",
@@ -9,6 +9,7 @@ from autoarena.api.router import router
 from autoarena.log import initialize_logger
 from autoarena.service.project import ProjectService
 from autoarena.store.database import DataDirectoryProvider
+from autoarena.task.maintenance_scheduler import MAINTENANCE_SCHEDULER
 from autoarena.ui_router import ui_router
 
 API_V1_STR = "/api/v1"
@@ -18,8 +19,10 @@ API_V1_STR = "/api/v1"
 async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     logger.info(f"Using data directory: '{DataDirectoryProvider.get()}'")
     ProjectService.migrate_all()
+    MAINTENANCE_SCHEDULER.start()
     logger.success("AutoArena ready")
     yield
+    MAINTENANCE_SCHEDULER.stop()
 
 
 def server() -> FastAPI:
@@ -0,0 +1,124 @@
+import sqlite3
+from typing import Callable, Optional, Union
+
+import pandas as pd
+from loguru import logger
+
+from autoarena.api import api
+from autoarena.service.project import ProjectService
+from autoarena.store.compression import compress_text_if_smaller, decompress_texts, is_compressed, train_dictionary
+from autoarena.store.database import execute_many
+
+Compressor = Callable[[str], Union[bytes, str]]
+
+
+class CompressionService:
+    @staticmethod
+    def get(project_slug: str) -> api.Compression:
+        with ProjectService.connect(project_slug) as conn:
+            ((enabled, dictionary_size),) = conn.execute(
+                """
+                SELECT cs.enabled, LENGTH(cd.dictionary)
+                FROM compression_state cs
+                LEFT JOIN compression_dictionary cd ON cd.id = cs.dictionary_id
+                """
+            ).fetchall()
+        return api.Compression(enabled=bool(enabled), dictionary_size=dictionary_size)
+
+    @staticmethod
+    def update(
+        project_slug: str,
+        request: api.UpdateCompressionRequest,
+        n_training_samples: int = 1_000,
+        chunk_size: int = 10_000,
+    ) -> None:
+        """
+        Enable or disable compression, rewriting all stored prompt and response text accordingly, `chunk_size` rows at
+        a time. Responses are committed chunk by chunk such that writers are only held up briefly, whereas prompts are
+        rewritten in a single transaction, as uploads find existing prompts by their stored value.
+        """
+        with ProjectService.connect(project_slug, commit=True) as conn:
+            dictionary_id: Optional[int] = None
+            if request.enabled and request.train_dictionary:
+                df_sample = pd.read_sql_query(
+                    "SELECT response FROM response WHERE id IN (SELECT id FROM response ORDER BY RANDOM() LIMIT :n)",
+                    conn,
+                    params=dict(n=n_training_samples),
+                )
+                samples = decompress_texts(df_sample.response, CompressionService._get_dictionaries(conn))
+                ((dictionary_id,),) = conn.execute(
+                    "INSERT INTO compression_dictionary (dictionary) VALUES (:dictionary) RETURNING id",
+                    dict(dictionary=train_dictionary(samples)),
+                ).fetchall()
+            conn.execute(
+                "UPDATE compression_state SET enabled = :enabled, dictionary_id = :dictionary_id",
+                dict(enabled=request.enabled, dictionary_id=dictionary_id),
+            )
+            last_id: Optional[int] = 0
+            while last_id is not None:
+                last_id = CompressionService._rewrite_chunk(conn, "prompt", "text", last_id, chunk_size)
+        last_id = 0
+        while last_id is not None:
+            with ProjectService.connect(project_slug, commit=True) as conn:
+                last_id = CompressionService._rewrite_chunk(conn, "response", "response", last_id, chunk_size)
+        with ProjectService.connect(project_slug, commit=True) as conn:
+            # nothing refers to previous dictionaries once everything is rewritten
+            conn.execute(
+                "DELETE FROM compression_dictionary WHERE id IS NOT (SELECT dictionary_id FROM compression_state)"
+            )
+        state = "enabled" if request.enabled else "disabled"
+        logger.info(f"Rewrote text for project '{project_slug}' with compression {state}")
+
+    @staticmethod
+    def get_compressor(conn: sqlite3.Connection) -> Optional[Compressor]:
+        """Function compressing text as it should be written to this project, or None when stored uncompressed"""
+        ((enabled, dictionary_id, dictionary),) = conn.execute(
+            """
+            SELECT cs.enabled, cs.dictionary_id, cd.dictionary
+            FROM compression_state cs
+            LEFT JOIN compression_dictionary cd ON cd.id = cs.dictionary_id
+            """
+        ).fetchall()
+        if not enabled:
+            return None
+        return lambda text: compress_text_if_smaller(text, dictionary_id, dictionary or b"")
+
+    @staticmethod
+    def decompress(conn: sqlite3.Connection, df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+        """Decompress any compressed values in `columns` of a frame read from this project"""
+        if not any(is_compressed(df[column]).any() for column in columns):
+            return df  # skip loading dictionaries for projects stored uncompressed
+        dictionaries = CompressionService._get_dictionaries(conn)
+        return df.assign(**{column: decompress_texts(df[column], dictionaries) for column in columns})
+
+    @staticmethod
+    def _rewrite_chunk(
+        conn: sqlite3.Connection,
+        table: str,
+        column: str,
+        after_id: int,
+        chunk_size: int,
+    ) -> Optional[int]:
+        """Rewrite the next `chunk_size` values after `after_id` as currently configured, returning the last ID seen"""
+        df = pd.read_sql_query(
+            f"SELECT id, {column} FROM {table} WHERE id > :after_id ORDER BY id LIMIT :n",
+            conn,
+            params=dict(after_id=after_id, n=chunk_size),
+        )
+        if len(df) == 0:
+            return None
+        compress = CompressionService.get_compressor(conn)
+        texts = decompress_texts(df[column], CompressionService._get_dictionaries(conn))
+        rewritten = texts.map(compress) if compress is not None else texts
+        changed = [stored != value for stored, value in zip(df[column], rewritten)]
+        execute_many(
+            conn,
+            f"UPDATE {table} SET {column} = ? WHERE id = ?",
+            df.assign(**{column: rewritten})[changed],
+            [column, "id"],
+        )
+        return int(df["id"].iloc[-1])
+
+    @staticmethod
+    def _get_dictionaries(conn: sqlite3.Connection) -> dict[int, bytes]:
+        return dict(conn.execute("SELECT id, dictionary FROM compression_dictionary").fetchall())
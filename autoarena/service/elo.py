@@ -1,68 +1,241 @@
+import dataclasses
+import multiprocessing
+import os
+import sqlite3
 import time
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from enum import Enum
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 from pydantic.dataclasses import dataclass
 from loguru import logger
 
 from autoarena.api import api
 from autoarena.service.project import ProjectService
-from autoarena.store.database import temporary_table
+from autoarena.store.database import execute_many
+
+
+class RatingMethod(str, Enum):
+    ELO = "elo"  # sequential Elo replay, scored as the median of bootstrapped rollouts
+    BRADLEY_TERRY = "bradley-terry"  # maximum-likelihood fit on aggregated pair counts, independent of vote order
+    BRADLEY_TERRY_BOOTSTRAP = "bradley-terry-bootstrap"  # as above, with intervals from resampling the pair counts
+
+
+RATING_METHOD_ENV = "AUTOARENA_RATING_METHOD"
+
+
+def get_rating_method() -> RatingMethod:
+    name = os.environ.get(RATING_METHOD_ENV, RatingMethod.ELO.value)
+    try:
+        return RatingMethod(name)
+    except ValueError:
+        raise ValueError(f"Unrecognized rating method '{name}', expected one of {set(m.value for m in RatingMethod)}")
 
 
 @dataclass(frozen=True)
 class EloConfig:
+    method: Optional[RatingMethod] = None  # when unset, read from the environment on use, see get_rating_method
     default_score: float = 1_000
     k: int = 4
     scale: int = 400
     base: int = 10
     n_bootstrap_rounds: int = 200
+    # number of processes to spread bootstrap rounds across. Every worker still replays each vote and is started fresh
+    # per recompute, on top of the server's own worker processes, such that this rarely pays off and is opt-in
+    n_workers: int = 1
+    min_head_to_heads_per_worker: int = 25_000  # below this, starting a worker costs more than it saves
+    seed: Optional[int] = None  # set to make bootstrap results reproducible, independent of n_workers
+    # incrementally applied votes are folded into a full recompute once there are this many, or this much time passed
+    n_votes_per_refresh: int = 20
+    refresh_interval_seconds: float = 60
+    n_votes_per_history_checkpoint: int = 1_000  # Elo history is materialized in stretches of this many votes
 
 
 DEFAULT_ELO_CONFIG = EloConfig()
 
 
+@dataclass(frozen=True)
+class LeaderboardState:
+    n_pending_votes: int
+    n_pending_changes: int
+    updated: datetime
+    recompute_started: Optional[datetime]  # set while a recompute is running
+
+
+@dataclasses.dataclass(frozen=True)
+class HeadToHeadArrays:
+    """Head-to-heads in submission order as parallel columns, with names kept in separate lookups"""
+
+    head_to_head_id: np.ndarray  # int64
+    model_a_id: np.ndarray  # int64
+    model_b_id: np.ndarray  # int64
+    judge_id: np.ndarray  # int64
+    winner: np.ndarray  # int8: 1 if A won, -1 if B won, 0 for ties
+    model_names: dict[int, str]
+    judge_names: dict[int, str]
+
+
 class EloService:
     @staticmethod
-    def get_df_head_to_head(project_slug: str) -> pd.DataFrame:
+    def get_head_to_head_arrays(project_slug: str, judge_id: Optional[int] = None) -> HeadToHeadArrays:
+        """Load head-to-heads as integer columns, for rating computations that don't need any names per row"""
+        with ProjectService.connect(project_slug) as conn:
+            return EloService.read_head_to_head_arrays(conn, judge_id=judge_id)
+
+    @staticmethod
+    def read_head_to_head_arrays(
+        conn: sqlite3.Connection,
+        judge_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> HeadToHeadArrays:
+        """
+        As `get_head_to_head_arrays`, within an existing connection and optionally only the first `limit` after a given
+        head-to-head
+        """
+        filters = []
+        if judge_id is not None:
+            filters.append("h.judge_id = :judge_id")
+        if after_id is not None:
+            filters.append("h.id > :after_id")
+        where = f"WHERE {' AND '.join(filters)}" if len(filters) > 0 else ""
+        cur = conn.execute(
+            f"""
+            SELECT
+                h.id,
+                ra.model_id,
+                rb.model_id,
+                h.judge_id,
+                h.winner
+            FROM head_to_head h
+            JOIN response ra ON h.response_a_id = ra.id
+            JOIN response rb ON h.response_b_id = rb.id
+            {where}
+            ORDER BY h.id -- ensure we are replaying head-to-heads in the order they were submitted
+            LIMIT :limit
+            """,
+            dict(judge_id=judge_id, after_id=after_id, limit=-1 if limit is None else limit),  # negative for no limit
+        )
+        chunks = []  # fetch in chunks to avoid holding a Python tuple per head-to-head all at once
+        while len(rows := cur.fetchmany(65_536)) > 0:
+            chunks.append(np.array(rows, dtype=np.int64))
+        model_names = dict(conn.execute("SELECT id, name FROM model").fetchall())
+        judge_names = dict(conn.execute("SELECT id, name FROM judge").fetchall())
+        columns = np.concatenate(chunks) if len(chunks) > 0 else np.empty((0, 5), dtype=np.int64)
+        return HeadToHeadArrays(
+            head_to_head_id=np.ascontiguousarray(columns[:, 0]),
+            model_a_id=np.ascontiguousarray(columns[:, 1]),
+            model_b_id=np.ascontiguousarray(columns[:, 2]),
+            judge_id=np.ascontiguousarray(columns[:, 3]),
+            winner=columns[:, 4].astype(np.int8),
+            model_names=model_names,
+            judge_names=judge_names,
+        )
+
+    @staticmethod
+    def get_leaderboard_state(project_slug: str) -> LeaderboardState:
         with ProjectService.connect(project_slug) as conn:
-            return pd.read_sql_query(
+            ((n_pending_votes, n_pending_changes, updated, recompute_started),) = conn.execute(
                 """
                 SELECT
-                    j.id AS judge_id,
-                    j.name AS judge_name,
-                    ma.id AS model_a_id,
-                    ma.name AS model_a,
-                    mb.id AS model_b_id,
-                    mb.name AS model_b,
-                    h.winner
-                FROM head_to_head h
-                JOIN judge j ON h.judge_id = j.id
-                JOIN response ra ON h.response_a_id = ra.id
-                JOIN response rb ON h.response_b_id = rb.id
-                JOIN model ma ON ra.model_id = ma.id
-                JOIN model mb ON rb.model_id = mb.id
-                ORDER BY h.id -- ensure we are replaying head-to-heads in the order they were submitted
+                    n_pending_votes,
+                    n_pending_changes,
+                    strftime('%Y-%m-%dT%H:%M:%SZ', updated),
+                    strftime('%Y-%m-%dT%H:%M:%SZ', recompute_started)
+                FROM leaderboard_state
+                """
+            ).fetchall()
+        return LeaderboardState(
+            n_pending_votes=n_pending_votes,
+            n_pending_changes=n_pending_changes,
+            updated=updated,
+            recompute_started=recompute_started,
+        )
+
+    @staticmethod
+    def get_head_to_head_version(project_slug: str, judge_id: int) -> int:
+        """Counter that changes whenever any of this judge's head-to-heads are added, changed, or removed"""
+        with ProjectService.connect(project_slug) as conn:
+            rows = conn.execute(
+                "SELECT version FROM head_to_head_version WHERE judge_id = :judge_id",
+                dict(judge_id=judge_id),
+            ).fetchall()
+        return rows[0][0] if len(rows) > 0 else 0
+
+    @staticmethod
+    def mark_leaderboard_stale(conn: sqlite3.Connection, n_votes: int = 0, n_changes: int = 0) -> None:
+        """Record writes not yet reflected by a full recompute, within the same transaction as the writes themselves"""
+        conn.execute(
+            """
+            UPDATE leaderboard_state
+            SET n_pending_votes = n_pending_votes + :n_votes, n_pending_changes = n_pending_changes + :n_changes
+            """,
+            dict(n_votes=n_votes, n_changes=n_changes),
+        )
+
+    @staticmethod
+    def get_reseed_delay(project_slug: str, config: EloConfig = DEFAULT_ELO_CONFIG) -> Optional[float]:
+        """Seconds until pending writes warrant a full recompute, 0 if one is due now, or None if nothing is pending"""
+        state = EloService.get_leaderboard_state(project_slug)
+        if state.n_pending_changes > 0 or state.n_pending_votes >= config.n_votes_per_refresh:
+            return 0
+        if state.n_pending_votes == 0:
+            return None
+        seconds_since_update = (datetime.now(state.updated.tzinfo) - state.updated).total_seconds()
+        return max(config.refresh_interval_seconds - seconds_since_update, 0)
+
+    @staticmethod
+    def claim_recompute(project_slug: str, timeout_seconds: float = 3_600) -> bool:
+        """Atomically mark a recompute as running, unless one already is. Stale claims expire after the timeout."""
+        with ProjectService.connect(project_slug, commit=True) as conn:
+            records = conn.execute(
+                """
+                UPDATE leaderboard_state
+                SET recompute_started = current_timestamp
+                WHERE recompute_started IS NULL
+                OR recompute_started < datetime('now', '-' || :timeout_seconds || ' seconds')
+                RETURNING 1
                 """,
-                conn,
-            )
+                dict(timeout_seconds=int(timeout_seconds)),
+            ).fetchall()
+        return len(records) > 0
+
+    @staticmethod
+    def release_recompute(project_slug: str) -> None:
+        with ProjectService.connect(project_slug, commit=True) as conn:
+            conn.execute("UPDATE leaderboard_state SET recompute_started = NULL")
 
     @staticmethod
     def reseed_scores(project_slug: str, config: EloConfig = DEFAULT_ELO_CONFIG) -> None:
-        df_h2h = EloService.get_df_head_to_head(project_slug)
-        df_elo = EloService.compute_elo(df_h2h, config=config)  # noqa: F841
+        state = EloService.get_leaderboard_state(project_slug)  # read before head-to-heads such that none are missed
+        h2h = EloService.get_head_to_head_arrays(project_slug)
+        df_elo = EloService.compute_elo_from_arrays(h2h, config=config)[["model_id", "elo", "q025", "q975"]]
         with ProjectService.connect(project_slug, commit=True) as conn:
-            with temporary_table(conn, df_elo) as tmp:
-                conn.cursor().execute(
-                    f"""
-                    UPDATE model
-                    SET elo = IFNULL({tmp}.elo, :default_elo), q025 = {tmp}.q025, q975 = {tmp}.q975
-                    FROM model m2
-                    LEFT JOIN {tmp} ON {tmp}.model = m2.name -- left join to set null values for models without votes
-                    WHERE model.id = m2.id;
-                    """,
-                    dict(default_elo=config.default_score),
-                )
+            # only clear what this recompute has seen, as more writes may have landed while computing
+            conn.execute(
+                """
+                UPDATE leaderboard_state
+                SET n_pending_votes = MAX(n_pending_votes - :n_votes, 0),
+                    n_pending_changes = MAX(n_pending_changes - :n_changes, 0),
+                    updated = current_timestamp
+                """,
+                dict(n_votes=state.n_pending_votes, n_changes=state.n_pending_changes),
+            )
+            # reset models without votes, then set scores for those with votes
+            conn.execute(
+                "UPDATE model SET elo = :default_elo, q025 = NULL, q975 = NULL",
+                dict(default_elo=config.default_score),
+            )
+            execute_many(
+                conn,
+                "UPDATE model SET elo = ?, q025 = ?, q975 = ? WHERE id = ?",
+                df_elo,
+                ["elo", "q025", "q975", "model_id"],
+            )
 
     # most elo-related code is from https://github.com/lm-sys/FastChat/blob/main/fastchat/serve/monitor/elo_analysis.py
     @staticmethod
@@ -72,44 +245,279 @@ class EloService:
         winner: api.WinnerType,
         config: EloConfig = DEFAULT_ELO_CONFIG,
     ) -> tuple[float, float]:
+        score_a = 1 if winner == "A" else 0 if winner == "B" else 0.5
+        return EloService.compute_elo_update(elo_a, elo_b, score_a, config=config)
+
+    @staticmethod
+    def compute_elo_update(
+        elo_a: float,
+        elo_b: float,
+        score_a: float,
+        config: EloConfig = DEFAULT_ELO_CONFIG,
+    ) -> tuple[float, float]:
+        """Ratings of both models after a head-to-head where model A scored `score_a` (1 for a win, 0.5 for a tie)"""
         expected_a = 1 / (1 + config.base ** ((elo_b - elo_a) / config.scale))
         expected_b = 1 / (1 + config.base ** ((elo_a - elo_b) / config.scale))
-        score_a = 1 if winner == "A" else 0 if winner == "B" else 0.5
-        elo_a += config.k * (score_a - expected_a)
-        elo_b += config.k * (1 - score_a - expected_b)
-        return elo_a, elo_b
+        return elo_a + config.k * (score_a - expected_a), elo_b + config.k * (1 - score_a - expected_b)
 
     @staticmethod
     def compute_elo(df_h2h: pd.DataFrame, *, config: EloConfig = DEFAULT_ELO_CONFIG) -> pd.DataFrame:
-        df_elo = EloService._compute_elo_once(df_h2h, config=config)
-        df_bootstrap = EloService._get_bootstrap_result(df_h2h, config=config)
+        models, index_a, index_b, score_a = EloService._encode_head_to_heads(df_h2h)
+        return EloService._compute_ratings(models, index_a, index_b, score_a, config=config)
+
+    @staticmethod
+    def compute_elo_from_arrays(h2h: HeadToHeadArrays, *, config: EloConfig = DEFAULT_ELO_CONFIG) -> pd.DataFrame:
+        """As `compute_elo`, identifying models by `model_id` and with names looked up once per model"""
+        n_h2h = len(h2h.winner)
+        model_ids, codes = np.unique(np.concatenate([h2h.model_a_id, h2h.model_b_id]), return_inverse=True)
+        score_a = (h2h.winner.astype(np.float64) + 1) / 2
+        df_elo = EloService._compute_ratings(model_ids, codes[:n_h2h], codes[n_h2h:], score_a, config=config)
+        df_elo = df_elo.rename(columns=dict(model="model_id"))
+        df_elo.insert(1, "model", df_elo["model_id"].map(h2h.model_names))
+        return df_elo
+
+    @staticmethod
+    def _compute_ratings(
+        models: np.ndarray,
+        index_a: np.ndarray,
+        index_b: np.ndarray,
+        score_a: np.ndarray,
+        *,
+        config: EloConfig = DEFAULT_ELO_CONFIG,
+    ) -> pd.DataFrame:
+        if config.method is None:
+            config = dataclasses.replace(config, method=get_rating_method())
+        if config.method in {RatingMethod.BRADLEY_TERRY, RatingMethod.BRADLEY_TERRY_BOOTSTRAP}:
+            return EloService._compute_bradley_terry(models, index_a, index_b, score_a, config=config)
+        ratings = EloService._get_bootstrap_result(index_a, index_b, score_a, len(models), config=config)
         # set Elo score to the median of the bootstrap result -- the order of the head-to-heads doesn't matter for bulk
         #  judging so the "true" score is in the middle of the differently ordered rollouts
-        df_elo = df_elo.merge(df_bootstrap.quantile(0.5).rename("elo_median"), left_on="model", right_index=True)
-        df_elo["elo"] = df_elo["elo_median"]
-        df_elo = df_elo.merge(df_bootstrap.quantile(0.025).rename("q025"), left_on="model", right_index=True)
-        df_elo = df_elo.merge(df_bootstrap.quantile(0.975).rename("q975"), left_on="model", right_index=True)
+        elo, q025, q975 = np.quantile(ratings, [0.5, 0.025, 0.975], axis=0)
+        df_elo = pd.DataFrame(dict(model=models, elo=elo, q025=q025, q975=q975))
         df_elo["ci95"] = df_elo["q975"] - df_elo["q025"]
-        return df_elo[["model", "elo", "q025", "q975", "ci95"]]
+        return df_elo.sort_values(by="elo", ascending=False)
 
     @staticmethod
     def _compute_elo_once(df_h2h: pd.DataFrame, *, config: EloConfig = DEFAULT_ELO_CONFIG) -> pd.DataFrame:
-        rating: dict[str, float] = defaultdict(lambda: config.default_score)
-        for _, model_a, model_b, winner in df_h2h[["model_a", "model_b", "winner"]].itertuples():
-            elo_a, elo_b = EloService.compute_elo_single(rating[model_a], rating[model_b], winner, config=config)
-            rating[model_a] = elo_a
-            rating[model_b] = elo_b
-        df_elo = pd.DataFrame(dict(rating).items(), columns=["model", "elo"])
+        models, index_a, index_b, score_a = EloService._encode_head_to_heads(df_h2h)
+        rating = [float(config.default_score)] * len(models)
+        for a, b, s_a in zip(index_a.tolist(), index_b.tolist(), score_a.tolist()):
+            expected_a = 1 / (1 + config.base ** ((rating[b] - rating[a]) / config.scale))
+            expected_b = 1 / (1 + config.base ** ((rating[a] - rating[b]) / config.scale))
+            rating[a] += config.k * (s_a - expected_a)
+            rating[b] += config.k * (1 - s_a - expected_b)
+        df_elo = pd.DataFrame(dict(model=models, elo=rating))
         return df_elo.sort_values(by="elo", ascending=False)
 
     @staticmethod
-    def _get_bootstrap_result(df_h2h: pd.DataFrame, *, config: EloConfig = DEFAULT_ELO_CONFIG) -> pd.DataFrame:
-        rows = []
+    def _get_bootstrap_result(
+        index_a: np.ndarray,
+        index_b: np.ndarray,
+        score_a: np.ndarray,
+        n_models: int,
+        *,
+        config: EloConfig = DEFAULT_ELO_CONFIG,
+    ) -> np.ndarray:
         t_start = time.time()
         logger.info(f"Bootstrapping confidence intervals with {config.n_bootstrap_rounds} rounds...")
-        for _ in range(config.n_bootstrap_rounds):
-            df_h2h_tmp = df_h2h.sample(frac=1.0, replace=True)
-            rows.append(EloService._compute_elo_once(df_h2h_tmp, config=config))
+        # seed each round individually such that results do not depend on how rounds are distributed across workers
+        round_seeds = np.random.SeedSequence(config.seed).spawn(config.n_bootstrap_rounds)
+        n_workers = min(config.n_workers, len(score_a) // config.min_head_to_heads_per_worker, len(round_seeds))
+        if n_workers > 1:
+            ratings = EloService._compute_elo_rollouts_parallel(
+                index_a, index_b, score_a, n_models, round_seeds, n_workers, config=config
+            )
+        else:
+            ratings = EloService._compute_elo_rollouts(index_a, index_b, score_a, n_models, round_seeds, config=config)
         logger.info(f"Bootstrapped confidence intervals in {time.time() - t_start:0.1f} seconds")
-        df = pd.DataFrame([{r.model: r.elo for r in df_row.itertuples()} for df_row in rows])
-        return df[df.median().sort_values(ascending=False).index]
+        return ratings
+
+    @staticmethod
+    def _encode_head_to_heads(df_h2h: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Map model names to contiguous integer indices and winners to model A's score (1 win, 0 loss, 0.5 tie)."""
+        n_h2h = len(df_h2h)
+        codes, models = pd.factorize(np.concatenate([df_h2h["model_a"].to_numpy(), df_h2h["model_b"].to_numpy()]))
+        score_a = np.select([df_h2h["winner"] == "A", df_h2h["winner"] == "B"], [1.0, 0.0], default=0.5)
+        return np.asarray(models), codes[:n_h2h], codes[n_h2h:], score_a
+
+    @staticmethod
+    def _compute_elo_rollouts(
+        index_a: np.ndarray,
+        index_b: np.ndarray,
+        score_a: np.ndarray,
+        n_models: int,
+        round_seeds: list[np.random.SeedSequence],
+        *,
+        config: EloConfig = DEFAULT_ELO_CONFIG,
+    ) -> np.ndarray:
+        """Replay one resampled rollout per seed in lockstep, looping once per head-to-head rather than once per round"""
+        n_h2h, n_rounds = len(score_a), len(round_seeds)
+        rngs = [np.random.default_rng(seed) for seed in round_seeds]
+        ratings = np.full((n_rounds, n_models), config.default_score, dtype=np.float64)
+        rounds = np.arange(n_rounds)
+        chunk_size = 4_096  # draw resample indices in chunks to keep memory flat for projects with many head-to-heads
+        for chunk_start in range(0, n_h2h, chunk_size):
+            n_chunk = min(chunk_size, n_h2h - chunk_start)
+            sample = np.stack([rng.integers(0, n_h2h, size=n_chunk) for rng in rngs])
+            for step_a, step_b, step_score_a in zip(index_a[sample].T, index_b[sample].T, score_a[sample].T):
+                elo_a = ratings[rounds, step_a]
+                elo_b = ratings[rounds, step_b]
+                expected_a = 1 / (1 + config.base ** ((elo_b - elo_a) / config.scale))
+                delta = config.k * (step_score_a - expected_a)
+                ratings[rounds, step_a] = elo_a + delta
+                ratings[rounds, step_b] = elo_b - delta
+        return ratings
+
+    @staticmethod
+    def _compute_bradley_terry(
+        models: np.ndarray,
+        index_a: np.ndarray,
+        index_b: np.ndarray,
+        score_a: np.ndarray,
+        *,
+        config: EloConfig = DEFAULT_ELO_CONFIG,
+    ) -> pd.DataFrame:
+        counts = EloService._count_pair_outcomes(index_a, index_b, score_a, len(models))
+        theta, covariance = EloService._fit_bradley_terry(EloService._wins_from_counts(counts))
+        # convert from natural log-odds to the Elo scale, where P(i beats j) = 1 / (1 + base ** ((R_j - R_i) / scale))
+        to_elo = config.scale / np.log(config.base)
+        elo = config.default_score + to_elo * theta
+        if config.method is RatingMethod.BRADLEY_TERRY_BOOTSTRAP:
+            bootstrap = config.default_score + to_elo * EloService._get_pair_count_bootstrap_result(counts, config)
+            q025, q975 = np.quantile(bootstrap, 0.025, axis=0), np.quantile(bootstrap, 0.975, axis=0)
+        else:
+            half_width = 1.96 * to_elo * np.sqrt(np.clip(np.diag(covariance), 0, None))
+            q025, q975 = elo - half_width, elo + half_width
+        df_elo = pd.DataFrame(dict(model=models, elo=elo, q025=q025, q975=q975))
+        df_elo["ci95"] = df_elo["q975"] - df_elo["q025"]
+        return df_elo.sort_values(by="elo", ascending=False)
+
+    @staticmethod
+    def _count_pair_outcomes(
+        index_a: np.ndarray,
+        index_b: np.ndarray,
+        score_a: np.ndarray,
+        n_models: int,
+    ) -> np.ndarray:
+        """Collapse head-to-heads into a (n_models, n_models, 3) tensor counting A wins, B wins, and ties per pair"""
+        outcome = np.select([score_a == 1, score_a == 0], [0, 1], default=2)
+        cell_index = (index_a * n_models + index_b) * 3 + outcome
+        return np.bincount(cell_index, minlength=n_models * n_models * 3).reshape(n_models, n_models, 3)
+
+    @staticmethod
+    def _wins_from_counts(counts: np.ndarray) -> np.ndarray:
+        """wins[i, j] is the number of times model i beat model j, with ties counted as half a win for each side"""
+        a_wins, b_wins, ties = counts[..., 0], counts[..., 1], counts[..., 2]
+        return a_wins + b_wins.T + 0.5 * (ties + ties.T)
+
+    @staticmethod
+    def _get_pair_count_bootstrap_result(counts: np.ndarray, config: EloConfig) -> np.ndarray:
+        # resampling votes with replacement is equivalent to a multinomial draw over the pair outcome cells, so each
+        #  round costs O(n_models^2) rather than O(n_votes)
+        t_start = time.time()
+        n_models, n_votes = len(counts), int(counts.sum())
+        if n_votes == 0:
+            return np.zeros((config.n_bootstrap_rounds, n_models))
+        rng = np.random.default_rng(config.seed)
+        samples = rng.multinomial(n_votes, counts.ravel() / n_votes, size=config.n_bootstrap_rounds)
+        thetas = [
+            EloService._fit_bradley_terry(EloService._wins_from_counts(sample.reshape(counts.shape)))[0]
+            for sample in samples
+        ]
+        logger.info(f"Bootstrapped confidence intervals from pair counts in {time.time() - t_start:0.1f} seconds")
+        return np.stack(thetas)
+
+    @staticmethod
+    def _fit_bradley_terry(
+        wins: np.ndarray,
+        regularization: float = 1e-2,
+        max_iterations: int = 100,
+        tolerance: float = 1e-8,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Newton's method on the L2-regularized Bradley-Terry log-likelihood, returning log-odds ratings and covariance"""
+        n_models = len(wins)
+        n_games = wins + wins.T
+        theta = np.zeros(n_models)
+        # the small L2 penalty keeps ratings finite for models that never lost (or never won) and anchors the mean at 0
+        information = np.eye(n_models) * regularization
+        for _ in range(max_iterations):
+            p_win = 1 / (1 + np.exp(theta[None, :] - theta[:, None]))
+            gradient = (wins - n_games * p_win).sum(axis=1) - regularization * theta
+            weights = n_games * p_win * (1 - p_win)
+            information = np.diag(weights.sum(axis=1)) - weights + np.eye(n_models) * regularization
+            step = np.linalg.solve(information, gradient)
+            theta += step
+            if np.abs(step).max(initial=0) < tolerance:
+                break
+        # ratings are only identified up to a shared offset; report uncertainty relative to the mean rating
+        centering = np.eye(n_models) - 1 / max(n_models, 1)
+        covariance = centering @ np.linalg.inv(information) @ centering
+        return theta, covariance
+
+    @staticmethod
+    def _compute_elo_rollouts_parallel(
+        index_a: np.ndarray,
+        index_b: np.ndarray,
+        score_a: np.ndarray,
+        n_models: int,
+        round_seeds: list[np.random.SeedSequence],
+        n_workers: int,
+        *,
+        config: EloConfig = DEFAULT_ELO_CONFIG,
+    ) -> np.ndarray:
+        # place encoded head-to-heads in shared memory once rather than pickling them to every worker
+        n_h2h = len(score_a)
+        shm = SharedMemory(create=True, size=3 * n_h2h * 8)
+        try:
+            _write_shared_head_to_heads(shm, index_a, index_b, score_a)
+            round_seed_chunks = [list(chunk) for chunk in np.array_split(np.array(round_seeds), n_workers)]
+            # spawn rather than fork, as the server process is multithreaded
+            mp_context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=mp_context) as executor:
+                futures = [
+                    executor.submit(_compute_elo_rollouts_shared, shm.name, n_h2h, n_models, chunk, config)
+                    for chunk in round_seed_chunks
+                ]
+                return np.concatenate([future.result() for future in futures])
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+def _compute_elo_rollouts_shared(
+    shm_name: str,
+    n_h2h: int,
+    n_models: int,
+    round_seeds: list[np.random.SeedSequence],
+    config: EloConfig,
+) -> np.ndarray:
+    shm = SharedMemory(name=shm_name)
+    try:
+        return _compute_elo_rollouts_from_shared_memory(shm, n_h2h, n_models, round_seeds, config)
+    finally:
+        shm.close()
+
+
+# NOTE: views into shared memory are confined to the following functions as the block can't close while they're alive
+def _compute_elo_rollouts_from_shared_memory(
+    shm: SharedMemory,
+    n_h2h: int,
+    n_models: int,
+    round_seeds: list[np.random.SeedSequence],
+    config: EloConfig,
+) -> np.ndarray:
+    (index_a, index_b), score_a = _shared_head_to_head_arrays(shm, n_h2h)
+    return EloService._compute_elo_rollouts(index_a, index_b, score_a, n_models, round_seeds, config=config)
+
+
+def _write_shared_head_to_heads(
+    shm: SharedMemory, index_a: np.ndarray, index_b: np.ndarray, score_a: np.ndarray
+) -> None:
+    shared_index, shared_score_a = _shared_head_to_head_arrays(shm, len(score_a))
+    shared_index[0], shared_index[1], shared_score_a[:] = index_a, index_b, score_a
+
+
+def _shared_head_to_head_arrays(shm: SharedMemory, n_h2h: int) -> tuple[np.ndarray, np.ndarray]:
+    index = np.ndarray((2, n_h2h), dtype=np.int64, buffer=shm.buf)
+    score_a = np.ndarray((n_h2h,), dtype=np.float64, buffer=shm.buf, offset=2 * n_h2h * 8)
+    return index, score_a
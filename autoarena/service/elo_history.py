@@ -0,0 +1,169 @@
+import sqlite3
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from autoarena.api import api
+from autoarena.error import NotFoundError
+from autoarena.service.elo import EloService, EloConfig, DEFAULT_ELO_CONFIG, HeadToHeadArrays
+from autoarena.service.project import ProjectService
+
+
+class EloHistoryService:
+    @staticmethod
+    def get_history(
+        project_slug: str,
+        model_id: int,
+        judge_id: Optional[int] = None,
+        config: EloConfig = DEFAULT_ELO_CONFIG,
+    ) -> list[api.EloHistoryItem]:
+        """
+        Sequential Elo of a model after each of its head-to-heads, from a single judge or across all judges. Reads only,
+        replaying whatever follows the latest checkpoint, as checkpoints are materialized on the write side via `extend`.
+        """
+        with ProjectService.connect(project_slug) as conn:
+            conn.execute("BEGIN")  # read the checkpoint, history, and tail from the same snapshot
+            checkpoint_id, ratings = EloHistoryService._read_latest_checkpoint(conn, judge_id)
+            df_history = pd.read_sql_query(
+                """
+                SELECT eh.model_a_id, eh.model_b_id, h.judge_id, eh.elo_a, eh.elo_b
+                FROM elo_history eh
+                JOIN head_to_head h ON h.id = eh.head_to_head_id
+                WHERE eh.judge_id IS :judge_id
+                AND eh.head_to_head_id <= :checkpoint_id
+                AND (eh.model_a_id = :model_id OR eh.model_b_id = :model_id)
+                ORDER BY eh.head_to_head_id
+                """,
+                conn,
+                params=dict(judge_id=judge_id, checkpoint_id=checkpoint_id, model_id=model_id),
+            )
+            tail = EloService.read_head_to_head_arrays(conn, judge_id=judge_id, after_id=checkpoint_id)
+        if model_id not in tail.model_names:
+            raise NotFoundError(f"Model with ID '{model_id}' not found")
+        elo_a, elo_b = EloHistoryService._replay(tail, ratings, config)
+        df_tail = pd.DataFrame(
+            dict(
+                model_a_id=tail.model_a_id,
+                model_b_id=tail.model_b_id,
+                judge_id=tail.judge_id,
+                elo_a=elo_a,
+                elo_b=elo_b,
+            )
+        )
+        df_tail = df_tail[(df_tail["model_a_id"] == model_id) | (df_tail["model_b_id"] == model_id)]
+        df = pd.concat([df_history, df_tail]) if len(df_history) > 0 else df_tail
+        is_a = df["model_a_id"].to_numpy() == model_id
+        other_model_ids = np.where(is_a, df["model_b_id"], df["model_a_id"])
+        elos = np.where(is_a, df["elo_a"], df["elo_b"])
+        return [
+            api.EloHistoryItem(
+                other_model_id=other_model_id,
+                other_model_name=tail.model_names[other_model_id],
+                judge_id=h2h_judge_id,
+                judge_name=tail.judge_names[h2h_judge_id],
+                elo=elo,
+            )
+            for other_model_id, h2h_judge_id, elo in zip(other_model_ids.tolist(), df["judge_id"].tolist(), elos)
+        ]
+
+    @staticmethod
+    def extend_all(project_slug: str, config: EloConfig = DEFAULT_ELO_CONFIG) -> None:
+        """Extend the history across all judges as well as that of each individual judge"""
+        with ProjectService.connect(project_slug) as conn:
+            judge_ids = [judge_id for (judge_id,) in conn.execute("SELECT id FROM judge ORDER BY id").fetchall()]
+        for judge_id in [None, *judge_ids]:
+            EloHistoryService.extend(project_slug, judge_id=judge_id, config=config)
+
+    @staticmethod
+    def extend(project_slug: str, judge_id: Optional[int] = None, config: EloConfig = DEFAULT_ELO_CONFIG) -> None:
+        """
+        Materialize history and checkpoints for every complete stretch of votes since the latest checkpoint, committing
+        each stretch on its own such that the write lock is only held briefly, even when first building the history of
+        a project with many votes
+        """
+        n_per_checkpoint = config.n_votes_per_history_checkpoint
+        with ProjectService.connect(project_slug) as conn:
+            checkpoint_id, _ = EloHistoryService._read_latest_checkpoint(conn, judge_id)
+            if EloHistoryService._count_after(conn, judge_id, checkpoint_id) < n_per_checkpoint:
+                return  # avoid taking the write lock when there's nothing to materialize
+        while EloHistoryService._extend_stretch(project_slug, judge_id, config):
+            pass
+
+    @staticmethod
+    def _extend_stretch(project_slug: str, judge_id: Optional[int], config: EloConfig) -> bool:
+        """Materialize the next stretch of votes following the latest checkpoint, returning False if it isn't complete"""
+        n_per_checkpoint = config.n_votes_per_history_checkpoint
+        with ProjectService.connect(project_slug, commit=True) as conn:
+            # read the checkpoint within this transaction, as changed votes may have discarded it in the meantime
+            checkpoint_id, ratings = EloHistoryService._read_latest_checkpoint(conn, judge_id)
+            stretch = EloService.read_head_to_head_arrays(
+                conn,
+                judge_id=judge_id,
+                after_id=checkpoint_id,
+                limit=n_per_checkpoint,
+            )
+            h2h_ids = stretch.head_to_head_id.tolist()
+            if len(h2h_ids) < n_per_checkpoint:
+                return False
+            elo_a, elo_b = EloHistoryService._replay(stretch, ratings, config)
+            conn.executemany(
+                """
+                INSERT INTO elo_history (judge_id, head_to_head_id, model_a_id, model_b_id, elo_a, elo_b)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                zip(
+                    [judge_id] * len(h2h_ids),
+                    h2h_ids,
+                    stretch.model_a_id.tolist(),
+                    stretch.model_b_id.tolist(),
+                    elo_a,
+                    elo_b,
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO elo_checkpoint (judge_id, head_to_head_id, model_id, elo) VALUES (?, ?, ?, ?)",
+                [(judge_id, h2h_ids[-1], model_id, elo) for model_id, elo in ratings.items()],
+            )
+        return True
+
+    @staticmethod
+    def _read_latest_checkpoint(conn: sqlite3.Connection, judge_id: Optional[int]) -> tuple[int, dict[int, float]]:
+        records = conn.execute(
+            """
+            SELECT head_to_head_id, model_id, elo
+            FROM elo_checkpoint
+            WHERE judge_id IS :judge_id
+            AND head_to_head_id = (SELECT MAX(head_to_head_id) FROM elo_checkpoint WHERE judge_id IS :judge_id)
+            """,
+            dict(judge_id=judge_id),
+        ).fetchall()
+        if len(records) == 0:
+            return 0, {}
+        return records[0][0], {model_id: elo for _, model_id, elo in records}
+
+    @staticmethod
+    def _count_after(conn: sqlite3.Connection, judge_id: Optional[int], after_id: int) -> int:
+        ((count,),) = conn.execute(
+            "SELECT COUNT(1) FROM head_to_head WHERE (:judge_id IS NULL OR judge_id = :judge_id) AND id > :after_id",
+            dict(judge_id=judge_id, after_id=after_id),
+        ).fetchall()
+        return count
+
+    @staticmethod
+    def _replay(
+        h2h: HeadToHeadArrays,
+        ratings: dict[int, float],
+        config: EloConfig,
+    ) -> tuple[list[float], list[float]]:
+        """Apply head-to-heads to `ratings` in place, returning both models' ratings after each one"""
+        elo_a_after, elo_b_after = [], []
+        model_a_ids, model_b_ids = h2h.model_a_id.tolist(), h2h.model_b_id.tolist()
+        scores_a = ((h2h.winner.astype(np.float64) + 1) / 2).tolist()
+        for model_a_id, model_b_id, score_a in zip(model_a_ids, model_b_ids, scores_a):
+            elo_a = ratings.get(model_a_id, config.default_score)
+            elo_b = ratings.get(model_b_id, config.default_score)
+            ratings[model_a_id], ratings[model_b_id] = EloService.compute_elo_update(elo_a, elo_b, score_a, config)
+            elo_a_after.append(ratings[model_a_id])
+            elo_b_after.append(ratings[model_b_id])
+        return elo_a_after, elo_b_after
@@ -1,123 +1,251 @@
+import base64
 import dataclasses
 import json
+import sqlite3
+from typing import Any, Optional, Union
 
 import pandas as pd
 from loguru import logger
 
 from autoarena.api import api
 from autoarena.error import BadRequestError
+from autoarena.service.compression import CompressionService
 from autoarena.service.elo import EloService
 from autoarena.service.judge import JudgeService
 from autoarena.service.project import ProjectService
-from autoarena.store.database import temporary_table
-from autoarena.store.utils import id_slug, check_required_columns
+from autoarena.store.database import execute_many
+from autoarena.store.utils import WINNER_CODES, check_required_columns, decode_winners, encode_winners, ordered_pairs
+
+
+# pairings of :model_a_id (optionally against :model_b_id only) oriented such that response A is from model A, following
+# the keyset (:after_a_id, :after_b_id) in (response_a_id, response_b_id) order
+ORIENTED_PAIR_CTE = """
+WITH oriented_pair AS (
+    SELECT rp.response_a_id, rp.response_b_id, rp.response_a_id AS low_id, rp.response_b_id AS high_id
+    FROM response_pair rp
+    WHERE rp.model_a_id = :model_a_id
+    AND (:model_b_id IS NULL OR rp.model_b_id = :model_b_id)
+    AND (rp.response_a_id, rp.response_b_id) > (:after_a_id, :after_b_id)
+    UNION ALL
+    SELECT rp.response_b_id, rp.response_a_id, rp.response_a_id AS low_id, rp.response_b_id AS high_id
+    FROM response_pair rp
+    WHERE rp.model_b_id = :model_a_id
+    AND (:model_b_id IS NULL OR rp.model_a_id = :model_b_id)
+    AND (rp.response_b_id, rp.response_a_id) > (:after_a_id, :after_b_id)
+    ORDER BY 1, 2
+    LIMIT :limit
+)
+"""
 
 
 class HeadToHeadService:
     @staticmethod
-    def get_df(project_slug: str, request: api.HeadToHeadsRequest) -> pd.DataFrame:
+    def get_df(
+        project_slug: str,
+        request: api.HeadToHeadsRequest,
+        after: tuple[int, int] = (0, 0),
+        limit: Optional[int] = None,
+        with_text: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Get pairings of `request.model_a_id` ordered by (response_a_id, response_b_id), starting after the `after` pair
+        and returning at most `limit` of them. Both branches of the pairing walk an index in this order such that pages
+        are read by seeking past the previous page rather than by sorting every pairing of the model.
+        """
+        params = dict(
+            model_a_id=request.model_a_id,
+            model_b_id=request.model_b_id,
+            after_a_id=after[0],
+            after_b_id=after[1],
+            limit=limit if limit is not None else -1,  # negative limits are unbounded
+        )
+        text_columns = ", p.text AS prompt, ra.response AS response_a, rb.response AS response_b" if with_text else ""
+        text_join = "JOIN prompt p ON p.id = ra.prompt_id" if with_text else ""
         with ProjectService.connect(project_slug) as conn:
             df_h2h = pd.read_sql_query(
-                """
+                f"""
+                {ORIENTED_PAIR_CTE}
                 SELECT
                     ra.model_id AS model_a_id,
                     rb.model_id AS model_b_id,
-                    ra.prompt AS prompt,
                     ra.id AS response_a_id,
-                    rb.id AS response_b_id,
-                    ra.response AS response_a,
-                    rb.response AS response_b,
-                    JSON_GROUP_ARRAY(JSON_OBJECT(
-                        'judge_id', j1.id,
-                        'judge_name', j1.name,
-                        'winner', h1.winner
-                    )) AS history_a,
-                    JSON_GROUP_ARRAY(JSON_OBJECT(
-                        'judge_id', j2.id,
-                        'judge_name', j2.name,
-                        'winner', invert_winner(h2.winner)
-                    )) AS history_b
-                FROM response ra
-                JOIN response rb ON ra.prompt = rb.prompt
-                JOIN model ma ON ra.model_id = ma.id
-                JOIN model mb ON rb.model_id = mb.id
-                LEFT JOIN head_to_head h1 ON h1.response_a_id = ra.id AND h1.response_b_id = rb.id
-                LEFT JOIN judge j1 ON j1.id = h1.judge_id
-                LEFT JOIN head_to_head h2 ON h2.response_b_id = ra.id AND h2.response_a_id = rb.id
-                LEFT JOIN judge j2 ON j2.id = h2.judge_id
-                WHERE ra.model_id = :model_a_id
-                AND (:model_b_id IS NULL OR rb.model_id = :model_b_id)
-                AND ra.model_id != rb.model_id
-                GROUP BY ra.model_id, rb.model_id, ra.id, rb.id, ra.prompt, ra.response, rb.response
+                    rb.id AS response_b_id
+                    {text_columns}
+                FROM oriented_pair op
+                JOIN response ra ON ra.id = op.response_a_id
+                JOIN response rb ON rb.id = op.response_b_id
+                {text_join}
                 ORDER BY ra.id, rb.id
                 """,
                 conn,
-                params=dict(model_a_id=request.model_a_id, model_b_id=request.model_b_id),
+                params=params,
             )
-        if len(df_h2h) == 0:
-            df_h2h = df_h2h.assign(history=None)
-        else:
-            df_h2h["history"] = df_h2h.apply(
-                lambda r: [
-                    h for h in [*json.loads(r.history_a), *json.loads(r.history_b)] if h["judge_id"] is not None
-                ],
-                axis=1,
+            # votes are read separately, such that rows carrying text are neither grouped nor joined to each vote
+            df_vote = pd.read_sql_query(
+                f"""
+                {ORIENTED_PAIR_CTE}
+                SELECT
+                    op.response_a_id,
+                    op.response_b_id,
+                    j.id AS judge_id,
+                    j.name AS judge_name,
+                    IIF(h.response_a_id = op.response_a_id, h.winner, -h.winner) AS winner
+                FROM oriented_pair op
+                JOIN head_to_head h ON h.response_low_id = op.low_id AND h.response_high_id = op.high_id
+                JOIN judge j ON j.id = h.judge_id
+                ORDER BY op.response_a_id, op.response_b_id, j.id
+                """,
+                conn,
+                params=params,
             )
-        return df_h2h.drop(columns=["history_a", "history_b"])
+            if with_text:
+                df_h2h = CompressionService.decompress(conn, df_h2h, ["prompt", "response_a", "response_b"])
+        df_vote["winner"] = decode_winners(df_vote.winner)
+        df_vote["history"] = df_vote[["judge_id", "judge_name", "winner"]].to_dict("records")
+        history = df_vote.groupby(["response_a_id", "response_b_id"], sort=False).history.agg(list).to_dict()
+        df_h2h["history"] = [history.get(pair, []) for pair in zip(df_h2h.response_a_id, df_h2h.response_b_id)]
+        return df_h2h
+
+    @staticmethod
+    def get_df_for_models(project_slug: str, model_ids: list[int], judge_ids: list[int]) -> pd.DataFrame:
+        """
+        Get every pairing involving any of `model_ids` exactly once, with response A as the lower response ID, along
+        with a boolean `voted_{judge_id}` column for each of `judge_ids` flagging pairings that judge has voted on.
+        """
+        voted_columns = "".join(
+            f"""
+            , EXISTS (
+                SELECT 1 FROM head_to_head h
+                WHERE h.response_low_id = rp.response_a_id
+                AND h.response_high_id = rp.response_b_id
+                AND h.judge_id = :judge_id_{i}
+            ) AS voted_{judge_id}
+            """
+            for i, judge_id in enumerate(judge_ids)
+        )
+        with ProjectService.connect(project_slug) as conn:
+            df_h2h = pd.read_sql_query(
+                f"""
+                WITH selected_model AS (
+                    SELECT value AS id FROM JSON_EACH(:model_ids)
+                ), selected_pair AS (
+                    SELECT rp.id FROM response_pair rp WHERE rp.model_a_id IN (SELECT id FROM selected_model)
+                    UNION
+                    SELECT rp.id FROM response_pair rp WHERE rp.model_b_id IN (SELECT id FROM selected_model)
+                )
+                SELECT
+                    rp.model_a_id,
+                    rp.model_b_id,
+                    rp.response_a_id,
+                    rp.response_b_id,
+                    p.text AS prompt,
+                    ra.response AS response_a,
+                    rb.response AS response_b
+                    {voted_columns}
+                FROM selected_pair sp
+                JOIN response_pair rp ON rp.id = sp.id
+                JOIN response ra ON ra.id = rp.response_a_id
+                JOIN response rb ON rb.id = rp.response_b_id
+                JOIN prompt p ON p.id = rp.prompt_id
+                ORDER BY rp.response_a_id, rp.response_b_id
+                """,
+                conn,
+                params=dict(
+                    model_ids=json.dumps(model_ids),
+                    **{f"judge_id_{i}": judge_id for i, judge_id in enumerate(judge_ids)},
+                ),
+            )
+            df_h2h = CompressionService.decompress(conn, df_h2h, ["prompt", "response_a", "response_b"])
+        return df_h2h.astype({f"voted_{judge_id}": bool for judge_id in judge_ids})
 
     @staticmethod
     def get(project_slug: str, request: api.HeadToHeadsRequest) -> list[api.HeadToHead]:
         df_h2h = HeadToHeadService.get_df(project_slug, request)
-        return [
-            api.HeadToHead(
-                prompt=r.prompt,
-                response_a_id=r.response_a_id,
-                response_a=r.response_a,
-                response_b_id=r.response_b_id,
-                response_b=r.response_b,
-                history=[api.HeadToHeadHistoryItem(**h) for h in r.history],
-            )
-            for r in df_h2h.itertuples()
-        ]
+        return [HeadToHeadService._to_head_to_head(r) for r in df_h2h.itertuples()]
+
+    @staticmethod
+    def get_page(project_slug: str, request: api.HeadToHeadsPageRequest) -> api.HeadToHeadsPage:
+        if request.limit < 1:
+            raise BadRequestError(f"Invalid page limit: {request.limit}")
+        after = HeadToHeadService._decode_cursor(request.cursor) if request.cursor is not None else (0, 0)
+        df_h2h = HeadToHeadService.get_df(
+            project_slug,
+            api.HeadToHeadsRequest(model_a_id=request.model_a_id, model_b_id=request.model_b_id),
+            after=after,
+            limit=request.limit + 1,  # one extra to tell whether there is a next page
+            with_text=not request.ids_only,
+        )
+        next_cursor = None
+        if len(df_h2h) > request.limit:
+            df_h2h = df_h2h.iloc[: request.limit]
+            last = df_h2h.iloc[-1]
+            next_cursor = HeadToHeadService._encode_cursor((int(last.response_a_id), int(last.response_b_id)))
+        if request.ids_only:
+            head_to_heads: list[Union[api.HeadToHead, api.HeadToHeadIds]] = [
+                api.HeadToHeadIds(
+                    response_a_id=r.response_a_id,
+                    response_b_id=r.response_b_id,
+                    history=[api.HeadToHeadHistoryItem(**h) for h in r.history],
+                )
+                for r in df_h2h.itertuples()
+            ]
+        else:
+            head_to_heads = [HeadToHeadService._to_head_to_head(r) for r in df_h2h.itertuples()]
+        return api.HeadToHeadsPage(head_to_heads=head_to_heads, next_cursor=next_cursor)
 
     @staticmethod
     def get_count(project_slug: str) -> int:
         with ProjectService.connect(project_slug) as conn:
-            ((n_h2h,),) = conn.execute(
-                """
-                SELECT COUNT(1) / 2
-                FROM response ra
-                JOIN response rb ON ra.id != rb.id AND ra.prompt = rb.prompt AND ra.model_id != rb.model_id
-                """,
-            ).fetchall()
+            ((n_h2h,),) = conn.execute("SELECT n_pairs FROM response_pair_counter").fetchall()
         return n_h2h
 
     @staticmethod
     def submit_vote(project_slug: str, request: api.HeadToHeadVoteRequest) -> None:
+        if request.winner not in WINNER_CODES:
+            raise BadRequestError(f"Unrecognized winner '{request.winner}', expected one of {set(WINNER_CODES)}")
+
         # 1. ensure judge exists
         JudgeService.create_human_judge(project_slug, request.human_judge_name)
 
+        params = dict(
+            **dataclasses.asdict(request),
+            winner_code=WINNER_CODES[request.winner],
+            judge_name=request.human_judge_name,
+        )
         with ProjectService.connect(project_slug, commit=True) as conn:
             cur = conn.cursor()
 
-            # 2. insert head-to-head record
+            # 2. check for an existing vote from this judge, oriented to match this request
+            existing_winners = cur.execute(
+                """
+                SELECT IIF(h.response_a_id = :response_a_id, h.winner, -h.winner)
+                FROM head_to_head h
+                JOIN judge j ON j.id = h.judge_id
+                WHERE h.response_low_id = MIN(:response_a_id, :response_b_id)
+                AND h.response_high_id = MAX(:response_a_id, :response_b_id)
+                AND j.name = :judge_name
+                """,
+                params,
+            ).fetchall()
+
+            # 3. insert head-to-head record
             cur.execute(
                 """
-                INSERT INTO head_to_head (response_id_slug, response_a_id, response_b_id, judge_id, winner)
-                SELECT :response_id_slug, :response_a_id, :response_b_id, j.id, :winner
+                INSERT INTO head_to_head (response_a_id, response_b_id, judge_id, winner)
+                SELECT :response_a_id, :response_b_id, j.id, :winner_code
                 FROM judge j
                 WHERE j.name = :judge_name
-                ON CONFLICT (response_id_slug, judge_id) DO UPDATE SET
-                    winner = IIF(response_a_id = :response_b_id, invert_winner(EXCLUDED.winner), EXCLUDED.winner)
+                ON CONFLICT (response_low_id, response_high_id, judge_id) DO UPDATE SET
+                    winner = IIF(response_a_id = EXCLUDED.response_a_id, EXCLUDED.winner, -EXCLUDED.winner)
             """,
-                dict(
-                    **dataclasses.asdict(request),
-                    response_id_slug=id_slug(request.response_a_id, request.response_b_id),
-                    judge_name=request.human_judge_name,
-                ),
+                params,
             )
 
-            # 3. adjust elo scores
+            # 4. adjust elo scores -- changed votes can't be applied incrementally and require a full recompute
+            if len(existing_winners) > 0:
+                if existing_winners[0][0] != params["winner_code"]:
+                    EloService.mark_leaderboard_stale(conn, n_changes=1)
+                return
             df_model = pd.read_sql_query(
                 """
                 SELECT id, elo
@@ -136,6 +264,7 @@ class HeadToHeadService:
             elo_a, elo_b = EloService.compute_elo_single(model_a.elo, model_b.elo, request.winner)
             for model_id, elo in [(model_a.id, elo_a), (model_b.id, elo_b)]:
                 cur.execute("UPDATE model SET elo = :elo WHERE id = :model_id", dict(model_id=model_id, elo=elo))
+            EloService.mark_leaderboard_stale(conn, n_votes=1)
 
     @staticmethod
     def upload_head_to_heads(project_slug: str, df_h2h: pd.DataFrame) -> None:  # TODO: return type?
@@ -144,23 +273,56 @@ class HeadToHeadService:
         except ValueError as e:
             raise BadRequestError(str(e))
         df_h2h_deduped = df_h2h.copy()
-        df_h2h_deduped["response_id_slug"] = df_h2h_deduped.apply(
-            lambda r: id_slug(r.response_a_id, r.response_b_id), axis=1
+        try:
+            df_h2h_deduped["winner"] = encode_winners(df_h2h_deduped["winner"])
+        except ValueError as e:
+            raise BadRequestError(str(e))
+        response_ids = (df_h2h_deduped["response_a_id"], df_h2h_deduped["response_b_id"])
+        response_low_id, response_high_id = ordered_pairs(*response_ids)
+        df_h2h_deduped = df_h2h_deduped.assign(response_low_id=response_low_id, response_high_id=response_high_id)
+        df_h2h_deduped = df_h2h_deduped.drop_duplicates(
+            subset=["response_low_id", "response_high_id", "judge_id"],
+            keep="first",
         )
-        df_h2h_deduped = df_h2h_deduped.drop_duplicates(subset=["response_id_slug", "judge_id"], keep="first")
         if len(df_h2h_deduped) != len(df_h2h):
             logger.warning(f"Dropped {len(df_h2h) - len(df_h2h_deduped)} duplicate rows before uploading")
         with ProjectService.connect(project_slug, commit=True) as conn:
-            with temporary_table(conn, df_h2h_deduped) as tmp:
-                conn.execute(f"""
-                    INSERT INTO head_to_head (response_id_slug, response_a_id, response_b_id, judge_id, winner)
-                    SELECT response_id_slug, response_a_id, response_b_id, judge_id, winner
-                    FROM {tmp}
-                    WHERE TRUE
-                    ON CONFLICT (response_id_slug, judge_id) DO UPDATE SET
-                        winner = IIF(
-                            response_a_id = EXCLUDED.response_a_id,
-                            EXCLUDED.winner,
-                            invert_winner(EXCLUDED.winner)
-                        )
-                """)
+            try:
+                execute_many(
+                    conn,
+                    """
+                    INSERT INTO head_to_head (response_a_id, response_b_id, judge_id, winner)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (response_low_id, response_high_id, judge_id) DO UPDATE SET
+                        winner = IIF(response_a_id = EXCLUDED.response_a_id, EXCLUDED.winner, -EXCLUDED.winner)
+                    """,
+                    df_h2h_deduped,
+                    ["response_a_id", "response_b_id", "judge_id", "winner"],
+                )
+            except sqlite3.IntegrityError as e:  # nothing is written, as the transaction is rolled back
+                message = "'response_a_id', 'response_b_id', and 'judge_id' must refer to existing responses and judges"
+                raise BadRequestError(f"Invalid head-to-heads: {message} ({e})")
+            EloService.mark_leaderboard_stale(conn, n_changes=1)  # bulk uploads are not applied incrementally
+
+    @staticmethod
+    def _to_head_to_head(r: Any) -> api.HeadToHead:
+        return api.HeadToHead(
+            prompt=r.prompt,
+            response_a_id=r.response_a_id,
+            response_a=r.response_a,
+            response_b_id=r.response_b_id,
+            response_b=r.response_b,
+            history=[api.HeadToHeadHistoryItem(**h) for h in r.history],
+        )
+
+    @staticmethod
+    def _encode_cursor(after: tuple[int, int]) -> str:
+        return base64.urlsafe_b64encode(f"{after[0]}:{after[1]}".encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple[int, int]:
+        try:
+            response_a_id, response_b_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+            return int(response_a_id), int(response_b_id)
+        except ValueError:
+            raise BadRequestError(f"Invalid cursor: '{cursor}'")
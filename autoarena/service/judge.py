@@ -1,9 +1,13 @@
+from typing import Iterator
+
 from loguru import logger
 import pandas as pd
 
 from autoarena.api import api
 from autoarena.judge.factory import verify_judge_type_environment
 from autoarena.judge.utils import BASIC_SYSTEM_PROMPT
+from autoarena.service.compression import CompressionService
+from autoarena.service.elo import EloService
 from autoarena.service.project import ProjectService
 
 
@@ -26,18 +30,8 @@ class JudgeService:
                     j.system_prompt,
                     j.description,
                     j.enabled,
-                    SUM(IIF(h.id IS NOT NULL, 1, 0)) AS n_votes
+                    j.n_votes
                 FROM judge j
-                LEFT JOIN head_to_head h ON h.judge_id = j.id
-                GROUP BY
-                    j.id,
-                    j.judge_type,
-                    j.created,
-                    j.name,
-                    j.model_name,
-                    j.system_prompt,
-                    j.description,
-                    j.enabled
                 ORDER BY j.id
                 """,
                 conn,
@@ -48,21 +42,27 @@ class JudgeService:
 
     @staticmethod
     def get_df_vote(project_slug: str, judge_id: int) -> pd.DataFrame:
+        return pd.concat(JudgeService.iter_df_vote(project_slug, judge_id), ignore_index=True)
+
+    @staticmethod
+    def iter_df_vote(project_slug: str, judge_id: int, chunk_size: int = 1_000) -> Iterator[pd.DataFrame]:
+        """Read this judge's votes in chunks, holding a connection until the iterator is exhausted"""
         with ProjectService.connect(project_slug) as conn:
-            return pd.read_sql_query(
+            chunks = pd.read_sql_query(
                 """
                 SELECT
                     j.name as judge,
-                    ra.prompt as prompt,
+                    p.text as prompt,
                     ma.name as model_a,
                     mb.name as model_b,
                     ra.response as response_a,
                     rb.response as response_b,
                     h2h.winner as winner
                 FROM judge j
-                JOIN head_to_head h2h ON j.id = h2h.judge_id
+                JOIN head_to_head_labeled h2h ON j.id = h2h.judge_id
                 JOIN response ra ON ra.id = h2h.response_a_id
                 JOIN response rb ON rb.id = h2h.response_b_id
+                JOIN prompt p ON p.id = ra.prompt_id
                 JOIN model ma ON ra.model_id = ma.id
                 JOIN model mb ON rb.model_id = mb.id
                 WHERE j.id = :judge_id
@@ -70,7 +70,10 @@ class JudgeService:
                 """,
                 conn,
                 params=dict(judge_id=judge_id),
+                chunksize=chunk_size,
             )
+            for df_vote in chunks:
+                yield CompressionService.decompress(conn, df_vote, ["prompt", "response_a", "response_b"])
 
     @staticmethod
     def create(project_slug: str, request: api.CreateJudgeRequest) -> api.Judge:
@@ -131,6 +134,7 @@ class JudgeService:
     def delete(project_slug: str, judge_id: int) -> None:
         with ProjectService.connect(project_slug, commit=True) as conn:
             conn.execute("DELETE FROM judge WHERE id = :judge_id", dict(judge_id=judge_id))
+            EloService.mark_leaderboard_stale(conn, n_changes=1)
 
     @staticmethod
     def check_can_access(judge_type: api.JudgeType) -> bool:
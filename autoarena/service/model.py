@@ -1,34 +1,58 @@
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, Optional
+
 import numpy as np
 import pandas as pd
 from loguru import logger
 
 from autoarena.api import api
 from autoarena.error import NotFoundError, BadRequestError
-from autoarena.service.elo import EloService, DEFAULT_ELO_CONFIG
+from autoarena.service.compression import CompressionService
+from autoarena.service.elo import EloService, DEFAULT_ELO_CONFIG, EloConfig
 from autoarena.service.project import ProjectService
-from autoarena.store.database import temporary_table
+from autoarena.store.database import execute_many
 from autoarena.store.utils import check_required_columns
 
 
+RankedByJudgeKey = tuple[Path, int, int, EloConfig]  # project path, judge ID, head-to-head version, config
+
+
+class RankedByJudgeCache:
+    """Thread-safe LRU cache of per-judge ratings and vote counts, computed from that judge's head-to-heads"""
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[RankedByJudgeKey, tuple[pd.DataFrame, pd.DataFrame]] = OrderedDict()
+
+    def get(self, key: RankedByJudgeKey) -> Optional[tuple[pd.DataFrame, pd.DataFrame]]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: RankedByJudgeKey, value: tuple[pd.DataFrame, pd.DataFrame]) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
+
+
+RANKED_BY_JUDGE_CACHE = RankedByJudgeCache()
+
+
 class ModelService:
     MODELS_QUERY = """
-        WITH response_count AS (
-            SELECT r.model_id, COUNT(1) AS response_count
-            FROM response r
-            GROUP BY r.model_id
-        ), vote_count_a AS ( -- this is inelegant but this query is tricky to write
-            SELECT m.id AS model_id, SUM(IIF(h.id IS NOT NULL, 1, 0)) AS vote_count
-            FROM model m
-            JOIN response r ON r.model_id = m.id
-            LEFT JOIN head_to_head h ON r.id = h.response_a_id
-            GROUP BY m.id
-        ), vote_count_b AS (
-            SELECT m.id AS model_id, SUM(IIF(h.id IS NOT NULL, 1, 0)) AS vote_count
-            FROM model m
-            JOIN response r ON r.model_id = m.id
-            LEFT JOIN head_to_head h ON r.id = h.response_b_id
-            GROUP BY m.id
-        )
         SELECT
             id,
             name,
@@ -36,12 +60,9 @@ class ModelService:
             elo,
             q025,
             q975,
-            IFNULL(rc.response_count, 0) AS n_responses,
-            IFNULL(vca.vote_count, 0) + IFNULL(vcb.vote_count, 0) AS n_votes
+            n_responses,
+            n_votes
         FROM model m
-        LEFT JOIN response_count rc ON m.id = rc.model_id
-        LEFT JOIN vote_count_a vca ON m.id = vca.model_id
-        LEFT JOIN vote_count_b vcb ON m.id = vcb.model_id
         """
 
     @staticmethod
@@ -70,24 +91,40 @@ class ModelService:
         return [api.Model(**r) for _, r in df_model.iterrows()]
 
     @staticmethod
-    def get_all_ranked_by_judge(project_slug: str, judge_id: int) -> list[api.Model]:
-        df_h2h = EloService.get_df_head_to_head(project_slug)
-        df_h2h = df_h2h[df_h2h["judge_id"] == judge_id]
-        df_elo = EloService.compute_elo(df_h2h)
+    def get_all_ranked_by_judge(
+        project_slug: str,
+        judge_id: int,
+        config: EloConfig = DEFAULT_ELO_CONFIG,
+    ) -> list[api.Model]:
+        df_elo, df_votes = ModelService._get_ratings_by_judge(project_slug, judge_id, config)
         df_model = ModelService.get_all_df(project_slug)
-        df_out = pd.merge(df_model, df_elo, left_on="name", right_on="model", how="left")
+        df_out = pd.merge(df_model, df_elo, left_on="id", right_on="model_id", how="left")
         df_out[["elo", "q025", "q975"]] = df_out[["elo_y", "q025_y", "q975_y"]]
-        df_out["elo"] = df_out["elo"].replace({np.nan: DEFAULT_ELO_CONFIG.default_score})
+        df_out["elo"] = df_out["elo"].replace({np.nan: config.default_score})
         df_out = df_out.replace({np.nan: None})
-        votes_a, votes_b = df_h2h.model_a_id.value_counts(), df_h2h.model_b_id.value_counts()
-        df_votes = pd.merge(votes_a, votes_b, left_index=True, right_index=True, how="outer")
-        df_votes = df_votes.replace({np.nan: 0})
-        df_votes["n_votes"] = df_votes["count_x"] + df_votes["count_y"]
         df_out = df_out.merge(df_votes, left_on="id", right_index=True, how="left")
         df_out["n_votes"] = df_out["n_votes_y"].replace({np.nan: 0})
         df_out = df_out[["id", "name", "created", "elo", "q025", "q975", "n_responses", "n_votes"]]
         return [api.Model(**r) for _, r in df_out.iterrows()]
 
+    @staticmethod
+    def _get_ratings_by_judge(
+        project_slug: str,
+        judge_id: int,
+        config: EloConfig,
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+        # read the version before the head-to-heads such that concurrent writes can only ever make an entry stale
+        version = EloService.get_head_to_head_version(project_slug, judge_id)
+        key = (ProjectService._slug_to_path(project_slug), judge_id, version, config)
+        if (cached := RANKED_BY_JUDGE_CACHE.get(key)) is not None:
+            return cached
+        h2h = EloService.get_head_to_head_arrays(project_slug, judge_id=judge_id)
+        df_elo = EloService.compute_elo_from_arrays(h2h, config=config)
+        model_ids, n_votes = np.unique(np.concatenate([h2h.model_a_id, h2h.model_b_id]), return_counts=True)
+        df_votes = pd.DataFrame(dict(n_votes=n_votes), index=model_ids)
+        RANKED_BY_JUDGE_CACHE.put(key, (df_elo, df_votes))
+        return df_elo, df_votes
+
     @staticmethod
     def upload_responses(project_slug: str, model_name: str, df_response: pd.DataFrame) -> api.Model:
         try:
@@ -108,12 +145,50 @@ class ModelService:
                 dict(model_name=model_name),
             ).fetchall()
             df_response["model_id"] = new_model_id
-            with temporary_table(conn, df_response) as tmp:
-                cur.execute(f"""
-                    INSERT INTO response (model_id, prompt, response)
-                    SELECT model_id, prompt, response
-                    FROM {tmp}
-                """)
+            compress = CompressionService.get_compressor(conn)
+            if compress is not None:
+                df_response = df_response.assign(
+                    prompt=df_response["prompt"].map(compress),
+                    response=df_response["response"].map(compress),
+                )
+            execute_many(
+                conn,
+                "INSERT INTO prompt (text) VALUES (?) ON CONFLICT (text) DO NOTHING",
+                df_response,
+                ["prompt"],
+            )
+            execute_many(
+                conn,
+                """
+                INSERT INTO response (model_id, prompt_id, response)
+                VALUES (?, (SELECT id FROM prompt WHERE text = ?), ?)
+                """,
+                df_response,
+                ["model_id", "prompt", "response"],
+            )
+            # pair with responses from other models to the same prompts and count, once for the whole upload
+            conn.execute(
+                """
+                INSERT INTO response_pair (prompt_id, response_a_id, response_b_id, model_a_id, model_b_id)
+                SELECT
+                    r.prompt_id,
+                    MIN(r.id, o.id),
+                    MAX(r.id, o.id),
+                    IIF(o.id < r.id, o.model_id, r.model_id),
+                    IIF(o.id < r.id, r.model_id, o.model_id)
+                FROM response r
+                JOIN response o ON o.prompt_id = r.prompt_id AND o.model_id != r.model_id
+                WHERE r.model_id = :model_id
+                """,
+                dict(model_id=new_model_id),
+            )
+            conn.execute(
+                """
+                UPDATE model SET n_responses = (SELECT COUNT(1) FROM response WHERE model_id = :model_id)
+                WHERE id = :model_id
+                """,
+                dict(model_id=new_model_id),
+            )
         models = ModelService.get_all(project_slug)
         new_model = [model for model in models if model.id == new_model_id][0]
         return new_model
@@ -123,6 +198,7 @@ class ModelService:
         params = dict(model_id=model_id)
         with ProjectService.connect(project_slug, commit=True) as conn:
             conn.execute("DELETE FROM model WHERE id = :model_id", params)  # let cascading deletes handle the rest
+            EloService.mark_leaderboard_stale(conn, n_changes=1)
 
     @staticmethod
     def get_responses(project_slug: str, model_id: int) -> list[api.ModelResponse]:
@@ -130,51 +206,94 @@ class ModelService:
         return [api.ModelResponse(prompt=r.prompt, response=r.response) for r in df_response.itertuples()]
 
     @staticmethod
-    def get_df_response(project_slug: str, model_id: int) -> pd.DataFrame:
+    def get_responses_by_id(project_slug: str, response_ids: list[int]) -> list[api.Response]:
+        """Get responses in the order requested, skipping any that do not exist"""
         with ProjectService.connect(project_slug) as conn:
             df_response = pd.read_sql_query(
+                """
+                SELECT r.id, r.model_id, p.text AS prompt, r.response
+                FROM JSON_EACH(:response_ids) ids
+                JOIN response r ON r.id = ids.value
+                JOIN prompt p ON p.id = r.prompt_id
+                ORDER BY ids.key
+                """,
+                conn,
+                params=dict(response_ids=json.dumps(response_ids)),
+            )
+            df_response = CompressionService.decompress(conn, df_response, ["prompt", "response"])
+        return [
+            api.Response(id=r.id, model_id=r.model_id, prompt=r.prompt, response=r.response)
+            for r in df_response.itertuples()
+        ]
+
+    @staticmethod
+    def get_df_response(project_slug: str, model_id: int) -> pd.DataFrame:
+        return pd.concat(ModelService.iter_df_response(project_slug, model_id), ignore_index=True)
+
+    @staticmethod
+    def iter_df_response(project_slug: str, model_id: int, chunk_size: int = 1_000) -> Iterator[pd.DataFrame]:
+        """Read responses in chunks of `chunk_size` rows, holding a connection until the iterator is exhausted"""
+        with ProjectService.connect(project_slug) as conn:
+            chunks = pd.read_sql_query(
                 """
                 SELECT
                     m.name AS model,
                     r.id AS response_id,
-                    r.prompt AS prompt,
+                    p.text AS prompt,
                     r.response AS response
                 FROM model m
                 JOIN response r ON m.id = r.model_id
+                JOIN prompt p ON p.id = r.prompt_id
                 WHERE m.id = :model_id
                 """,
                 conn,
                 params=dict(model_id=model_id),
+                chunksize=chunk_size,
             )
-        if len(df_response) == 0:
-            raise NotFoundError(f"Model with ID '{model_id}' not found")  # model can't exist without any responses
-        return df_response
+            for i, df_response in enumerate(chunks):
+                if i == 0 and len(df_response) == 0:
+                    # model can't exist without any responses
+                    raise NotFoundError(f"Model with ID '{model_id}' not found")
+                yield CompressionService.decompress(conn, df_response, ["prompt", "response"])
 
     @staticmethod
     def get_df_head_to_head(project_slug: str, model_id: int) -> pd.DataFrame:
+        return pd.concat(ModelService.iter_df_head_to_head(project_slug, model_id), ignore_index=True)
+
+    @staticmethod
+    def iter_df_head_to_head(project_slug: str, model_id: int, chunk_size: int = 1_000) -> Iterator[pd.DataFrame]:
+        """Read votes on this model's responses in chunks, holding a connection until the iterator is exhausted"""
         with ProjectService.connect(project_slug) as conn:
-            return pd.read_sql_query(
+            chunks = pd.read_sql_query(
                 """
+                WITH model_head_to_head AS ( -- look up rather than scan head-to-heads, via either response
+                    SELECT h.id FROM response r JOIN head_to_head h ON r.id = h.response_a_id WHERE r.model_id = :model_id
+                    UNION ALL
+                    SELECT h.id FROM response r JOIN head_to_head h ON r.id = h.response_b_id WHERE r.model_id = :model_id
+                )
                 SELECT
-                    ra.prompt,
+                    p.text AS prompt,
                     ma.name AS model_a,
                     mb.name AS model_b,
                     ra.response AS response_a,
                     rb.response AS response_b,
                     j.name AS judge,
                     h.winner
-                FROM head_to_head h
+                FROM model_head_to_head mh
+                JOIN head_to_head_labeled h ON h.id = mh.id
                 JOIN judge j ON h.judge_id = j.id
                 JOIN response ra ON ra.id = h.response_a_id
                 JOIN response rb ON rb.id = h.response_b_id
+                JOIN prompt p ON p.id = ra.prompt_id
                 JOIN model ma ON ma.id = ra.model_id
                 JOIN model mb ON mb.id = rb.model_id
-                WHERE ma.id = :model_id
-                OR mb.id = :model_id
                 """,
                 conn,
                 params=dict(model_id=model_id),
+                chunksize=chunk_size,
             )
+            for df_h2h in chunks:
+                yield CompressionService.decompress(conn, df_h2h, ["prompt", "response_a", "response_b"])
 
     @staticmethod
     def get_head_to_head_stats(project_slug: str, model_id: int) -> list[api.ModelHeadToHeadStats]:
@@ -186,19 +305,21 @@ class ModelService:
                         ra.model_id,
                         rb.model_id AS other_model_id,
                         h.judge_id,
-                        CASE WHEN h.winner = 'A' THEN TRUE WHEN h.winner = 'B' THEN FALSE END AS won
-                    FROM head_to_head h
-                    JOIN response ra ON ra.id = h.response_a_id
+                        CASE WHEN h.winner = 1 THEN TRUE WHEN h.winner = -1 THEN FALSE END AS won
+                    FROM response ra
+                    JOIN head_to_head h ON ra.id = h.response_a_id
                     JOIN response rb ON rb.id = h.response_b_id
+                    WHERE ra.model_id = :model_id -- filter each side here to look up rather than scan head-to-heads
                     UNION ALL
                     SELECT
                         rb.model_id,
                         ra.model_id AS other_model_id,
                         h.judge_id,
-                        CASE WHEN h.winner = 'B' THEN TRUE WHEN h.winner = 'A' THEN FALSE END AS won
-                    FROM head_to_head h
+                        CASE WHEN h.winner = -1 THEN TRUE WHEN h.winner = 1 THEN FALSE END AS won
+                    FROM response rb
+                    JOIN head_to_head h ON rb.id = h.response_b_id
                     JOIN response ra ON ra.id = h.response_a_id
-                    JOIN response rb ON rb.id = h.response_b_id
+                    WHERE rb.model_id = :model_id
                 )
                 SELECT
                     m_other.id AS other_model_id,
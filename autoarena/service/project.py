@@ -1,13 +1,19 @@
 import sqlite3
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator
+from typing import Callable, Iterator
 
 from loguru import logger
 
 from autoarena.api import api
 from autoarena.error import NotFoundError, MigrationError
-from autoarena.store.database import get_database_connection, get_available_migrations, DataDirectoryProvider
+from autoarena.store.database import (
+    get_database_connection,
+    get_available_migrations,
+    get_storage_profile,
+    DataDirectoryProvider,
+    CONNECTION_POOL,
+)
 
 
 class ProjectService:
@@ -38,8 +44,12 @@ class ProjectService:
 
     @staticmethod
     def delete(slug: str) -> None:
+        from autoarena.service.model import RANKED_BY_JUDGE_CACHE
+
         path = ProjectService._slug_to_path(slug)
+        CONNECTION_POOL.close(path)
         path.unlink(missing_ok=True)
+        RANKED_BY_JUDGE_CACHE.invalidate(path)  # a new project with the same slug starts its versions over
         logger.info(f"Removed file '{path}' containing project '{slug}'")
 
     @staticmethod
@@ -49,6 +59,65 @@ class ProjectService:
             ProjectService._setup_database(path)
             logger.info(f"Found project '{path.relative_to(Path.cwd())}'")
 
+    @staticmethod
+    def repair_counters(slug: str) -> None:
+        """Recompute the response and vote counters otherwise maintained by triggers on every write"""
+        with ProjectService.connect(slug, commit=True) as conn:
+            conn.execute(
+                """
+                UPDATE model SET
+                    n_responses = (SELECT COUNT(1) FROM response r WHERE r.model_id = model.id),
+                    n_votes = (
+                        SELECT COUNT(1) FROM response r JOIN head_to_head h ON h.response_a_id = r.id
+                        WHERE r.model_id = model.id
+                    ) + (
+                        SELECT COUNT(1) FROM response r JOIN head_to_head h ON h.response_b_id = r.id
+                        WHERE r.model_id = model.id
+                    )
+                """
+            )
+            conn.execute("UPDATE judge SET n_votes = (SELECT COUNT(1) FROM head_to_head h WHERE h.judge_id = judge.id)")
+            conn.execute("UPDATE response_pair_counter SET n_pairs = (SELECT COUNT(1) FROM response_pair)")
+        logger.info(f"Repaired counters for project '{slug}'")
+
+    @staticmethod
+    def maintain(
+        slug: str,
+        log: Callable[[str], None] = logger.info,
+        full_vacuum: bool = False,
+        min_free_fraction: float = 0.1,
+    ) -> None:
+        """
+        Checkpoint the write-ahead log, reclaim free pages, and refresh statistics used by the query planner. Files
+        created before incremental vacuuming was enabled are only converted, by a full vacuum that blocks writers and
+        temporarily needs about as much disk again as the file, when `full_vacuum` is requested.
+        """
+        with ProjectService.connect(slug, commit=True) as conn:
+            conn.commit()  # none of these can run within the transaction opened for writing
+            busy, n_wal_pages, n_checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            log(f"Checkpointed {n_checkpointed} of {n_wal_pages} write-ahead log page(s)" + (" (busy)" if busy else ""))
+
+            ((auto_vacuum,),) = conn.execute("PRAGMA auto_vacuum").fetchall()
+            ((n_free_pages,),) = conn.execute("PRAGMA freelist_count").fetchall()
+            ((n_pages,),) = conn.execute("PRAGMA page_count").fetchall()
+            vacuumed = False
+            if auto_vacuum == 2:  # incremental
+                # run as a script, which steps until done, unlike execute, which frees a single page
+                conn.executescript("PRAGMA incremental_vacuum")
+                log(f"Reclaimed {n_free_pages} free page(s) of {n_pages}")
+            elif full_vacuum and n_free_pages > min_free_fraction * n_pages:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                vacuumed = True
+                log(f"Vacuumed {n_free_pages} free page(s) of {n_pages} and enabled incremental vacuuming")
+            else:
+                log(f"Skipped vacuum with {n_free_pages} free page(s) of {n_pages}")
+
+            conn.execute("PRAGMA optimize")
+            log("Optimized query planner statistics")
+            if vacuumed:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()  # vacuuming rewrites the file via the log
+
     @staticmethod
     def _path_to_slug(path: Path) -> str:
         return path.stem
@@ -81,6 +150,12 @@ class ProjectService:
             except Exception as e:
                 logger.error(f"Failed to apply migration '{migration.name}' to '{path.name}': {e}")
                 raise MigrationError(e)
+        with get_database_connection(path) as conn:
+            ((page_size,),) = conn.execute("PRAGMA page_size").fetchall()
+        if page_size != get_storage_profile().page_size:
+            logger.info(
+                f"Database '{path.name}' has page size {page_size}, configured size only applies to new projects"
+            )
 
     @staticmethod
     def _get_applied_migrations(path: Path) -> list[tuple[int, str]]:
@@ -95,9 +170,11 @@ class ProjectService:
     # TODO: restart pending tasks rather than simply terminating
     @staticmethod
     def _close_pending_tasks(path: Path) -> None:
+        from autoarena.service.elo import EloService
         from autoarena.service.task import TaskService
 
         slug = ProjectService._path_to_slug(path)
+        EloService.release_recompute(slug)  # any recompute that was running did not survive the restart
         tasks = TaskService.get_all(slug)
         for task in tasks:
             if task.status not in {api.TaskStatus.COMPLETED, api.TaskStatus.FAILED}:
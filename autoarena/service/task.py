@@ -67,12 +67,22 @@ class TaskService:
             await asyncio.sleep(0.2)
 
     @staticmethod
-    def has_active(project_slug: str) -> api.HasActiveTasks:
+    def has_active(project_slug: str, task_type: Optional[api.TaskType] = None) -> api.HasActiveTasks:
         with ProjectService.connect(project_slug) as conn:
             cur = conn.cursor()
             records = cur.execute(
-                "SELECT 1 WHERE EXISTS (SELECT 1 FROM task WHERE status IN (:started, :in_progress))",
-                dict(started=api.TaskStatus.STARTED.value, in_progress=api.TaskStatus.IN_PROGRESS.value),
+                """
+                SELECT 1 WHERE EXISTS (
+                    SELECT 1 FROM task
+                    WHERE status IN (:started, :in_progress)
+                    AND (:task_type IS NULL OR task_type = :task_type)
+                )
+                """,
+                dict(
+                    started=api.TaskStatus.STARTED.value,
+                    in_progress=api.TaskStatus.IN_PROGRESS.value,
+                    task_type=task_type.value if task_type is not None else None,
+                ),
             ).fetchall()
             return api.HasActiveTasks(has_active=len(records) > 0)
 
@@ -139,17 +149,30 @@ class TaskService:
         return datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
 
     # TODO: should this really be a long-running task? It only takes ~5 seconds for ~50k head-to-heads
+    # NOTE: schedule via LeaderboardScheduler rather than calling directly to coalesce concurrent requests
     @staticmethod
     def recompute_leaderboard(project_slug: str) -> None:
-        task_objects = TaskService.get_all(project_slug)
-        if len([t for t in task_objects if t.task_type is api.TaskType.RECOMPUTE_LEADERBOARD and t.progress < 1]) > 0:
-            return  # only recompute if there isn't already a task in progress
         task_id = TaskService.create(project_slug, api.TaskType.RECOMPUTE_LEADERBOARD).id
         try:
             EloService.reseed_scores(project_slug)
         finally:
             TaskService.update(project_slug, task_id, "Done", progress=1, status=api.TaskStatus.COMPLETED)
 
+    # NOTE: schedule via MaintenanceScheduler rather than calling directly to avoid concurrent runs
+    @staticmethod
+    def maintain(project_slug: str, full_vacuum: bool = False) -> None:
+        task_id = TaskService.create(project_slug, api.TaskType.MAINTENANCE).id
+        try:
+            ProjectService.maintain(
+                project_slug,
+                log=lambda message: TaskService.update(project_slug, task_id, message),
+                full_vacuum=full_vacuum,
+            )
+        except Exception as e:
+            TaskService.update(project_slug, task_id, f"Failed: {e}", status=api.TaskStatus.FAILED)
+            raise e
+        TaskService.update(project_slug, task_id, "Done", progress=1, status=api.TaskStatus.COMPLETED)
+
     @staticmethod
     def auto_judge(
         project_slug: str,
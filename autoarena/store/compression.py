@@ -0,0 +1,58 @@
+import re
+import struct
+import zlib
+from collections import Counter
+from typing import Iterable, Optional, Union
+
+import pandas as pd
+
+HEADER = struct.Struct(">I")  # ID of the dictionary a value was compressed with, 0 for none
+
+
+def compress_text(text: str, dictionary_id: Optional[int] = None, dictionary: bytes = b"") -> bytes:
+    compressor = zlib.compressobj(level=9, zdict=dictionary) if dictionary else zlib.compressobj(level=9)
+    return HEADER.pack(dictionary_id or 0) + compressor.compress(text.encode("utf-8")) + compressor.flush()
+
+
+def compress_text_if_smaller(
+    text: str, dictionary_id: Optional[int] = None, dictionary: bytes = b""
+) -> Union[bytes, str]:
+    """Compress `text`, unless the header and compressed data take more space than the text itself"""
+    compressed = compress_text(text, dictionary_id, dictionary)
+    return compressed if len(compressed) < len(text.encode("utf-8")) else text
+
+
+def decompress_text(value: bytes, dictionaries: dict[int, bytes]) -> str:
+    (dictionary_id,) = HEADER.unpack_from(value)
+    data = value[HEADER.size :]
+    decompressor = zlib.decompressobj(zdict=dictionaries[dictionary_id]) if dictionary_id else zlib.decompressobj()
+    return (decompressor.decompress(data) + decompressor.flush()).decode("utf-8")
+
+
+def is_compressed(values: pd.Series) -> pd.Series:
+    return values.map(lambda v: isinstance(v, bytes))
+
+
+def decompress_texts(values: pd.Series, dictionaries: dict[int, bytes]) -> pd.Series:
+    """Decompress any compressed values, passing through those stored as text"""
+    return values.map(lambda v: decompress_text(v, dictionaries) if isinstance(v, bytes) else v)
+
+
+def train_dictionary(texts: Iterable[str], size: int = 32_768, n_words: int = 2) -> bytes:
+    """
+    Build a zlib preset dictionary from the runs of `n_words` words that recur most across `texts`. zlib can only
+    refer back 32 KiB, and refers back most cheaply to the end of the dictionary, so the most valuable runs go last.
+    """
+    counts: Counter[str] = Counter()
+    for text in texts:
+        words = re.findall(r"\S+\s*", text)
+        counts.update({"".join(words[i : i + n_words]) for i in range(max(len(words) - n_words + 1, 0))})
+    recurring = [(chunk, count) for chunk, count in counts.items() if count > 1]
+    chunks, n_bytes = [], 0
+    for chunk, count in sorted(recurring, key=lambda c: c[1] * len(c[0]), reverse=True):
+        encoded = chunk.encode("utf-8")
+        if n_bytes + len(encoded) > size:
+            continue
+        chunks.append(encoded)
+        n_bytes += len(encoded)
+    return b"".join(reversed(chunks))
@@ -1,5 +1,8 @@
+import dataclasses
+import os
 import sqlite3
-import uuid
+import threading
+from collections import OrderedDict, defaultdict
 from contextlib import contextmanager
 from contextvars import ContextVar
 from pathlib import Path
@@ -7,44 +10,195 @@ from typing import Iterator
 
 import pandas as pd
 
-from autoarena.store.utils import id_slug, invert_winner
-
 MIGRATION_DIRECTORY = Path(__file__).parent / "migration"
 
 DataDirectoryProvider: ContextVar[Path] = ContextVar("_DATA_DIRECTORY", default=Path.cwd() / "data")
 
+STORAGE_PROFILE_ENV = "AUTOARENA_STORAGE_PROFILE"
+
+
+@dataclasses.dataclass(frozen=True)
+class StorageProfile:
+    """SQLite settings applied to every project database connection, see https://www.sqlite.org/pragma.html"""
+
+    mmap_size: int  # bytes of the file read through a memory map rather than copied into the page cache
+    cache_size: int  # page cache per connection, in KiB when negative
+    synchronous: str  # NORMAL is safe from corruption under WAL, but may lose the latest commits on power loss
+    temp_store: str
+    page_size: int  # only takes effect for new databases, as it can't be changed by vacuuming in WAL mode
+
+
+STORAGE_PROFILES = {
+    # SQLite's own defaults
+    "default": StorageProfile(
+        mmap_size=0,
+        cache_size=-2_000,
+        synchronous="FULL",
+        temp_store="DEFAULT",
+        page_size=4_096,
+    ),
+    # opt-in for large, read-heavy project files, trading durability of the latest commits on power loss for speed
+    "performance": StorageProfile(
+        mmap_size=2**30,
+        cache_size=-64_000,
+        synchronous="NORMAL",
+        temp_store="MEMORY",
+        page_size=8_192,
+    ),
+}
+DEFAULT_STORAGE_PROFILE = "default"
+
+
+def get_storage_profile() -> StorageProfile:
+    name = os.environ.get(STORAGE_PROFILE_ENV, DEFAULT_STORAGE_PROFILE)
+    try:
+        return STORAGE_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unrecognized storage profile '{name}', expected one of {set(STORAGE_PROFILES)}")
+
+
+class ConnectionPool:
+    """
+    Reuse configured connections per database file and access mode rather than opening one for every query. Idle
+    connections are checked before reuse and the least recently used are closed beyond `max_size` in total.
+    """
+
+    def __init__(self, max_size: int = 32, max_idle_per_database: int = 4):
+        self.max_size = max_size
+        self.max_idle_per_database = max_idle_per_database
+        self._lock = threading.Lock()
+        # idle connections with the inode of the file they were opened on, most recently used pool last
+        self._idle: OrderedDict[tuple[Path, bool], list[tuple[sqlite3.Connection, int]]] = OrderedDict()
+        self._generation: dict[Path, int] = defaultdict(int)  # bumped on close to discard connections in use
+
+    def acquire(self, path: Path, commit: bool) -> tuple[sqlite3.Connection, int, int]:
+        key = (path, commit)
+        while True:
+            with self._lock:
+                generation = self._generation[path]
+                idle = self._idle.get(key, [])
+                pooled = idle.pop() if len(idle) > 0 else None
+            if pooled is None:
+                return ConnectionPool._open(path, commit), path.stat().st_ino, generation
+            conn, inode = pooled
+            if ConnectionPool._is_healthy(conn, path, inode):
+                return conn, inode, generation
+            conn.close()
+
+    def release(
+        self,
+        path: Path,
+        commit: bool,
+        conn: sqlite3.Connection,
+        inode: int,
+        generation: int,
+        discard: bool = False,
+    ) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        key = (path, commit)
+        to_close = []
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if not discard and generation == self._generation[path] and len(idle) < self.max_idle_per_database:
+                idle.append((conn, inode))
+                self._idle.move_to_end(key)
+            else:
+                to_close.append(conn)
+            n_idle = sum(len(conns) for conns in self._idle.values())
+            for pool_key in list(self._idle.keys()):
+                if n_idle <= self.max_size:
+                    break
+                while n_idle > self.max_size and len(self._idle[pool_key]) > 0:
+                    to_close.append(self._idle[pool_key].pop(0)[0])
+                    n_idle -= 1
+                if len(self._idle[pool_key]) == 0:
+                    del self._idle[pool_key]
+        for conn in to_close:
+            conn.close()
+
+    def close(self, path: Path) -> None:
+        """Close idle connections to this database and ensure those in use are closed rather than returned"""
+        with self._lock:
+            self._generation[path] += 1
+            to_close = [conn for commit in (False, True) for conn, _ in self._idle.pop((path, commit), [])]
+        for conn in to_close:
+            conn.close()
+
+    @staticmethod
+    def _open(path: Path, commit: bool) -> sqlite3.Connection:
+        mode = "rwc" if commit else "ro"  # open in readonly mode unless configured to commit
+        # connections are handed between threads, but only ever used by one at a time
+        conn = sqlite3.connect(f"file:{path}?mode={mode}", timeout=10, uri=True, check_same_thread=False)
+        try:
+            profile = get_storage_profile()
+            if commit:  # before the file is first written if it's new, otherwise these apply once it's vacuumed
+                conn.execute(f"PRAGMA page_size = {profile.page_size}")  # first, as other pragmas fix the size
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(f"PRAGMA mmap_size = {profile.mmap_size}")
+            conn.execute(f"PRAGMA cache_size = {profile.cache_size}")
+            conn.execute(f"PRAGMA synchronous = {profile.synchronous}")
+            conn.execute(f"PRAGMA temp_store = {profile.temp_store}")
+        except Exception as e:
+            conn.close()
+            raise e
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection, path: Path, inode: int) -> bool:
+        try:
+            if path.stat().st_ino != inode:
+                return False  # file was replaced since this connection was opened
+            conn.execute("SELECT 1").fetchall()
+            return True
+        except (OSError, sqlite3.Error):
+            return False
+
+    def _reset(self) -> None:
+        # connections must not be used across a fork, abandon (rather than close) any inherited from the parent
+        self._lock = threading.Lock()
+        self._idle = OrderedDict()
+        self._generation = defaultdict(int)
+
+
+CONNECTION_POOL = ConnectionPool()
+os.register_at_fork(after_in_child=CONNECTION_POOL._reset)
+
 
 @contextmanager
 def get_database_connection(path: Path, commit: bool = False) -> Iterator[sqlite3.Connection]:
-    mode = "rwc" if commit else "ro"  # open in readonly mode unless configured to commit
-    conn = sqlite3.connect(f"file:{path}?mode={mode}", timeout=10, uri=True)
-    cur = conn.cursor()
+    conn, inode, generation = CONNECTION_POOL.acquire(path, commit)
+    failed = False
     try:
-        conn.create_function("id_slug", 2, id_slug)
-        conn.create_function("invert_winner", 1, invert_winner)
-        cur.execute("PRAGMA foreign_keys = ON")
-        cur.execute("PRAGMA journal_mode = WAL")
         if commit:
-            cur.execute("BEGIN IMMEDIATE TRANSACTION")
+            conn.execute("BEGIN IMMEDIATE TRANSACTION")
         yield conn
         if commit:
             conn.commit()
     except Exception as e:
+        failed = True
         if commit:
             conn.rollback()
         raise e
     finally:
-        conn.close()
+        # don't reuse connections that errored, as their state (e.g. pragmas set by a migration) is unknown
+        CONNECTION_POOL.release(path, commit, conn, inode, generation, discard=failed)
 
 
-@contextmanager
-def temporary_table(conn: sqlite3.Connection, df: pd.DataFrame) -> Iterator[str]:
-    table_name = f"tmp_{uuid.uuid4()}".replace("-", "_")
-    df.to_sql(table_name, conn, if_exists="fail", index=False)
-    try:
-        yield table_name
-    finally:
-        conn.execute(f"DROP TABLE {table_name}")
+def execute_many(
+    conn: sqlite3.Connection,
+    statement: str,
+    df: pd.DataFrame,
+    columns: list[str],
+    chunk_size: int = 10_000,
+) -> None:
+    """Execute a statement with `?` placeholders once per row of `columns`, streaming rows in chunks"""
+    for start in range(0, len(df), chunk_size):
+        df_chunk = df.iloc[start : start + chunk_size]
+        # tolist converts NumPy scalars to the Python types that sqlite3 can bind
+        conn.executemany(statement, zip(*(df_chunk[column].to_numpy().tolist() for column in columns)))
 
 
 def get_available_migrations() -> list[Path]:
@@ -0,0 +1,9 @@
+-- single-row record of how far the stored leaderboard lags behind the head-to-heads in this project
+CREATE TABLE IF NOT EXISTS leaderboard_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    n_pending_votes INTEGER NOT NULL DEFAULT 0, -- new votes applied incrementally since the last full recompute
+    n_pending_changes INTEGER NOT NULL DEFAULT 0, -- changed or deleted votes, which can't be applied incrementally
+    updated TIMESTAMPTZ NOT NULL DEFAULT current_timestamp -- time of the last full recompute
+);
+
+INSERT INTO leaderboard_state (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,2 @@
+-- set while a leaderboard recompute is running such that only one process recomputes a project at a time
+ALTER TABLE leaderboard_state ADD COLUMN recompute_started TIMESTAMPTZ;
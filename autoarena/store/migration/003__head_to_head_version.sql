@@ -0,0 +1,28 @@
+-- per-judge counter bumped by any change to that judge's head-to-heads, used to key cached leaderboards
+CREATE TABLE IF NOT EXISTS head_to_head_version (
+    judge_id INTEGER PRIMARY KEY, -- no foreign key as rows are still written while cascading judge deletes
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS head_to_head_version_insert AFTER INSERT ON head_to_head
+BEGIN
+    INSERT INTO head_to_head_version (judge_id, version) VALUES (NEW.judge_id, 1)
+    ON CONFLICT (judge_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS head_to_head_version_update AFTER UPDATE ON head_to_head
+WHEN OLD.winner IS NOT NEW.winner
+    OR OLD.judge_id IS NOT NEW.judge_id
+    OR OLD.response_a_id IS NOT NEW.response_a_id
+    OR OLD.response_b_id IS NOT NEW.response_b_id
+BEGIN
+    INSERT INTO head_to_head_version (judge_id, version)
+    SELECT judge_id, 1 FROM (SELECT OLD.judge_id AS judge_id UNION SELECT NEW.judge_id) WHERE TRUE
+    ON CONFLICT (judge_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS head_to_head_version_delete AFTER DELETE ON head_to_head
+BEGIN
+    INSERT INTO head_to_head_version (judge_id, version) VALUES (OLD.judge_id, 1)
+    ON CONFLICT (judge_id) DO UPDATE SET version = version + 1;
+END;
@@ -0,0 +1,2 @@
+-- serve per-judge head-to-head reads, in submission order, without scanning the whole table
+CREATE INDEX IF NOT EXISTS head_to_head_judge_id_idx ON head_to_head (judge_id, id);
@@ -0,0 +1,40 @@
+-- materialized sequential Elo history, extended every few votes, for each judge (judge_id) or across all (null)
+CREATE TABLE IF NOT EXISTS elo_history (
+    judge_id INTEGER, -- null for history across all judges
+    head_to_head_id INTEGER NOT NULL,
+    model_a_id INTEGER NOT NULL,
+    model_b_id INTEGER NOT NULL,
+    elo_a DOUBLE PRECISION NOT NULL, -- ratings after this head-to-head was applied
+    elo_b DOUBLE PRECISION NOT NULL
+);
+CREATE INDEX IF NOT EXISTS elo_history_model_a_idx ON elo_history (judge_id, model_a_id, head_to_head_id);
+CREATE INDEX IF NOT EXISTS elo_history_model_b_idx ON elo_history (judge_id, model_b_id, head_to_head_id);
+CREATE INDEX IF NOT EXISTS elo_history_head_to_head_idx ON elo_history (judge_id, head_to_head_id);
+
+-- ratings of every model at the end of each materialized stretch of elo_history, for replay to resume from
+CREATE TABLE IF NOT EXISTS elo_checkpoint (
+    judge_id INTEGER, -- null for checkpoints across all judges
+    head_to_head_id INTEGER NOT NULL, -- ratings after all head-to-heads up to and including this one
+    model_id INTEGER NOT NULL,
+    elo DOUBLE PRECISION NOT NULL
+);
+CREATE INDEX IF NOT EXISTS elo_checkpoint_idx ON elo_checkpoint (judge_id, head_to_head_id);
+
+-- history is only valid while the head-to-heads it replayed are unchanged, drop anything from a changed one onwards
+CREATE TRIGGER IF NOT EXISTS elo_history_truncate_update AFTER UPDATE ON head_to_head
+WHEN OLD.winner IS NOT NEW.winner
+    OR OLD.judge_id IS NOT NEW.judge_id
+    OR OLD.response_a_id IS NOT NEW.response_a_id
+    OR OLD.response_b_id IS NOT NEW.response_b_id
+BEGIN
+    DELETE FROM elo_history
+    WHERE (judge_id IS NULL OR judge_id IN (OLD.judge_id, NEW.judge_id)) AND head_to_head_id >= OLD.id;
+    DELETE FROM elo_checkpoint
+    WHERE (judge_id IS NULL OR judge_id IN (OLD.judge_id, NEW.judge_id)) AND head_to_head_id >= OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS elo_history_truncate_delete AFTER DELETE ON head_to_head
+BEGIN
+    DELETE FROM elo_history WHERE (judge_id IS NULL OR judge_id = OLD.judge_id) AND head_to_head_id >= OLD.id;
+    DELETE FROM elo_checkpoint WHERE (judge_id IS NULL OR judge_id = OLD.judge_id) AND head_to_head_id >= OLD.id;
+END;
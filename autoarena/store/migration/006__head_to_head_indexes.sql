@@ -0,0 +1,7 @@
+-- covering indexes for looking up head-to-heads by their responses, in either order, as done when listing
+-- head-to-heads for a pair of models and counting votes per model
+CREATE INDEX IF NOT EXISTS head_to_head_response_a_idx ON head_to_head (response_a_id, response_b_id, judge_id, winner);
+CREATE INDEX IF NOT EXISTS head_to_head_response_b_idx ON head_to_head (response_b_id, response_a_id, judge_id, winner);
+
+-- refresh the statistics used by the query planner to pick between indexes
+ANALYZE;
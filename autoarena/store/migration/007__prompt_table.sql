@@ -0,0 +1,39 @@
+-- store each distinct prompt once and refer to it by ID from responses, such that responses from different models
+-- are paired on an integer rather than on the full prompt text
+CREATE TABLE IF NOT EXISTS prompt (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text TEXT NOT NULL UNIQUE
+);
+
+-- rebuild the response table without its prompt column, following https://www.sqlite.org/lang_altertable.html#otheralter
+-- foreign keys are disabled such that dropping the old table does not cascade to head_to_head
+PRAGMA foreign_keys = OFF;
+BEGIN;
+
+INSERT INTO prompt (text) SELECT DISTINCT prompt FROM response WHERE TRUE ON CONFLICT (text) DO NOTHING;
+
+CREATE TABLE response_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    model_id INTEGER NOT NULL,
+    prompt_id INTEGER NOT NULL,
+    created TIMESTAMPTZ NOT NULL DEFAULT current_timestamp,
+    response TEXT NOT NULL,
+    FOREIGN KEY (model_id) REFERENCES model (id) ON DELETE CASCADE,
+    FOREIGN KEY (prompt_id) REFERENCES prompt (id),
+    -- TODO: should we allow dupes for nondeterminism? This is a convenience to skip duplicate inserts
+    UNIQUE (model_id, prompt_id)
+);
+INSERT INTO response_new (id, model_id, prompt_id, created, response)
+SELECT r.id, r.model_id, p.id, r.created, r.response
+FROM response r
+JOIN prompt p ON p.text = r.prompt;
+-- carry over the sequence such that IDs of deleted responses are not reused
+UPDATE sqlite_sequence
+SET seq = (SELECT seq FROM sqlite_sequence WHERE name = 'response')
+WHERE name = 'response_new' AND EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'response');
+DROP TABLE response;
+ALTER TABLE response_new RENAME TO response;
+CREATE INDEX IF NOT EXISTS response_prompt_id_idx ON response (prompt_id, model_id);
+
+COMMIT;
+PRAGMA foreign_keys = ON;
@@ -0,0 +1,37 @@
+-- one row per pair of responses from different models to the same prompt, maintained as responses are added (below)
+-- and removed (via cascading deletes) rather than derived with a self-join on every read
+CREATE TABLE IF NOT EXISTS response_pair (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    response_id_slug TEXT NOT NULL UNIQUE, -- see id_slug macro
+    prompt_id INTEGER NOT NULL,
+    response_a_id INTEGER NOT NULL, -- the lower of the two response IDs
+    response_b_id INTEGER NOT NULL,
+    model_a_id INTEGER NOT NULL,
+    model_b_id INTEGER NOT NULL,
+    FOREIGN KEY (response_a_id) REFERENCES response (id) ON DELETE CASCADE,
+    FOREIGN KEY (response_b_id) REFERENCES response (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS response_pair_model_a_idx ON response_pair (model_a_id, model_b_id);
+CREATE INDEX IF NOT EXISTS response_pair_model_b_idx ON response_pair (model_b_id, model_a_id);
+CREATE INDEX IF NOT EXISTS response_pair_response_a_idx ON response_pair (response_a_id);
+CREATE INDEX IF NOT EXISTS response_pair_response_b_idx ON response_pair (response_b_id);
+
+INSERT INTO response_pair (response_id_slug, prompt_id, response_a_id, response_b_id, model_a_id, model_b_id)
+SELECT ra.id || '-' || rb.id, ra.prompt_id, ra.id, rb.id, ra.model_id, rb.model_id
+FROM response ra
+JOIN response rb ON ra.prompt_id = rb.prompt_id AND ra.id < rb.id AND ra.model_id != rb.model_id;
+
+-- slug is built inline rather than with id_slug such that inserts work from any connection
+CREATE TRIGGER IF NOT EXISTS response_pair_insert AFTER INSERT ON response
+BEGIN
+    INSERT INTO response_pair (response_id_slug, prompt_id, response_a_id, response_b_id, model_a_id, model_b_id)
+    SELECT
+        MIN(r.id, NEW.id) || '-' || MAX(r.id, NEW.id),
+        NEW.prompt_id,
+        MIN(r.id, NEW.id),
+        MAX(r.id, NEW.id),
+        IIF(r.id < NEW.id, r.model_id, NEW.model_id),
+        IIF(r.id < NEW.id, NEW.model_id, r.model_id)
+    FROM response r
+    WHERE r.prompt_id = NEW.prompt_id AND r.model_id != NEW.model_id;
+END;
@@ -0,0 +1,50 @@
+-- counters kept current by the triggers below such that listing models and judges doesn't aggregate every vote, see
+-- ProjectService.repair_counters to recompute them
+ALTER TABLE model ADD COLUMN n_responses INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE model ADD COLUMN n_votes INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE judge ADD COLUMN n_votes INTEGER NOT NULL DEFAULT 0;
+
+UPDATE model SET
+    n_responses = (SELECT COUNT(1) FROM response r WHERE r.model_id = model.id),
+    n_votes = (SELECT COUNT(1) FROM response r JOIN head_to_head h ON h.response_a_id = r.id WHERE r.model_id = model.id)
+        + (SELECT COUNT(1) FROM response r JOIN head_to_head h ON h.response_b_id = r.id WHERE r.model_id = model.id);
+UPDATE judge SET n_votes = (SELECT COUNT(1) FROM head_to_head h WHERE h.judge_id = judge.id);
+
+CREATE TRIGGER IF NOT EXISTS model_counter_response_insert AFTER INSERT ON response
+BEGIN
+    UPDATE model SET n_responses = n_responses + 1 WHERE id = NEW.model_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS model_counter_response_delete AFTER DELETE ON response
+BEGIN
+    UPDATE model SET n_responses = n_responses - 1 WHERE id = OLD.model_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS vote_counter_insert AFTER INSERT ON head_to_head
+BEGIN
+    UPDATE judge SET n_votes = n_votes + 1 WHERE id = NEW.judge_id;
+    UPDATE model SET n_votes = n_votes + 1
+    WHERE id IN (SELECT model_id FROM response WHERE id IN (NEW.response_a_id, NEW.response_b_id));
+END;
+
+CREATE TRIGGER IF NOT EXISTS vote_counter_update AFTER UPDATE OF judge_id, response_a_id, response_b_id ON head_to_head
+WHEN OLD.judge_id IS NOT NEW.judge_id
+    OR OLD.response_a_id IS NOT NEW.response_a_id
+    OR OLD.response_b_id IS NOT NEW.response_b_id
+BEGIN
+    UPDATE judge SET n_votes = n_votes - 1 WHERE id = OLD.judge_id;
+    UPDATE model SET n_votes = n_votes - 1
+    WHERE id IN (SELECT model_id FROM response WHERE id IN (OLD.response_a_id, OLD.response_b_id));
+    UPDATE judge SET n_votes = n_votes + 1 WHERE id = NEW.judge_id;
+    UPDATE model SET n_votes = n_votes + 1
+    WHERE id IN (SELECT model_id FROM response WHERE id IN (NEW.response_a_id, NEW.response_b_id));
+END;
+
+-- also fires for head-to-heads removed by cascading deletes, by which point the response (and its model) on the deleted
+-- side may already be gone, leaving nothing to decrement there
+CREATE TRIGGER IF NOT EXISTS vote_counter_delete AFTER DELETE ON head_to_head
+BEGIN
+    UPDATE judge SET n_votes = n_votes - 1 WHERE id = OLD.judge_id;
+    UPDATE model SET n_votes = n_votes - 1
+    WHERE id IN (SELECT model_id FROM response WHERE id IN (OLD.response_a_id, OLD.response_b_id));
+END;
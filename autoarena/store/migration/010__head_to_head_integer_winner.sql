@@ -0,0 +1,157 @@
+-- store winners as integers (1 if response A won, -1 if response B won, 0 for ties) such that flipping a winner to the
+-- opposite response order is a negation, and key head-to-heads on their ordered pair of response IDs rather than on a
+-- text slug, such that writes and conflict resolution happen entirely in SQL. The table is rebuilt following
+-- https://www.sqlite.org/lang_altertable.html#otheralter, recreating the indexes and triggers dropped with it
+PRAGMA foreign_keys = OFF;
+BEGIN;
+
+CREATE TABLE head_to_head_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    response_a_id INTEGER NOT NULL,
+    response_b_id INTEGER NOT NULL,
+    judge_id INTEGER NOT NULL,
+    created TIMESTAMPTZ NOT NULL DEFAULT current_timestamp,
+    winner INTEGER NOT NULL CHECK (winner IN (-1, 0, 1)),
+    response_low_id INTEGER NOT NULL AS (MIN(response_a_id, response_b_id)),
+    response_high_id INTEGER NOT NULL AS (MAX(response_a_id, response_b_id)),
+    FOREIGN KEY (response_a_id) REFERENCES response (id) ON DELETE CASCADE,
+    FOREIGN KEY (response_b_id) REFERENCES response (id) ON DELETE CASCADE,
+    FOREIGN KEY (judge_id) REFERENCES judge (id) ON DELETE CASCADE,
+    -- TODO: allow duplicate ratings from same judge (e.g. human)? Unique for now for convenience
+    UNIQUE (response_low_id, response_high_id, judge_id)
+);
+INSERT INTO head_to_head_new (id, response_a_id, response_b_id, judge_id, created, winner)
+SELECT id, response_a_id, response_b_id, judge_id, created, CASE winner WHEN 'A' THEN 1 WHEN 'B' THEN -1 ELSE 0 END
+FROM head_to_head
+ORDER BY id;
+-- carry over the sequence such that IDs of deleted head-to-heads are not reused
+UPDATE sqlite_sequence
+SET seq = (SELECT seq FROM sqlite_sequence WHERE name = 'head_to_head')
+WHERE name = 'head_to_head_new' AND EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'head_to_head');
+DROP TABLE head_to_head;
+ALTER TABLE head_to_head_new RENAME TO head_to_head;
+
+CREATE INDEX IF NOT EXISTS head_to_head_judge_id_idx ON head_to_head (judge_id, id);
+CREATE INDEX IF NOT EXISTS head_to_head_response_a_idx ON head_to_head (response_a_id, response_b_id, judge_id, winner);
+CREATE INDEX IF NOT EXISTS head_to_head_response_b_idx ON head_to_head (response_b_id, response_a_id, judge_id, winner);
+
+CREATE TRIGGER IF NOT EXISTS head_to_head_version_insert AFTER INSERT ON head_to_head
+BEGIN
+    INSERT INTO head_to_head_version (judge_id, version) VALUES (NEW.judge_id, 1)
+    ON CONFLICT (judge_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS head_to_head_version_update AFTER UPDATE ON head_to_head
+WHEN OLD.winner IS NOT NEW.winner
+    OR OLD.judge_id IS NOT NEW.judge_id
+    OR OLD.response_a_id IS NOT NEW.response_a_id
+    OR OLD.response_b_id IS NOT NEW.response_b_id
+BEGIN
+    INSERT INTO head_to_head_version (judge_id, version)
+    SELECT judge_id, 1 FROM (SELECT OLD.judge_id AS judge_id UNION SELECT NEW.judge_id) WHERE TRUE
+    ON CONFLICT (judge_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS head_to_head_version_delete AFTER DELETE ON head_to_head
+BEGIN
+    INSERT INTO head_to_head_version (judge_id, version) VALUES (OLD.judge_id, 1)
+    ON CONFLICT (judge_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS elo_history_truncate_update AFTER UPDATE ON head_to_head
+WHEN OLD.winner IS NOT NEW.winner
+    OR OLD.judge_id IS NOT NEW.judge_id
+    OR OLD.response_a_id IS NOT NEW.response_a_id
+    OR OLD.response_b_id IS NOT NEW.response_b_id
+BEGIN
+    DELETE FROM elo_history
+    WHERE (judge_id IS NULL OR judge_id IN (OLD.judge_id, NEW.judge_id)) AND head_to_head_id >= OLD.id;
+    DELETE FROM elo_checkpoint
+    WHERE (judge_id IS NULL OR judge_id IN (OLD.judge_id, NEW.judge_id)) AND head_to_head_id >= OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS elo_history_truncate_delete AFTER DELETE ON head_to_head
+BEGIN
+    DELETE FROM elo_history WHERE (judge_id IS NULL OR judge_id = OLD.judge_id) AND head_to_head_id >= OLD.id;
+    DELETE FROM elo_checkpoint WHERE (judge_id IS NULL OR judge_id = OLD.judge_id) AND head_to_head_id >= OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS vote_counter_insert AFTER INSERT ON head_to_head
+BEGIN
+    UPDATE judge SET n_votes = n_votes + 1 WHERE id = NEW.judge_id;
+    UPDATE model SET n_votes = n_votes + 1
+    WHERE id IN (SELECT model_id FROM response WHERE id IN (NEW.response_a_id, NEW.response_b_id));
+END;
+
+CREATE TRIGGER IF NOT EXISTS vote_counter_update AFTER UPDATE OF judge_id, response_a_id, response_b_id ON head_to_head
+WHEN OLD.judge_id IS NOT NEW.judge_id
+    OR OLD.response_a_id IS NOT NEW.response_a_id
+    OR OLD.response_b_id IS NOT NEW.response_b_id
+BEGIN
+    UPDATE judge SET n_votes = n_votes - 1 WHERE id = OLD.judge_id;
+    UPDATE model SET n_votes = n_votes - 1
+    WHERE id IN (SELECT model_id FROM response WHERE id IN (OLD.response_a_id, OLD.response_b_id));
+    UPDATE judge SET n_votes = n_votes + 1 WHERE id = NEW.judge_id;
+    UPDATE model SET n_votes = n_votes + 1
+    WHERE id IN (SELECT model_id FROM response WHERE id IN (NEW.response_a_id, NEW.response_b_id));
+END;
+
+CREATE TRIGGER IF NOT EXISTS vote_counter_delete AFTER DELETE ON head_to_head
+BEGIN
+    UPDATE judge SET n_votes = n_votes - 1 WHERE id = OLD.judge_id;
+    UPDATE model SET n_votes = n_votes - 1
+    WHERE id IN (SELECT model_id FROM response WHERE id IN (OLD.response_a_id, OLD.response_b_id));
+END;
+
+-- response pairs are likewise keyed on their ordered response IDs alone
+DROP TRIGGER IF EXISTS response_pair_insert;
+CREATE TABLE response_pair_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    prompt_id INTEGER NOT NULL,
+    response_a_id INTEGER NOT NULL, -- the lower of the two response IDs
+    response_b_id INTEGER NOT NULL,
+    model_a_id INTEGER NOT NULL,
+    model_b_id INTEGER NOT NULL,
+    FOREIGN KEY (response_a_id) REFERENCES response (id) ON DELETE CASCADE,
+    FOREIGN KEY (response_b_id) REFERENCES response (id) ON DELETE CASCADE,
+    UNIQUE (response_a_id, response_b_id)
+);
+INSERT INTO response_pair_new (id, prompt_id, response_a_id, response_b_id, model_a_id, model_b_id)
+SELECT id, prompt_id, response_a_id, response_b_id, model_a_id, model_b_id
+FROM response_pair
+ORDER BY id;
+DROP TABLE response_pair;
+ALTER TABLE response_pair_new RENAME TO response_pair;
+CREATE INDEX IF NOT EXISTS response_pair_model_a_idx ON response_pair (model_a_id, model_b_id);
+CREATE INDEX IF NOT EXISTS response_pair_model_b_idx ON response_pair (model_b_id, model_a_id);
+CREATE INDEX IF NOT EXISTS response_pair_response_b_idx ON response_pair (response_b_id);
+
+CREATE TRIGGER IF NOT EXISTS response_pair_insert AFTER INSERT ON response
+BEGIN
+    INSERT INTO response_pair (prompt_id, response_a_id, response_b_id, model_a_id, model_b_id)
+    SELECT
+        NEW.prompt_id,
+        MIN(r.id, NEW.id),
+        MAX(r.id, NEW.id),
+        IIF(r.id < NEW.id, r.model_id, NEW.model_id),
+        IIF(r.id < NEW.id, NEW.model_id, r.model_id)
+    FROM response r
+    WHERE r.prompt_id = NEW.prompt_id AND r.model_id != NEW.model_id;
+END;
+
+-- head-to-heads in their previous shape, with 'A', 'B', or '-' winners and text slugs, for reads that present them
+CREATE VIEW IF NOT EXISTS head_to_head_labeled AS
+SELECT
+    id,
+    response_low_id || '-' || response_high_id AS response_id_slug,
+    response_a_id,
+    response_b_id,
+    judge_id,
+    created,
+    CASE winner WHEN 1 THEN 'A' WHEN -1 THEN 'B' ELSE '-' END AS winner
+FROM head_to_head;
+
+COMMIT;
+PRAGMA foreign_keys = ON;
+
+ANALYZE;
@@ -0,0 +1,16 @@
+-- zlib preset dictionaries trained on a project's own text, referenced by ID from each value compressed with one
+CREATE TABLE IF NOT EXISTS compression_dictionary (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created TIMESTAMPTZ NOT NULL DEFAULT current_timestamp,
+    dictionary BLOB NOT NULL
+);
+
+-- single-row record of whether prompt and response text is stored compressed, as BLOBs in place of TEXT values
+CREATE TABLE IF NOT EXISTS compression_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    enabled BOOLEAN NOT NULL DEFAULT FALSE,
+    dictionary_id INTEGER, -- dictionary used for newly written values, if any
+    FOREIGN KEY (dictionary_id) REFERENCES compression_dictionary (id)
+);
+
+INSERT INTO compression_state (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,6 @@
+-- serve a model's pairings in (response_a_id, response_b_id) order from either side of the pair, such that pages of
+-- head-to-heads can be read by seeking past the last pair seen rather than sorting every pairing of the model
+CREATE INDEX IF NOT EXISTS response_pair_model_a_keyset_idx
+    ON response_pair (model_a_id, response_a_id, response_b_id, model_b_id);
+CREATE INDEX IF NOT EXISTS response_pair_model_b_keyset_idx
+    ON response_pair (model_b_id, response_b_id, response_a_id, model_a_id);
@@ -0,0 +1,20 @@
+-- single-row count of response pairs kept current by the triggers below, such that counting head-to-heads is a lookup
+-- rather than a scan of every pair, see ProjectService.repair_counters to recompute it
+CREATE TABLE IF NOT EXISTS response_pair_counter (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    n_pairs INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO response_pair_counter (id, n_pairs) SELECT 1, COUNT(1) FROM response_pair WHERE TRUE
+ON CONFLICT (id) DO NOTHING;
+
+CREATE TRIGGER IF NOT EXISTS response_pair_counter_insert AFTER INSERT ON response_pair
+BEGIN
+    UPDATE response_pair_counter SET n_pairs = n_pairs + 1;
+END;
+
+-- also fires for pairs removed by cascading deletes of either response
+CREATE TRIGGER IF NOT EXISTS response_pair_counter_delete AFTER DELETE ON response_pair
+BEGIN
+    UPDATE response_pair_counter SET n_pairs = n_pairs - 1;
+END;
@@ -0,0 +1,8 @@
+-- remove prompts along with their last response, whether deleted directly or by cascading from a deleted model
+CREATE TRIGGER IF NOT EXISTS prompt_delete_unused AFTER DELETE ON response
+BEGIN
+    DELETE FROM prompt WHERE id = OLD.prompt_id AND NOT EXISTS (SELECT 1 FROM response WHERE prompt_id = OLD.prompt_id);
+END;
+
+-- as well as those left behind by deletes before this trigger existed
+DELETE FROM prompt WHERE NOT EXISTS (SELECT 1 FROM response r WHERE r.prompt_id = prompt.id);
@@ -0,0 +1,4 @@
+-- responses are only ever written by uploads, which pair them with other models' responses and count them once per
+-- upload in set-based statements (see ModelService.upload_responses), rather than row by row via these triggers
+DROP TRIGGER IF EXISTS response_pair_insert;
+DROP TRIGGER IF EXISTS model_counter_response_insert;
@@ -1,8 +1,26 @@
+import numpy as np
 import pandas as pd
 
 
-def id_slug(a: int, b: int) -> str:
-    return f"{int(min(a, b))}-{int(max(a, b))}"  # loaded as a sqlite extension
+WINNER_CODES = {"A": 1, "B": -1, "-": 0}  # as stored in head_to_head.winner, flipped to the other order by negation
+
+
+def encode_winners(winners: pd.Series) -> pd.Series:
+    codes = winners.map(WINNER_CODES)
+    unrecognized = set(winners[codes.isna()])
+    if len(unrecognized) > 0:
+        raise ValueError(f"Unrecognized winner(s) {unrecognized}, expected one of {set(WINNER_CODES)}")
+    return codes.astype(np.int64)
+
+
+def decode_winners(codes: pd.Series) -> pd.Series:
+    return codes.map({code: winner for winner, code in WINNER_CODES.items()})
+
+
+def ordered_pairs(a: pd.Series, b: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """Order each pair of IDs as (lower, higher), such that a pair is identified regardless of its order"""
+    a_int, b_int = a.to_numpy().astype(np.int64), b.to_numpy().astype(np.int64)
+    return pd.Series(np.minimum(a_int, b_int), index=a.index), pd.Series(np.maximum(a_int, b_int), index=a.index)
 
 
 def invert_winner(winner: str) -> str:
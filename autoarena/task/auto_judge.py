@@ -1,4 +1,5 @@
 import dataclasses
+import functools
 import time
 from collections import defaultdict
 from typing import Optional
@@ -17,7 +18,8 @@ from autoarena.service.head_to_head import HeadToHeadService
 from autoarena.service.judge import JudgeService
 from autoarena.service.model import ModelService
 from autoarena.service.task import TaskService
-from autoarena.store.utils import id_slug
+from autoarena.task.leaderboard_scheduler import LEADERBOARD_SCHEDULER
+from autoarena.task.maintenance_scheduler import MAINTENANCE_SCHEDULER
 
 
 class GracefulExit(RuntimeError): ...
@@ -88,15 +90,12 @@ class AutoJudgeTask:
             raise e
 
     def _retrieve_head_to_heads(self) -> pd.DataFrame:
-        h2h_requests = [api.HeadToHeadsRequest(model_a_id=m.id) for m in self.models]
-        # TODO: calling this N times for N models is inefficient -- can take a few seconds on larger projects
-        df_h2h = pd.concat([HeadToHeadService.get_df(self.project_slug, request) for request in h2h_requests])
+        model_ids = [m.id for m in self.models]
+        df_h2h = HeadToHeadService.get_df_for_models(self.project_slug, model_ids, [j.id for j in self.judges])
         if len(df_h2h) == 0:
             self.log("No head-to-heads found, exiting", status=api.TaskStatus.COMPLETED, progress=1, level="WARNING")
             raise GracefulExit
 
-        df_h2h["response_id_slug"] = df_h2h.apply(lambda r: id_slug(r.response_a_id, r.response_b_id), axis=1)
-        df_h2h = df_h2h.drop_duplicates(subset=["response_id_slug"], keep="first")
         n_models = len(set(df_h2h.model_a_id) | set(df_h2h.model_b_id))
         self.log(f"Found {len(df_h2h)} total head-to-heads between {n_models} model(s) to judge")
 
@@ -114,10 +113,10 @@ class AutoJudgeTask:
         judges_with_h2hs: list[tuple[AutomatedJudge, list[api.HeadToHead]]] = []
         for judge in self.judges:
             automated_judge = judge_factory(judge, wrappers=self.judge_wrappers)
+            df_h2h_judge = df_h2h[~df_h2h[f"voted_{judge.id}"]] if self.skip_existing else df_h2h
             head_to_heads = [
                 api.HeadToHead(r.prompt, r.response_a_id, r.response_a, r.response_b_id, r.response_b)
-                for r in df_h2h.itertuples()
-                if not self.skip_existing or judge.name not in {h["judge_name"] for h in r.history}
+                for r in df_h2h_judge.itertuples()
             ]
             n_skipping = len(df_h2h) - len(head_to_heads)
             if n_skipping > 0:
@@ -160,6 +159,7 @@ class AutoJudgeTask:
                 self.log(message, progress=progress)
                 df_h2h_chunk = pd.DataFrame(responses[auto_judge.name][-self.update_every :], columns=out_columns)
                 HeadToHeadService.upload_head_to_heads(self.project_slug, df_h2h_chunk)
+                MAINTENANCE_SCHEDULER.after_write(self.project_slug)  # long runs otherwise grow the log unchecked
             if n_this_judge == n_h2h_by_judge_name[auto_judge.name]:
                 message = (
                     f"Judge '{auto_judge.name}' finished judging {n_h2h_by_judge_name[auto_judge.name]} head-to-heads "
@@ -172,6 +172,8 @@ class AutoJudgeTask:
                 HeadToHeadService.upload_head_to_heads(self.project_slug, df_h2h_all)
 
         self.log("Recomputing leaderboard rankings", progress=0.975)
-        EloService.reseed_scores(self.project_slug, config=self.elo_config)
+        recompute = functools.partial(EloService.reseed_scores, self.project_slug, config=self.elo_config)
+        if not LEADERBOARD_SCHEDULER.run(self.project_slug, recompute=recompute):
+            self.log("Leaderboard recompute already in progress, scheduled another to include these results")
         message = f"Completed automated judging in {time.time() - self.t_start:0.1f} seconds"
         self.log(message, progress=1, status=api.TaskStatus.COMPLETED, level="SUCCESS")
@@ -0,0 +1,100 @@
+import contextvars
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from loguru import logger
+
+from autoarena.api import api
+from autoarena.error import NotFoundError
+from autoarena.service.elo import EloService
+from autoarena.service.elo_history import EloHistoryService
+from autoarena.service.project import ProjectService
+from autoarena.service.task import TaskService
+
+
+class LeaderboardScheduler:
+    """
+    Coalesce bursts of leaderboard recompute triggers for a project into a single run once triggers stop arriving for
+    `quiet_period` seconds (or `max_delay` seconds have passed since the first of them). Only one process runs a given
+    project's recompute at a time, and any writes that land mid-recompute are picked up by a trailing run.
+    """
+
+    def __init__(self, quiet_period: float = 1, max_delay: float = 10):
+        self.quiet_period = quiet_period
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._timers: dict[Path, threading.Timer] = {}
+        self._scheduled_for: dict[Path, float] = {}
+        self._first_triggered: dict[Path, float] = {}
+
+    def trigger(self, project_slug: str) -> None:
+        key = ProjectService._slug_to_path(project_slug)
+        with self._lock:
+            t_first = self._first_triggered.setdefault(key, time.time())
+        delay = min(self.quiet_period, max(t_first + self.max_delay - time.time(), 0))
+        self._schedule(project_slug, delay)
+
+    def run(self, project_slug: str, recompute: Optional[Callable[[], None]] = None) -> bool:
+        """Recompute now if due, returning False without waiting if another recompute for this project is running"""
+        if not EloService.claim_recompute(project_slug):
+            return False  # the running recompute is responsible for a trailing run
+        recomputed = False
+        try:
+            if EloService.get_reseed_delay(project_slug) == 0:
+                (recompute or (lambda: TaskService.recompute_leaderboard(project_slug)))()
+                recomputed = True
+        finally:
+            EloService.release_recompute(project_slug)
+        if recomputed:
+            # keep history reads from having to write, outside the claim as it commits one stretch of votes at a time
+            EloHistoryService.extend_all(project_slug)
+        delay = EloService.get_reseed_delay(project_slug)  # anything still pending arrived while recomputing
+        if delay is not None:
+            self._schedule(project_slug, max(delay, self.quiet_period))
+        return True
+
+    def get_queue(self, project_slug: str) -> api.LeaderboardQueue:
+        state = EloService.get_leaderboard_state(project_slug)
+        key = ProjectService._slug_to_path(project_slug)
+        with self._lock:
+            scheduled_for = self._scheduled_for.get(key)
+        return api.LeaderboardQueue(
+            n_pending_votes=state.n_pending_votes,
+            n_pending_changes=state.n_pending_changes,
+            is_running=state.recompute_started is not None,
+            # only known for runs scheduled by this process
+            seconds_until_run=max(scheduled_for - time.time(), 0) if scheduled_for is not None else None,
+            last_recomputed=state.updated,
+        )
+
+    def _schedule(self, project_slug: str, delay: float) -> None:
+        key = ProjectService._slug_to_path(project_slug)
+        # capture the calling context such that the data directory is preserved in the timer thread
+        timer = threading.Timer(delay, contextvars.copy_context().run, args=(self._run_scheduled, project_slug))
+        timer.daemon = True
+        with self._lock:
+            existing = self._timers.pop(key, None)
+            if existing is not None:
+                existing.cancel()
+            self._timers[key] = timer
+            self._scheduled_for[key] = time.time() + delay
+        timer.start()
+
+    def _run_scheduled(self, project_slug: str) -> None:
+        key = ProjectService._slug_to_path(project_slug)
+        with self._lock:
+            if self._timers.get(key) is threading.current_thread():
+                del self._timers[key]
+                del self._scheduled_for[key]
+            self._first_triggered.pop(key, None)
+        try:
+            self.run(project_slug)
+        except NotFoundError:
+            pass  # project was deleted in the meantime
+        except Exception as e:
+            logger.error(f"Failed to recompute leaderboard for project '{project_slug}': {e}")
+
+
+LEADERBOARD_SCHEDULER = LeaderboardScheduler()
@@ -0,0 +1,89 @@
+import contextvars
+import threading
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from autoarena.api import api
+from autoarena.error import NotFoundError
+from autoarena.service.project import ProjectService
+from autoarena.service.task import TaskService
+
+
+class MaintenanceScheduler:
+    """
+    Run database maintenance for projects whose write-ahead log has grown past `max_wal_bytes`, checked after large
+    writes and every `interval` seconds while started. Only one maintenance task runs for a given project at a time.
+    """
+
+    def __init__(self, interval: float = 600, max_wal_bytes: int = 64 * 2**20):
+        self.interval = interval
+        self.max_wal_bytes = max_wal_bytes
+        self._lock = threading.Lock()
+        self._running: set[Path] = set()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def after_write(self, project_slug: str) -> None:
+        """Run maintenance in the background if this project's write-ahead log has grown too large"""
+        if self.needs_maintenance(project_slug):
+            # capture the calling context such that the data directory is preserved in the thread
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(self._run_logged, project_slug), daemon=True).start()
+
+    def needs_maintenance(self, project_slug: str) -> bool:
+        wal_path = Path(f"{ProjectService._slug_to_path(project_slug)}-wal")
+        try:
+            return wal_path.stat().st_size > self.max_wal_bytes
+        except FileNotFoundError:
+            return False
+
+    def run(self, project_slug: str, full_vacuum: bool = False) -> bool:
+        """
+        Run maintenance now, returning False without waiting if it is already running for this project. Maintenance
+        scheduled automatically never runs a full vacuum, see ProjectService.maintain.
+        """
+        key = ProjectService._slug_to_path(project_slug)
+        with self._lock:
+            if key in self._running:
+                return False
+            self._running.add(key)
+        try:
+            # also skip if another process is already maintaining this project
+            if TaskService.has_active(project_slug, task_type=api.TaskType.MAINTENANCE).has_active:
+                return False
+            TaskService.maintain(project_slug, full_vacuum=full_vacuum)
+            return True
+        finally:
+            with self._lock:
+                self._running.discard(key)
+
+    def start(self) -> None:
+        self._stopped.clear()
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._run_periodically,), daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run_periodically(self) -> None:
+        while not self._stopped.wait(self.interval):
+            for project in ProjectService.get_all():
+                if self.needs_maintenance(project.slug):
+                    self._run_logged(project.slug)
+
+    def _run_logged(self, project_slug: str) -> None:
+        try:
+            self.run(project_slug)
+        except NotFoundError:
+            pass  # project was deleted in the meantime
+        except Exception as e:
+            logger.error(f"Failed to maintain database for project '{project_slug}': {e}")
+
+
+MAINTENANCE_SCHEDULER = MaintenanceScheduler()
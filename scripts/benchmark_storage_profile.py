@@ -0,0 +1,113 @@
+"""
+Compare read-path timings between storage profiles on a synthetic project, e.g.:
+
+    python scripts/benchmark_storage_profile.py --n-models 8 --n-prompts 5000 --n-votes 50000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from autoarena.api import api
+from autoarena.service.elo import EloService
+from autoarena.service.head_to_head import HeadToHeadService
+from autoarena.service.judge import JudgeService
+from autoarena.service.model import ModelService
+from autoarena.service.project import ProjectService
+from autoarena.store.database import CONNECTION_POOL, STORAGE_PROFILE_ENV, STORAGE_PROFILES, DataDirectoryProvider
+
+
+def seed(project_slug: str, n_models: int, n_prompts: int, n_votes: int, response_length: int) -> None:
+    rng = np.random.default_rng(0)
+    prompts = [f"prompt {i}: {'x' * response_length}" for i in range(n_prompts)]
+    for i in range(n_models):
+        responses = [f"model {i} response {j}: {'y' * response_length}" for j in range(n_prompts)]
+        ModelService.upload_responses(
+            project_slug, f"model-{i}", pd.DataFrame(dict(prompt=prompts, response=responses))
+        )
+    judge = JudgeService.create(
+        project_slug,
+        api.CreateJudgeRequest(
+            judge_type=api.JudgeType.CUSTOM,
+            name="benchmark",
+            model_name="benchmark",
+            system_prompt="",
+            description="",
+        ),
+    )
+    df_response = pd.concat(
+        [ModelService.get_df_response(project_slug, m.id) for m in ModelService.get_all(project_slug)]
+    )
+    response_ids = df_response.response_id.to_numpy().reshape(n_models, n_prompts)
+    model_pairs = rng.choice(n_models, size=(n_votes, 2))
+    model_pairs = model_pairs[model_pairs[:, 0] != model_pairs[:, 1]]
+    prompt_index = rng.integers(0, n_prompts, size=len(model_pairs))
+    df_h2h = pd.DataFrame(
+        dict(
+            response_a_id=response_ids[model_pairs[:, 0], prompt_index],
+            response_b_id=response_ids[model_pairs[:, 1], prompt_index],
+            judge_id=judge.id,
+            winner=rng.choice(["A", "B", "-"], size=len(model_pairs)),
+        )
+    )
+    HeadToHeadService.upload_head_to_heads(project_slug, df_h2h)
+
+
+def time_median(fn: Callable[[], object], n_repeats: int) -> float:
+    durations = []
+    for _ in range(n_repeats):
+        t0 = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - t0)
+    return statistics.median(durations)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n-models", type=int, default=8)
+    ap.add_argument("--n-prompts", type=int, default=5_000)
+    ap.add_argument("--n-votes", type=int, default=50_000)
+    ap.add_argument("--response-length", type=int, default=1_000)
+    ap.add_argument("--n-repeats", type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_directory:
+        DataDirectoryProvider.set(Path(data_directory))
+        project = ProjectService.create_idempotent(api.CreateProjectRequest(name="benchmark"))
+        seed(project.slug, args.n_models, args.n_prompts, args.n_votes, args.response_length)
+        models = ModelService.get_all(project.slug)
+        (judge,) = JudgeService.get_all(project.slug)
+        size_mb = Path(project.filepath).stat().st_size / 2**20
+        print(f"Project with {len(models)} models, {args.n_prompts} prompts, {judge.n_votes} votes ({size_mb:.0f} MB)")
+
+        reads: dict[str, Callable[[], object]] = {
+            "leaderboard head-to-heads": lambda: EloService.get_head_to_head_arrays(project.slug),
+            "leaderboard by judge": lambda: EloService.get_head_to_head_arrays(project.slug, judge_id=judge.id),
+            "head-to-heads for model": lambda: HeadToHeadService.get(
+                project.slug, api.HeadToHeadsRequest(model_a_id=models[0].id)
+            ),
+            "head-to-heads for pair": lambda: HeadToHeadService.get(
+                project.slug, api.HeadToHeadsRequest(model_a_id=models[0].id, model_b_id=models[1].id)
+            ),
+            "model head-to-head stats": lambda: ModelService.get_head_to_head_stats(project.slug, models[0].id),
+        }
+        results: dict[str, dict[str, float]] = {}
+        for profile_name in STORAGE_PROFILES:
+            os.environ[STORAGE_PROFILE_ENV] = profile_name
+            CONNECTION_POOL.close(Path(project.filepath))  # reopen connections with this profile
+            results[profile_name] = {name: time_median(fn, args.n_repeats) for name, fn in reads.items()}
+
+    print(f"{'read':<28}" + "".join(f"{name:>14}" for name in STORAGE_PROFILES))
+    for name in reads:
+        print(f"{name:<28}" + "".join(f"{results[profile][name] * 1_000:>12.1f}ms" for profile in STORAGE_PROFILES))
+
+
+if __name__ == "__main__":
+    main()
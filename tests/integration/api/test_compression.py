@@ -0,0 +1,82 @@
+from io import StringIO
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from autoarena.api import api
+from autoarena.service.compression import CompressionService
+from autoarena.service.project import ProjectService
+from tests.integration.api.conftest import DF_RESPONSE, DF_RESPONSE_C, construct_upload_model_body
+
+
+def test__compression__get__default(project_client: TestClient) -> None:
+    assert project_client.get("/compression").json() == dict(enabled=False, dictionary_size=None)
+
+
+@pytest.mark.parametrize("train_dictionary", [False, True])
+def test__compression__round_trip(
+    project_client: TestClient,
+    project_slug: str,
+    model_id: int,
+    model_b_id: int,
+    train_dictionary: bool,
+) -> None:
+    h2h_request = dict(model_a_id=model_id, model_b_id=model_b_id)
+    h2h = project_client.put("/head-to-heads", json=h2h_request).json()
+    vote = dict(response_a_id=h2h[0]["response_a_id"], response_b_id=h2h[0]["response_b_id"], winner="A")
+    assert project_client.post("/head-to-head/vote", json=dict(vote, human_judge_name="human")).json() is None
+    h2h_before = project_client.put("/head-to-heads", json=h2h_request).json()
+
+    request = dict(enabled=True, train_dictionary=train_dictionary)
+    compression = project_client.put("/compression", json=request).json()
+    assert compression["enabled"] is True
+    assert (compression["dictionary_size"] is not None) is train_dictionary
+    with ProjectService.connect(project_slug) as conn:
+        # these texts are too short to gain anything from compression and are kept as they are
+        assert conn.execute("SELECT DISTINCT typeof(response) FROM response").fetchall() == [("text",)]
+        assert conn.execute("SELECT DISTINCT typeof(text) FROM prompt").fetchall() == [("text",)]
+
+    # reads are unchanged, including for responses uploaded after enabling compression that share prompts
+    body = construct_upload_model_body({"test-model-c": DF_RESPONSE_C})
+    model_c_id = project_client.post("/model", data=body.data, files=body.files).json()[0]["id"]
+    assert project_client.put("/head-to-heads", json=h2h_request).json() == h2h_before
+    assert len(project_client.put("/head-to-heads", json=dict(model_a_id=model_c_id)).json()) == 3
+    df_response = pd.read_csv(StringIO(project_client.get(f"/model/{model_id}/download/responses").text))
+    assert df_response.equals(DF_RESPONSE)
+    judge_id = project_client.get("/judges").json()[0]["id"]
+    df_vote = pd.read_csv(StringIO(project_client.get(f"/judge/{judge_id}/download/votes").text))
+    assert df_vote.prompt.tolist() == [h2h_before[0]["prompt"]]
+    df_h2h = pd.read_csv(StringIO(project_client.get(f"/model/{model_id}/download/head-to-heads").text))
+    assert df_h2h.response_a.tolist() == [h2h_before[0]["response_a"]]
+
+    assert project_client.put("/compression", json=dict(enabled=False)).json() == dict(
+        enabled=False,
+        dictionary_size=None,
+    )
+    with ProjectService.connect(project_slug) as conn:
+        assert conn.execute("SELECT DISTINCT typeof(response) FROM response").fetchall() == [("text",)]
+        assert conn.execute("SELECT COUNT(1) FROM compression_dictionary").fetchall() == [(0,)]
+    assert project_client.put("/head-to-heads", json=h2h_request).json() == h2h_before
+
+
+@pytest.mark.parametrize("train_dictionary", [False, True])
+def test__compression__update__chunked(project_client: TestClient, project_slug: str, train_dictionary: bool) -> None:
+    long_texts = [f"Here is a long, step-by-step explanation of problem {i}. " * 10 for i in range(5)]
+    df_response = pd.DataFrame(dict(prompt=[*long_texts, "short"], response=[*long_texts, "r"]))
+    body = construct_upload_model_body({"long-model": df_response})
+    model_id = project_client.post("/model", data=body.data, files=body.files).json()[0]["id"]
+
+    request = api.UpdateCompressionRequest(enabled=True, train_dictionary=train_dictionary)
+    CompressionService.update(project_slug, request, chunk_size=2)
+    with ProjectService.connect(project_slug) as conn:
+        types = conn.execute("SELECT typeof(response) FROM response ORDER BY id").fetchall()
+        assert types == [("blob",)] * len(long_texts) + [("text",)]  # compressing the short one only adds bytes
+        assert conn.execute("SELECT typeof(text) FROM prompt ORDER BY id").fetchall() == types
+    df_download = pd.read_csv(StringIO(project_client.get(f"/model/{model_id}/download/responses").text))
+    assert df_download.equals(df_response)
+
+    CompressionService.update(project_slug, api.UpdateCompressionRequest(enabled=False), chunk_size=2)
+    with ProjectService.connect(project_slug) as conn:
+        assert conn.execute("SELECT DISTINCT typeof(response) FROM response").fetchall() == [("text",)]
+        assert conn.execute("SELECT COUNT(1) FROM compression_dictionary").fetchall() == [(0,)]
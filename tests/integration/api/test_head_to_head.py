@@ -1,3 +1,7 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
 from fastapi.testclient import TestClient
 
 
@@ -31,6 +35,48 @@ def test__head_to_head__get(project_client: TestClient, model_id: int, model_b_i
         assert a["response_b_id"] == b["response_a_id"]
 
 
+@pytest.mark.parametrize("limit", [1, 2, 3, 100])
+def test__head_to_head__get_page(project_client: TestClient, model_ids: list[int], limit: int) -> None:
+    h2h = project_client.put("/head-to-heads", json=dict(model_a_id=model_ids[1])).json()
+    assert len(h2h) == 4  # model B shares two prompts with A and two with C
+    paged, cursor, n_pages = [], None, 0
+    while True:
+        request = dict(model_a_id=model_ids[1], cursor=cursor, limit=limit)
+        page = project_client.put("/head-to-heads/page", json=request).json()
+        assert len(page["head_to_heads"]) <= limit
+        paged.extend(page["head_to_heads"])
+        n_pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert paged == h2h
+    assert n_pages == -(-len(h2h) // limit)  # no trailing empty page when the last page is full
+
+
+def test__head_to_head__get_page__ids_only(project_client: TestClient, model_id: int, model_b_id: int) -> None:
+    h2h = project_client.put("/head-to-heads", json=dict(model_a_id=model_b_id, model_b_id=model_id)).json()
+    request = dict(model_a_id=model_b_id, model_b_id=model_id, ids_only=True)
+    page = project_client.put("/head-to-heads/page", json=request).json()
+    assert page["next_cursor"] is None
+    assert page["head_to_heads"] == [
+        dict(response_a_id=h["response_a_id"], response_b_id=h["response_b_id"], history=h["history"]) for h in h2h
+    ]
+
+    # texts can then be fetched by response ID
+    response_ids = [h2h[0]["response_b_id"], h2h[0]["response_a_id"], -1]
+    responses = project_client.put("/responses", json=dict(response_ids=response_ids)).json()
+    assert [(r["id"], r["model_id"], r["prompt"], r["response"]) for r in responses] == [
+        (h2h[0]["response_b_id"], model_id, "p1", "r1"),
+        (h2h[0]["response_a_id"], model_b_id, "p1", "b"),
+    ]
+
+
+@pytest.mark.parametrize("request_extra", [dict(cursor="not-a-cursor"), dict(limit=0)])
+def test__head_to_head__get_page__invalid(project_client: TestClient, model_id: int, request_extra: dict) -> None:
+    response = project_client.put("/head-to-heads/page", json=dict(model_a_id=model_id, **request_extra))
+    assert response.status_code == 400
+
+
 def test__head_to_head__submit_vote(project_client: TestClient, model_id: int, model_b_id: int) -> None:
     h2h = project_client.put("/head-to-heads", json=dict(model_a_id=model_id, model_b_id=model_b_id)).json()
     response_a_id, response_b_id = h2h[0]["response_a_id"], h2h[0]["response_b_id"]
@@ -54,6 +100,14 @@ def test__head_to_head__submit_vote(project_client: TestClient, model_id: int, m
     assert h2h[1]["history"] == []
 
 
+def test__head_to_head__submit_vote__invalid_winner(project_client: TestClient, model_id: int, model_b_id: int) -> None:
+    h2h = project_client.put("/head-to-heads", json=dict(model_a_id=model_id, model_b_id=model_b_id)).json()
+    request = dict(response_a_id=h2h[0]["response_a_id"], response_b_id=h2h[0]["response_b_id"], winner="C")
+    response = project_client.post("/head-to-head/vote", json=dict(**request, human_judge_name="human"))
+    assert response.status_code == 400
+    assert project_client.get("/judges").json() == []
+
+
 def test__head_to_head__submit_vote__with_name(project_client: TestClient, model_id: int, model_b_id: int) -> None:
     h2h = project_client.put("/head-to-heads", json=dict(model_a_id=model_id, model_b_id=model_b_id)).json()
     response_a_id, response_b_id = h2h[0]["response_a_id"], h2h[0]["response_b_id"]
@@ -73,3 +127,61 @@ def test__head_to_head__count__2_models(project_client: TestClient, model_id: in
 
 def test__head_to_head__count__3_models(project_client: TestClient, model_ids: list[int]) -> None:
     assert project_client.get("/head-to-head/count").json() == 5
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test__head_to_head__upload(
+    project_client: TestClient,
+    model_id: int,
+    model_b_id: int,
+    judge_id: int,
+    file_format: str,
+) -> None:
+    h2h = project_client.put("/head-to-heads", json=dict(model_a_id=model_id, model_b_id=model_b_id)).json()
+    df_h2h = pd.DataFrame(
+        dict(
+            response_a_id=[h["response_a_id"] for h in h2h],
+            response_b_id=[h["response_b_id"] for h in h2h],
+            judge_id=judge_id,
+            winner=["A", "-"],
+        )
+    )
+    buf = BytesIO()
+    if file_format == "csv":
+        df_h2h.to_csv(buf, index=False)
+    else:
+        df_h2h.to_parquet(buf)
+    files = dict(file=(f"h2h.{file_format}", buf.getvalue()))
+    assert project_client.post("/head-to-heads", files=files).json() is None
+    h2h = project_client.put("/head-to-heads", json=dict(model_a_id=model_b_id, model_b_id=model_id)).json()
+    assert [[v["winner"] for v in h["history"]] for h in h2h] == [["B"], ["-"]]
+
+    response = project_client.get(f"/judge/{judge_id}/download/votes", params=dict(format="parquet"))
+    df_vote = pd.read_parquet(BytesIO(response.content))
+    assert list(df_vote.winner) == ["A", "-"]
+    assert list(df_vote.prompt) == [h["prompt"] for h in h2h]
+
+
+@pytest.mark.parametrize("invalid_column", ["response_a_id", "response_b_id", "judge_id"])
+def test__head_to_head__upload__unknown_id(
+    project_client: TestClient,
+    model_id: int,
+    model_b_id: int,
+    judge_id: int,
+    invalid_column: str,
+) -> None:
+    h2h = project_client.put("/head-to-heads", json=dict(model_a_id=model_id, model_b_id=model_b_id)).json()
+    df_h2h = pd.DataFrame(
+        dict(
+            response_a_id=[h["response_a_id"] for h in h2h],
+            response_b_id=[h["response_b_id"] for h in h2h],
+            judge_id=judge_id,
+            winner=["A", "-"],
+        )
+    )
+    df_h2h.loc[1, invalid_column] = 12345
+    files = dict(file=("h2h.parquet", df_h2h.to_parquet()))
+    response = project_client.post("/head-to-heads", files=files)
+    assert response.status_code == 400
+    assert invalid_column in response.json()["detail"]
+    assert [j["n_votes"] for j in project_client.get("/judges").json() if j["id"] == judge_id] == [0]  # none written
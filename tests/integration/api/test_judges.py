@@ -1,3 +1,4 @@
+import json
 from io import StringIO
 
 import pandas as pd
@@ -88,6 +89,17 @@ def test__judges__download_votes_csv(project_client: TestClient, model_id: int,
     df_vote = pd.read_csv(StringIO(response.text))
     assert df_vote.equals(df_vote_expected)
 
+    response = project_client.get(f"/judge/{human_judge_id}/download/votes", params=dict(format="ndjson"))
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert pd.DataFrame([json.loads(line) for line in response.text.splitlines()]).equals(df_vote_expected)
+
+
+def test__judges__download_votes_csv__empty(project_client: TestClient, judge_id: int) -> None:
+    response = project_client.get(f"/judge/{judge_id}/download/votes")
+    assert response.status_code == 200
+    assert response.text == "prompt,model_a,model_b,response_a,response_b,winner\n"
+    assert project_client.get("/judge/12345/download/votes").status_code == 404
+
 
 def test__judges__delete(project_client: TestClient, judge_id: int) -> None:
     for _ in range(3):  # loop to test idempotence
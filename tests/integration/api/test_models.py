@@ -1,10 +1,13 @@
-from io import StringIO
+import gzip
+import json
+from io import BytesIO, StringIO
 
 import pandas as pd
 import pytest
 from fastapi.testclient import TestClient
 
 from autoarena.api import api
+from autoarena.service.elo import EloService
 from tests.integration.api.conftest import DF_RESPONSE, DF_RESPONSE_B, construct_upload_model_body
 from tests.integration.conftest import assert_recent
 
@@ -124,6 +127,31 @@ def test__models__download_responses_csv(project_client: TestClient, model_id: i
     assert df_response.equals(DF_RESPONSE)
 
 
+def test__models__download_responses__ndjson_gzip(project_client: TestClient, model_id: int) -> None:
+    response = project_client.get(f"/model/{model_id}/download/responses", params=dict(format="ndjson", gzip=True))
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].endswith('.ndjson.gz"')
+    records = [json.loads(line) for line in gzip.decompress(response.content).decode().splitlines()]
+    assert pd.DataFrame(records).equals(DF_RESPONSE)
+
+
+def test__models__upload__parquet(project_client: TestClient) -> None:
+    buf = BytesIO()
+    DF_RESPONSE.to_parquet(buf)
+    files = {"a.parquet": ("a.parquet", buf.getvalue())}
+    (model,) = project_client.post("/model", data={"a.parquet||model_name": "a"}, files=files).json()
+    assert model["n_responses"] == len(DF_RESPONSE)
+    response = project_client.get(f"/model/{model['id']}/download/responses", params=dict(format="parquet"))
+    assert response.headers["content-disposition"].endswith('.parquet"')
+    assert pd.read_parquet(BytesIO(response.content)).equals(DF_RESPONSE)
+
+
+def test__models__upload__unsupported_type(project_client: TestClient) -> None:
+    files = {"a.txt": ("a.txt", "prompt,response\np,r\n", "text/plain")}
+    response = project_client.post("/model", data={"a.txt||model_name": "a"}, files=files)
+    assert response.status_code == 400
+
+
 def test__models__download_responses_csv__failed(project_client: TestClient) -> None:
     assert project_client.get("/model/12345/download/responses").status_code == 404
 
@@ -148,6 +176,57 @@ def test__models__get_ranked_by_judge(
         assert model["q975"] is not None
 
 
+def test__models__get_ranked_by_judge__cached(
+    project_slug: str,
+    project_client: TestClient,
+    model_id: int,
+    model_b_id: int,
+    n_model_a_votes: int,
+) -> None:
+    (human_judge,) = project_client.get("/judges").json()
+    version = EloService.get_head_to_head_version(project_slug, human_judge["id"])
+    assert version > 0
+    models = project_client.get(f"/models/by-judge/{human_judge['id']}").json()
+    assert project_client.get(f"/models/by-judge/{human_judge['id']}").json() == models  # served from cache
+
+    # flipping every vote should invalidate the cached leaderboard
+    h2h = project_client.put("/head-to-heads", json=dict(model_a_id=model_id, model_b_id=model_b_id)).json()
+    for h in h2h:
+        request = dict(
+            response_a_id=h["response_a_id"],
+            response_b_id=h["response_b_id"],
+            winner="B",
+            human_judge_name="human",
+        )
+        assert project_client.post("/head-to-head/vote", json=request).json() is None
+    assert EloService.get_head_to_head_version(project_slug, human_judge["id"]) == version + n_model_a_votes
+    models_flipped = project_client.get(f"/models/by-judge/{human_judge['id']}").json()
+    assert models_flipped[0]["elo"] < models_flipped[1]["elo"]
+
+    # deleting a model removes its head-to-heads via cascading deletes, which should also invalidate the cache
+    assert project_client.delete(f"/model/{model_b_id}").json() is None
+    assert EloService.get_head_to_head_version(project_slug, human_judge["id"]) == version + 2 * n_model_a_votes
+    (model,) = project_client.get(f"/models/by-judge/{human_judge['id']}").json()
+    assert model["n_votes"] == 0
+
+
+def test__models__get_elo_history(
+    project_client: TestClient,
+    model_id: int,
+    model_b_id: int,
+    n_model_a_votes: int,
+) -> None:
+    (human_judge,) = project_client.get("/judges").json()
+    history = project_client.get(f"/model/{model_id}/elo-history").json()
+    assert len(history) == n_model_a_votes
+    assert all(item["other_model_id"] == model_b_id for item in history)
+    assert all(item["judge_id"] == human_judge["id"] for item in history)
+    assert all(history[i - 1]["elo"] < history[i]["elo"] for i in range(1, len(history)))  # won every vote
+    history_b = project_client.get(f"/model/{model_b_id}/elo-history", params=dict(judge_id=human_judge["id"])).json()
+    assert all(history_b[i - 1]["elo"] > history_b[i]["elo"] for i in range(1, len(history_b)))  # lost every vote
+    assert project_client.get("/model/12345/elo-history").status_code == 404
+
+
 def test__models__download_head_to_heads_csv(
     project_client: TestClient,
     model_id: int,
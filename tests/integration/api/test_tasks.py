@@ -1,4 +1,5 @@
 import json
+import time
 
 from fastapi.testclient import TestClient
 
@@ -9,6 +10,13 @@ def parse_sse_stream(stream: bytes) -> list[dict]:
     return [json.loads(r.split("data: ")[-1]) for r in stream.decode("utf-8").split("\n\n") if r != ""]
 
 
+def wait_for_tasks(project_client: TestClient, timeout: float = 10) -> list[dict]:
+    t_start = time.time()
+    while len(tasks := project_client.get("/tasks").json()) == 0 and time.time() - t_start < timeout:
+        time.sleep(0.1)
+    return tasks
+
+
 def test__tasks__get(project_client: TestClient) -> None:
     assert project_client.get("/tasks").json() == []
     fine_tune_request = dict(base_model="gemma2:2b")
@@ -31,7 +39,7 @@ def test__tasks__has_active(project_client: TestClient) -> None:
 
 def test__tasks__get_stream(project_client: TestClient, model_ids: list[int]) -> None:
     assert project_client.delete(f"/model/{model_ids[0]}").json() is None  # kicks off a leaderboard recompute
-    tasks = project_client.get("/tasks").json()
+    tasks = wait_for_tasks(project_client)
     assert len(tasks) == 1
     task_stream = project_client.get(f"/task/{tasks[0]['id']}/stream")
     responses = parse_sse_stream(task_stream.read())
@@ -39,7 +47,37 @@ def test__tasks__get_stream(project_client: TestClient, model_ids: list[int]) ->
     assert responses[0] == tasks[0]
 
 
+def test__tasks__get_leaderboard_queue(project_client: TestClient, model_ids: list[int]) -> None:
+    queue = project_client.get("/tasks/leaderboard-queue").json()
+    assert queue["n_pending_changes"] == 0
+    assert queue["is_running"] is False
+    assert queue["seconds_until_run"] is None
+
+    # a burst of changes is coalesced into a single recompute
+    assert project_client.delete(f"/model/{model_ids[0]}").json() is None
+    assert project_client.delete(f"/model/{model_ids[1]}").json() is None
+    queue = project_client.get("/tasks/leaderboard-queue").json()
+    assert queue["n_pending_changes"] == 2
+    assert queue["seconds_until_run"] is not None
+    assert len(wait_for_tasks(project_client)) == 1
+    t_start = time.time()
+    while (queue := project_client.get("/tasks/leaderboard-queue").json())["n_pending_changes"] > 0:
+        assert time.time() - t_start < 10
+        time.sleep(0.1)
+    assert queue["seconds_until_run"] is None
+    assert len(project_client.get("/tasks").json()) == 1
+
+
 def test__tasks__delete_completed(project_client: TestClient) -> None:
     for _ in range(2):  # loop to check idempotence
         assert project_client.delete("/tasks/completed").json() is None
         assert project_client.get("/tasks").json() == []
+
+
+def test__tasks__maintenance(project_client: TestClient, model_ids: list[int]) -> None:
+    assert project_client.post("/task/maintenance").json() is None  # runs in the background
+    tasks = wait_for_tasks(project_client)
+    assert len(tasks) == 1
+    assert tasks[0]["task_type"] == "maintenance"
+    assert tasks[0]["status"] == "completed"
+    assert tasks[0]["progress"] == 1
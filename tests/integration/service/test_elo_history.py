@@ -0,0 +1,116 @@
+import dataclasses
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from autoarena.api import api
+from autoarena.error import NotFoundError
+from autoarena.service.elo import EloConfig
+from autoarena.service.elo_history import EloHistoryService
+from autoarena.service.head_to_head import HeadToHeadService
+from autoarena.service.judge import JudgeService
+from autoarena.service.model import ModelService
+from autoarena.service.project import ProjectService
+
+CONFIG = EloConfig(n_votes_per_history_checkpoint=3)
+CONFIG_NO_CHECKPOINTS = dataclasses.replace(CONFIG, n_votes_per_history_checkpoint=1_000_000)
+
+
+def count_checkpoints(project_slug: str) -> int:
+    with ProjectService.connect(project_slug) as conn:
+        query = "SELECT COUNT(DISTINCT head_to_head_id) FROM elo_checkpoint WHERE judge_id IS NULL"  # across all judges
+        ((count,),) = conn.execute(query).fetchall()
+    return count
+
+
+def test__elo_history__get_history(project_slug: str) -> None:
+    prompts = [f"p{i}" for i in range(5)]
+    model_ids = [
+        ModelService.upload_responses(project_slug, name, pd.DataFrame(dict(prompt=prompts, response=name))).id
+        for name in ["a", "b", "c"]
+    ]
+    h2hs = HeadToHeadService.get(project_slug, api.HeadToHeadsRequest(model_a_id=model_ids[0]))
+    for i, h2h in enumerate(h2hs):
+        judge_name = "first" if i % 2 == 0 else "second"
+        request = api.HeadToHeadVoteRequest(h2h.response_a_id, h2h.response_b_id, "A", human_judge_name=judge_name)
+        HeadToHeadService.submit_vote(project_slug, request)
+
+    # reads never materialize checkpoints, replaying everything until history is extended on the write side
+    history = EloHistoryService.get_history(project_slug, model_ids[0], config=CONFIG)
+    assert len(history) == len(h2hs)
+    assert count_checkpoints(project_slug) == 0
+
+    # served from checkpoints plus a replay of the tail, matching a replay from scratch
+    EloHistoryService.extend_all(project_slug, config=CONFIG)
+    assert count_checkpoints(project_slug) == len(h2hs) // 3
+    assert history == EloHistoryService.get_history(project_slug, model_ids[0], config=CONFIG)
+    assert history == EloHistoryService.get_history(project_slug, model_ids[0], config=CONFIG_NO_CHECKPOINTS)
+    assert {item.other_model_id for item in history} == set(model_ids[1:])
+    assert {item.judge_name for item in history} == {"first", "second"}
+
+    # per-judge history only includes that judge's votes
+    judge_id = {j.name: j.id for j in JudgeService.get_all(project_slug)}["first"]
+    history_judge = EloHistoryService.get_history(project_slug, model_ids[0], judge_id=judge_id, config=CONFIG)
+    assert len(history_judge) == (len(h2hs) + 1) // 2
+    assert all(item.judge_id == judge_id for item in history_judge)
+
+    # changing an early vote discards the checkpoints that replayed it
+    h2h = h2hs[0]
+    request = api.HeadToHeadVoteRequest(h2h.response_a_id, h2h.response_b_id, "B", human_judge_name="first")
+    HeadToHeadService.submit_vote(project_slug, request)
+    assert count_checkpoints(project_slug) == 0
+    EloHistoryService.extend_all(project_slug, config=CONFIG)
+    history_changed = EloHistoryService.get_history(project_slug, model_ids[0], config=CONFIG)
+    assert history_changed != history
+    assert history_changed == EloHistoryService.get_history(project_slug, model_ids[0], config=CONFIG_NO_CHECKPOINTS)
+
+
+def test__elo_history__get_history__not_found(project_slug: str) -> None:
+    with pytest.raises(NotFoundError):
+        EloHistoryService.get_history(project_slug, 12345)
+
+
+def test__elo_history__extend__existing_project(project_slug: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    n_votes = 3_000
+    prompts = [f"p{i}" for i in range(n_votes)]
+    model_ids = [
+        ModelService.upload_responses(project_slug, name, pd.DataFrame(dict(prompt=prompts, response=name))).id
+        for name in ["a", "b"]
+    ]
+    h2hs = HeadToHeadService.get(project_slug, api.HeadToHeadsRequest(model_a_id=model_ids[0]))
+    JudgeService.create_human_judge(project_slug, "human")
+    (judge,) = JudgeService.get_all(project_slug)
+    df_h2h = pd.DataFrame(
+        dict(
+            response_a_id=[h2h.response_a_id for h2h in h2hs],
+            response_b_id=[h2h.response_b_id for h2h in h2hs],
+            judge_id=judge.id,
+            winner=[["A", "B", "-", "A"][i % 4] for i in range(n_votes)],
+        )
+    )
+    HeadToHeadService.upload_head_to_heads(project_slug, df_h2h)
+    config = dataclasses.replace(CONFIG, n_votes_per_history_checkpoint=500)
+
+    # each stretch is committed on its own, such that an interrupted first build keeps what it had materialized
+    replay = EloHistoryService._replay
+    n_replayed = 0
+
+    def replay_interrupted(*args: Any, **kwargs: Any) -> tuple[list[float], list[float]]:
+        nonlocal n_replayed
+        n_replayed += 1
+        if n_replayed > 2:
+            raise RuntimeError("interrupted")
+        return replay(*args, **kwargs)
+
+    monkeypatch.setattr(EloHistoryService, "_replay", staticmethod(replay_interrupted))
+    with pytest.raises(RuntimeError):
+        EloHistoryService.extend(project_slug, config=config)
+    assert count_checkpoints(project_slug) == 2
+    monkeypatch.undo()
+
+    EloHistoryService.extend(project_slug, config=config)
+    assert count_checkpoints(project_slug) == n_votes // 500
+    history = EloHistoryService.get_history(project_slug, model_ids[0], config=config)
+    assert len(history) == n_votes
+    assert history == EloHistoryService.get_history(project_slug, model_ids[0], config=CONFIG_NO_CHECKPOINTS)
@@ -1,6 +1,8 @@
+import numpy as np
 import pandas as pd
 
 from autoarena.api import api
+from autoarena.service.elo import EloService
 from autoarena.service.head_to_head import HeadToHeadService
 from autoarena.service.judge import JudgeService
 from autoarena.service.model import ModelService
@@ -50,3 +52,104 @@ def test__head_to_head__upload__replace(project_slug: str) -> None:
     # vote again for the original winner and ensure it's still correct
     HeadToHeadService.upload_head_to_heads(project_slug, df_h2h_input)
     verify_df_h2h_retrieved(HeadToHeadService.get_df(project_slug, head_to_heads_request))
+
+
+def test__head_to_head__submit_vote__leaderboard_state(project_slug: str) -> None:
+    df_a = pd.DataFrame([("p1", "ra1"), ("p2", "ra2")], columns=["prompt", "response"])
+    model_a = ModelService.upload_responses(project_slug, "model_a", df_a)
+    df_b = pd.DataFrame([("p1", "rb1"), ("p2", "rb2")], columns=["prompt", "response"])
+    model_b = ModelService.upload_responses(project_slug, "model_b", df_b)
+    h2h = HeadToHeadService.get(project_slug, api.HeadToHeadsRequest(model_a_id=model_a.id))[0]
+
+    def vote(response_a_id: int, response_b_id: int, winner: str) -> None:
+        request = api.HeadToHeadVoteRequest(response_a_id, response_b_id, winner, human_judge_name="tester")
+        HeadToHeadService.submit_vote(project_slug, request)
+
+    # new votes are applied incrementally
+    vote(h2h.response_a_id, h2h.response_b_id, "A")
+    state = EloService.get_leaderboard_state(project_slug)
+    assert (state.n_pending_votes, state.n_pending_changes) == (1, 0)
+    assert ModelService.get_by_id(project_slug, model_a.id).elo > ModelService.get_by_id(project_slug, model_b.id).elo
+
+    # repeated votes for the same winner, in either order, are no-ops
+    vote(h2h.response_a_id, h2h.response_b_id, "A")
+    vote(h2h.response_b_id, h2h.response_a_id, "B")
+    state = EloService.get_leaderboard_state(project_slug)
+    assert (state.n_pending_votes, state.n_pending_changes) == (1, 0)
+
+    # changed votes can't be applied incrementally and require a full recompute
+    vote(h2h.response_a_id, h2h.response_b_id, "B")
+    state = EloService.get_leaderboard_state(project_slug)
+    assert (state.n_pending_votes, state.n_pending_changes) == (1, 1)
+    assert EloService.get_reseed_delay(project_slug) == 0
+
+    EloService.reseed_scores(project_slug)
+    state = EloService.get_leaderboard_state(project_slug)
+    assert (state.n_pending_votes, state.n_pending_changes) == (0, 0)
+    assert EloService.get_reseed_delay(project_slug) is None
+    assert ModelService.get_by_id(project_slug, model_a.id).elo < ModelService.get_by_id(project_slug, model_b.id).elo
+
+
+def test__head_to_head__get_head_to_head_arrays__judge_filter(project_slug: str) -> None:
+    df_a = pd.DataFrame([("p1", "ra1"), ("p2", "ra2")], columns=["prompt", "response"])
+    model_a = ModelService.upload_responses(project_slug, "model_a", df_a)
+    df_b = pd.DataFrame([("p1", "rb1"), ("p2", "rb2")], columns=["prompt", "response"])
+    model_b = ModelService.upload_responses(project_slug, "model_b", df_b)
+    h2h_1, h2h_2 = HeadToHeadService.get(project_slug, api.HeadToHeadsRequest(model_a_id=model_a.id))
+    for h2h, judge_name in [(h2h_1, "first"), (h2h_2, "second"), (h2h_1, "second")]:
+        request = api.HeadToHeadVoteRequest(h2h.response_a_id, h2h.response_b_id, "A", human_judge_name=judge_name)
+        HeadToHeadService.submit_vote(project_slug, request)
+    judge_id = {j.name: j.id for j in JudgeService.get_all(project_slug)}["second"]
+
+    assert len(EloService.get_head_to_head_arrays(project_slug).head_to_head_id) == 3
+
+    h2h_arrays = EloService.get_head_to_head_arrays(project_slug, judge_id=judge_id)
+    assert len(h2h_arrays.head_to_head_id) == 2
+    assert list(h2h_arrays.head_to_head_id) == sorted(h2h_arrays.head_to_head_id)  # in submission order
+    assert all(h2h_arrays.judge_id == judge_id)
+    assert set(h2h_arrays.model_a_id) | set(h2h_arrays.model_b_id) == {model_a.id, model_b.id}
+    assert h2h_arrays.winner.dtype == np.int8
+    assert h2h_arrays.model_names == {model_a.id: "model_a", model_b.id: "model_b"}
+    assert h2h_arrays.judge_names[judge_id] == "second"
+
+
+def test__head_to_head__response_pairs__maintained(project_slug: str) -> None:
+    df_a = pd.DataFrame(dict(prompt=["p1", "p2", "p3"], response="a"))
+    model_a = ModelService.upload_responses(project_slug, "a", df_a)
+    assert HeadToHeadService.get_count(project_slug) == 0
+
+    model_b = ModelService.upload_responses(project_slug, "b", pd.DataFrame(dict(prompt=["p1", "p2"], response="b")))
+    model_c = ModelService.upload_responses(project_slug, "c", pd.DataFrame(dict(prompt=["p2", "p4"], response="c")))
+    assert HeadToHeadService.get_count(project_slug) == 4  # a-b on p1 and p2, a-c and b-c on p2
+
+    # pairs are oriented to the requested model regardless of which side of the stored pair it occupies
+    df_h2h = HeadToHeadService.get_df(project_slug, api.HeadToHeadsRequest(model_a_id=model_c.id))
+    assert df_h2h.model_a_id.tolist() == [model_c.id, model_c.id]
+    assert set(df_h2h.model_b_id) == {model_a.id, model_b.id}
+    assert (df_h2h.response_a == "c").all() and (df_h2h.prompt == "p2").all()
+
+    ModelService.delete(project_slug, model_b.id)
+    assert HeadToHeadService.get_count(project_slug) == 1
+    df_h2h = HeadToHeadService.get_df(project_slug, api.HeadToHeadsRequest(model_a_id=model_a.id))
+    assert df_h2h.model_b_id.tolist() == [model_c.id]
+
+
+def test__head_to_head__get_df_for_models(project_slug: str) -> None:
+    model_a = ModelService.upload_responses(project_slug, "a", pd.DataFrame(dict(prompt=["p1", "p2"], response="a")))
+    model_b = ModelService.upload_responses(project_slug, "b", pd.DataFrame(dict(prompt=["p1", "p2"], response="b")))
+    model_c = ModelService.upload_responses(project_slug, "c", pd.DataFrame(dict(prompt=["p2"], response="c")))
+    h2h_1, _ = HeadToHeadService.get(project_slug, api.HeadToHeadsRequest(model_a_id=model_b.id, model_b_id=model_a.id))
+    request = api.HeadToHeadVoteRequest(h2h_1.response_a_id, h2h_1.response_b_id, "A", human_judge_name="human")
+    HeadToHeadService.submit_vote(project_slug, request)
+    (judge,) = JudgeService.get_all(project_slug)
+
+    # pairs between the selected models are returned once, not once per model
+    df_h2h = HeadToHeadService.get_df_for_models(project_slug, [model_a.id, model_b.id], [judge.id])
+    assert len(df_h2h) == HeadToHeadService.get_count(project_slug) == 4
+    assert (df_h2h.response_a_id < df_h2h.response_b_id).all()
+    assert df_h2h[f"voted_{judge.id}"].tolist() == [True, False, False, False]
+    assert df_h2h.iloc[0].prompt == "p1"
+
+    df_h2h = HeadToHeadService.get_df_for_models(project_slug, [model_c.id], [])
+    assert set(df_h2h.model_a_id) | set(df_h2h.model_b_id) == {model_a.id, model_b.id, model_c.id}
+    assert len(df_h2h) == 2 and list(df_h2h.prompt) == ["p2", "p2"]
@@ -1,10 +1,13 @@
 import sqlite3
 from pathlib import Path
 
+import pandas as pd
 import pytest
 
 from autoarena.api import api
 from autoarena.error import MigrationError, NotFoundError
+from autoarena.service.head_to_head import HeadToHeadService
+from autoarena.service.model import ModelService
 from autoarena.service.project import ProjectService
 from autoarena.store.database import get_available_migrations, MIGRATION_DIRECTORY
 
@@ -70,3 +73,123 @@ def test__migration__existing__pre_migration_system(test_data_directory: Path) -
         conn.commit()
     project = ProjectService.create_idempotent(api.CreateProjectRequest(name=project_name))
     assert_all_migrations_applied(project)
+
+
+def test__migration__prompt_table(test_data_directory: Path) -> None:
+    project_name = "test__migration__prompt_table"
+    old_database_file = test_data_directory / f"{project_name}.sqlite"
+    with sqlite3.connect(str(old_database_file)) as conn:
+        cur = conn.cursor()
+        cur.execute("PRAGMA journal_mode = WAL")  # as set by AutoArena on any existing project
+        for migration in get_available_migrations():
+            if migration.name.startswith("007__"):
+                break
+            cur.executescript(migration.read_text())
+            cur.execute(
+                "INSERT INTO migration (migration_index, filename) VALUES (?, ?)",
+                (int(migration.name.split("__")[0]), migration.name),
+            )
+        cur.executescript("""
+            INSERT INTO model (id, name) VALUES (1, 'a'), (2, 'b');
+            INSERT INTO response (id, model_id, prompt, response)
+            VALUES (1, 1, 'p', 'ra'), (2, 2, 'p', 'rb'), (3, 2, 'q', 'deleted');
+            DELETE FROM response WHERE id = 3;
+            INSERT INTO judge (id, judge_type, name, description) VALUES (1, 'human', 'human', 'human');
+            INSERT INTO head_to_head (response_id_slug, response_a_id, response_b_id, judge_id, winner)
+            VALUES ('1-2', 1, 2, 1, 'A');
+        """)
+        conn.commit()
+
+    project = ProjectService.create_idempotent(api.CreateProjectRequest(name=project_name))
+    assert_all_migrations_applied(project)
+    with ProjectService.connect(project.slug) as conn:
+        assert conn.execute("SELECT id, text FROM prompt").fetchall() == [(1, "p")]
+        assert conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'response'").fetchall() == [(3,)]
+        assert conn.execute("SELECT id, model_id, prompt_id, response FROM response").fetchall() == [
+            (1, 1, 1, "ra"),
+            (2, 2, 1, "rb"),
+        ]
+        assert conn.execute("SELECT response_a_id, response_b_id, winner FROM head_to_head").fetchall() == [(1, 2, 1)]
+        assert conn.execute("SELECT response_id_slug, winner FROM head_to_head_labeled").fetchall() == [("1-2", "A")]
+        pair_columns = "response_a_id, response_b_id, model_a_id, model_b_id"
+        assert conn.execute(f"SELECT {pair_columns} FROM response_pair").fetchall() == [(1, 2, 1, 2)]
+        assert conn.execute("SELECT n_pairs FROM response_pair_counter").fetchall() == [(1,)]
+        assert conn.execute("SELECT n_responses, n_votes FROM model").fetchall() == [(1, 1), (1, 1)]
+        assert conn.execute("SELECT n_votes FROM judge").fetchall() == [(1,)]
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+        assert conn.execute("PRAGMA foreign_keys").fetchall() == [(1,)]
+
+
+def test__prompt__deleted_with_last_response(project_slug: str) -> None:
+    def get_prompts() -> list[str]:
+        with ProjectService.connect(project_slug) as conn:
+            return [text for (text,) in conn.execute("SELECT text FROM prompt ORDER BY id").fetchall()]
+
+    model_a = ModelService.upload_responses(project_slug, "a", pd.DataFrame(dict(prompt=["p1", "p2"], response="a")))
+    model_b = ModelService.upload_responses(project_slug, "b", pd.DataFrame(dict(prompt=["p2", "p3"], response="b")))
+    assert get_prompts() == ["p1", "p2", "p3"]
+    ModelService.delete(project_slug, model_a.id)
+    assert get_prompts() == ["p2", "p3"]  # p2 is still answered by model b
+    ModelService.delete(project_slug, model_b.id)
+    assert get_prompts() == []
+
+
+def test__repair_counters(project_slug: str) -> None:
+    def get_counters() -> tuple[list, list, int]:
+        with ProjectService.connect(project_slug) as conn:
+            models = conn.execute("SELECT name, n_responses, n_votes FROM model ORDER BY id").fetchall()
+            judges = conn.execute("SELECT name, n_votes FROM judge ORDER BY id").fetchall()
+        return models, judges, HeadToHeadService.get_count(project_slug)
+
+    # responses 1 and 2 from model a, 3 and 4 from b, and 5 from c
+    for name, prompts in [("a", ["p1", "p2"]), ("b", ["p1", "p2"]), ("c", ["p1"])]:
+        ModelService.upload_responses(project_slug, name, pd.DataFrame(dict(prompt=prompts, response="r")))
+    with ProjectService.connect(project_slug, commit=True) as conn:
+        conn.executescript("""
+            INSERT INTO judge (id, judge_type, name, description) VALUES (1, 'human', 'x', ''), (2, 'human', 'y', '');
+            INSERT INTO head_to_head (response_a_id, response_b_id, judge_id, winner)
+            VALUES (1, 3, 1, 1), (5, 1, 1, -1), (2, 4, 2, 0), (3, 5, 2, 1);
+        """)
+    assert get_counters() == ([("a", 2, 3), ("b", 2, 3), ("c", 1, 2)], [("x", 2), ("y", 2)], 4)
+
+    with ProjectService.connect(project_slug, commit=True) as conn:
+        conn.execute("DELETE FROM model WHERE id = 3")  # cascades through responses to head-to-heads
+        conn.execute("DELETE FROM judge WHERE id = 2")
+    expected = ([("a", 2, 1), ("b", 2, 1)], [("x", 1)], 2)
+    assert get_counters() == expected
+
+    with ProjectService.connect(project_slug, commit=True) as conn:
+        conn.execute("UPDATE model SET n_responses = 0, n_votes = 100")
+        conn.execute("UPDATE judge SET n_votes = -1")
+        conn.execute("UPDATE response_pair_counter SET n_pairs = 0")
+    ProjectService.repair_counters(project_slug)
+    assert get_counters() == expected
+
+
+def test__maintain__full_vacuum(project_slug: str) -> None:
+    def get_vacuum_state() -> tuple[int, int]:
+        # read from a writing connection, as readers opened before a vacuum keep reporting the former mode
+        with ProjectService.connect(project_slug, commit=True) as conn:
+            ((auto_vacuum,),) = conn.execute("PRAGMA auto_vacuum").fetchall()
+            ((n_free_pages,),) = conn.execute("PRAGMA freelist_count").fetchall()
+        return auto_vacuum, n_free_pages
+
+    # set up a file as created before incremental vacuuming was enabled, with plenty of free pages
+    with ProjectService.connect(project_slug, commit=True) as conn:
+        conn.commit()
+        conn.execute("PRAGMA auto_vacuum = NONE")
+        conn.execute("VACUUM")
+        conn.execute("""
+            WITH RECURSIVE n (i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 2000)
+            INSERT INTO prompt (text) SELECT i || printf('%.*c', 1000, 'x') FROM n
+        """)
+    with ProjectService.connect(project_slug, commit=True) as conn:
+        conn.execute("DELETE FROM prompt")
+    auto_vacuum, n_free_pages = get_vacuum_state()
+    assert auto_vacuum == 0 and n_free_pages > 0
+
+    ProjectService.maintain(project_slug)  # as scheduled automatically, which leaves the file as it is
+    assert get_vacuum_state() == (auto_vacuum, n_free_pages)
+
+    ProjectService.maintain(project_slug, full_vacuum=True)
+    assert get_vacuum_state() == (2, 0)  # incremental
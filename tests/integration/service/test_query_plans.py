@@ -0,0 +1,84 @@
+import re
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from autoarena.api import api
+from autoarena.service.elo_history import EloHistoryService
+from autoarena.service.head_to_head import HeadToHeadService
+from autoarena.service.judge import JudgeService
+from autoarena.service.model import ModelService
+from autoarena.service.project import ProjectService
+from autoarena.store.database import ConnectionPool, CONNECTION_POOL, get_database_connection
+
+# tables that grow with project size and must never be fully scanned
+LARGE_TABLES = {"head_to_head", "response", "prompt", "response_pair"}
+
+
+@pytest.fixture
+def traced_statements(project_slug: str, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    statements: list[str] = []
+    open_connection = ConnectionPool._open
+
+    def open_traced(path: Path, commit: bool) -> sqlite3.Connection:
+        conn = open_connection(path, commit)
+        conn.set_trace_callback(statements.append)  # receives statements with bound parameters expanded
+        return conn
+
+    monkeypatch.setattr(ConnectionPool, "_open", staticmethod(open_traced))
+    CONNECTION_POOL.close(ProjectService._slug_to_path(project_slug))
+    return statements
+
+
+def get_full_scans(conn: sqlite3.Connection, statement: str) -> list[str]:
+    aliases = {
+        alias: table
+        for table, alias in re.findall(r"(?:FROM|JOIN)\s+(\w+)\s+(?:AS\s+)?(\w+)", statement, flags=re.IGNORECASE)
+    }
+    aliases.update({table: table for table in LARGE_TABLES})
+    full_scans = []
+    for *_, detail in conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall():
+        match = re.match(r"(SCAN|SEARCH) (\w+)", detail)
+        if match is None or aliases.get(match.group(2)) not in LARGE_TABLES:
+            continue
+        # a scan reads every row even when using a (covering) index, only searches seek to the rows they need
+        if match.group(1) == "SCAN" or "AUTOMATIC" in detail:
+            full_scans.append(detail)
+    return full_scans
+
+
+def test__query_plans__no_full_scans(project_slug: str, traced_statements: list[str]) -> None:
+    prompts = [f"p{i}" for i in range(10)]
+    model_ids = [
+        ModelService.upload_responses(project_slug, name, pd.DataFrame(dict(prompt=prompts, response=name))).id
+        for name in ["a", "b", "c"]
+    ]
+    for h2h in HeadToHeadService.get(project_slug, api.HeadToHeadsRequest(model_a_id=model_ids[0])):
+        request = api.HeadToHeadVoteRequest(h2h.response_a_id, h2h.response_b_id, "A", human_judge_name="human")
+        HeadToHeadService.submit_vote(project_slug, request)
+    (judge,) = JudgeService.get_all(project_slug)
+
+    traced_statements.clear()
+    HeadToHeadService.get(project_slug, api.HeadToHeadsRequest(model_a_id=model_ids[0], model_b_id=model_ids[1]))
+    HeadToHeadService.get(project_slug, api.HeadToHeadsRequest(model_a_id=model_ids[2]))
+    page = HeadToHeadService.get_page(project_slug, api.HeadToHeadsPageRequest(model_a_id=model_ids[2], limit=5))
+    HeadToHeadService.get_page(
+        project_slug, api.HeadToHeadsPageRequest(model_a_id=model_ids[2], cursor=page.next_cursor, ids_only=True)
+    )
+    ModelService.get_responses_by_id(project_slug, [page.head_to_heads[0].response_a_id])
+    HeadToHeadService.get_count(project_slug)
+    HeadToHeadService.get_df_for_models(project_slug, model_ids[:2], [judge.id])
+    JudgeService.get_all(project_slug)
+    ModelService.get_all(project_slug)
+    ModelService.get_all_ranked_by_judge(project_slug, judge.id)
+    ModelService.get_head_to_head_stats(project_slug, model_ids[0])
+    ModelService.get_df_head_to_head(project_slug, model_ids[0])
+    EloHistoryService.get_history(project_slug, model_ids[0], judge_id=judge.id)
+
+    queries = [s for s in traced_statements if re.match(r"\s*(SELECT|WITH)\b", s, flags=re.IGNORECASE)]
+    assert len(queries) > 0
+    with get_database_connection(ProjectService._slug_to_path(project_slug)) as conn:
+        full_scans = {query: scans for query in queries if len(scans := get_full_scans(conn, query)) > 0}
+    assert full_scans == {}
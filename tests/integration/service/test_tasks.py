@@ -1,5 +1,6 @@
 import contextvars
 from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Callable
 
 import pandas as pd
@@ -12,8 +13,10 @@ from autoarena.judge.executor import BlockingExecutor
 from autoarena.service.head_to_head import HeadToHeadService
 from autoarena.service.judge import JudgeService
 from autoarena.service.model import ModelService
+from autoarena.service.project import ProjectService
 from autoarena.service.task import TaskService
 from autoarena.task.auto_judge import AutoJudgeTask
+from autoarena.task.maintenance_scheduler import MaintenanceScheduler
 from tests.integration.conftest import assert_recent
 
 TEST_QUESTIONS = [
@@ -183,6 +186,30 @@ def test__task__recompute_leaderboard(project_slug: str, models_with_responses:
     assert_recent(tasks[0].created)
 
 
+def test__task__maintenance(project_slug: str) -> None:
+    df_response = pd.DataFrame(dict(prompt=[f"p{i}" for i in range(2_000)], response="x" * 1_000))
+    model = ModelService.upload_responses(project_slug, "large", df_response)
+    ModelService.delete(project_slug, model.id)  # leaves free pages behind
+    path = ProjectService._slug_to_path(project_slug)
+    wal_path = Path(f"{path}-wal")
+    with ProjectService.connect(project_slug) as conn:
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] > 0
+    assert wal_path.stat().st_size > 0
+
+    scheduler = MaintenanceScheduler(max_wal_bytes=0)
+    assert scheduler.needs_maintenance(project_slug)
+    assert scheduler.run(project_slug)
+    with ProjectService.connect(project_slug) as conn:
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    assert not MaintenanceScheduler(max_wal_bytes=wal_path.stat().st_size).needs_maintenance(project_slug)
+
+    tasks = TaskService.get_all(project_slug)
+    assert len(tasks) == 1
+    assert tasks[0].task_type is api.TaskType.MAINTENANCE
+    assert tasks[0].status is api.TaskStatus.COMPLETED
+    assert "Checkpointed" in tasks[0].logs and "Reclaimed" in tasks[0].logs
+
+
 def test__auto_judge_task__saves_progress(
     project_slug: str,
     models_with_responses: tuple[api.Model, api.Model],
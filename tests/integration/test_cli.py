@@ -5,9 +5,10 @@ import pandas as pd
 import pytest
 
 from autoarena.api import api
-from autoarena.main import main
+from autoarena.main import main, parse_args
 from autoarena.service.head_to_head import HeadToHeadService
 from autoarena.service.model import ModelService
+from autoarena.service.elo import RATING_METHOD_ENV
 from autoarena.service.project import ProjectService
 
 
@@ -19,6 +20,18 @@ def test__cli__help(arg: str, test_data_directory: Path, capsys: pytest.CaptureF
     assert "usage: autoarena" in capsys.readouterr().out
 
 
+def test__cli__rating_method(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]) -> None:
+    monkeypatch.setenv(RATING_METHOD_ENV, "bradley-terry")
+    assert parse_args(["serve"]).rating_method is None  # left for the environment to decide
+    assert parse_args(["serve", "--rating-method", "elo"]).rating_method == "elo"
+    monkeypatch.setenv(RATING_METHOD_ENV, "does-not-exist")
+    assert parse_args(["serve", "--rating-method", "elo"]).rating_method == "elo"  # overridden by the flag
+    with pytest.raises(SystemExit) as e:
+        parse_args(["serve"])
+    assert e.value.code == 2
+    assert f"invalid ${RATING_METHOD_ENV}: 'does-not-exist'" in capsys.readouterr().err
+
+
 def test__cli__seed(test_data_directory: Path) -> None:
     h2h_records = [
         dict(model_a="a", model_b="b", prompt="example", response_a="response a", response_b="response b", winner="-"),
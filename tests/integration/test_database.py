@@ -4,7 +4,13 @@ from pathlib import Path
 
 import pytest
 
-from autoarena.store.database import get_database_connection
+from autoarena.store.database import (
+    get_database_connection,
+    get_storage_profile,
+    CONNECTION_POOL,
+    STORAGE_PROFILE_ENV,
+    STORAGE_PROFILES,
+)
 
 
 @pytest.mark.parametrize("n_readers", [2**i for i in range(1, 11)])  # up to 1024
@@ -87,3 +93,50 @@ def test__multiprocessing(n_subprocesses: int, test_data_directory: Path) -> Non
 
     with get_database_connection(database_file) as conn:
         assert conn.cursor().execute("SELECT COUNT(*) FROM test").fetchone() == (1 + n_subprocesses,)
+
+
+def test__connection_pool(test_data_directory: Path) -> None:
+    database_file = test_data_directory / "test__connection_pool.sqlite"
+    with get_database_connection(database_file, commit=True) as conn:
+        conn.execute("CREATE TABLE test (id INTEGER PRIMARY KEY)")
+    with get_database_connection(database_file) as conn_reader:
+        conn_reader.execute("BEGIN")  # left open, should be rolled back before reuse
+    with get_database_connection(database_file) as conn_reader_2:
+        assert conn_reader_2 is conn_reader
+        assert not conn_reader_2.in_transaction
+        assert conn_reader_2.execute("PRAGMA foreign_keys").fetchone() == (1,)  # connection is configured
+
+    # connections are discarded when the database is closed, including those in use at the time
+    with get_database_connection(database_file) as conn_reader_3:
+        CONNECTION_POOL.close(database_file)
+    with get_database_connection(database_file) as conn_reader_4:
+        assert conn_reader_4 is not conn_reader_3
+        assert conn_reader_4 is not conn_reader
+
+
+@pytest.mark.parametrize("profile_name", ["performance", "default"])
+def test__storage_profile(profile_name: str, test_data_directory: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(STORAGE_PROFILE_ENV, profile_name)
+    profile = STORAGE_PROFILES[profile_name]
+    database_file = test_data_directory / f"test__storage_profile__{profile_name}.sqlite"
+    with get_database_connection(database_file, commit=True) as conn:
+        conn.execute("CREATE TABLE test (id INTEGER PRIMARY KEY)")  # page size is fixed once the file is written
+    for commit in (True, False):
+        with get_database_connection(database_file, commit=commit) as conn:
+            assert conn.execute("PRAGMA page_size").fetchone() == (profile.page_size,)
+            assert conn.execute("PRAGMA mmap_size").fetchone() == (profile.mmap_size,)
+            assert conn.execute("PRAGMA cache_size").fetchone() == (profile.cache_size,)
+            expected_synchronous = {"FULL": 2, "NORMAL": 1}[profile.synchronous]
+            assert conn.execute("PRAGMA synchronous").fetchone() == (expected_synchronous,)
+    CONNECTION_POOL.close(database_file)
+
+
+def test__storage_profile__unrecognized(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(STORAGE_PROFILE_ENV, "does-not-exist")
+    with pytest.raises(ValueError):
+        get_storage_profile()
+
+
+def test__storage_profile__default(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(STORAGE_PROFILE_ENV, raising=False)
+    assert get_storage_profile() == STORAGE_PROFILES["default"]  # performance settings are opt-in
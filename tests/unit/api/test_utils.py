@@ -0,0 +1,58 @@
+import asyncio
+import gzip
+import json
+from io import BytesIO, StringIO
+from typing import Iterator
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from starlette.responses import StreamingResponse
+
+from autoarena.api import api
+from autoarena.api.utils import download_response
+
+DF = pd.DataFrame(dict(prompt=["p1", "p2", "p3"], response=["r1", "r,2", "r\n3"], extra=[1, 2, 3]))
+
+
+def chunked(df: pd.DataFrame, chunk_size: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start : start + chunk_size]
+
+
+def read_body(response: StreamingResponse) -> bytes:
+    async def read() -> bytes:
+        chunks: list[bytes] = []
+        async for chunk in response.body_iterator:  # typed as str | bytes | memoryview, though only bytes are sent
+            chunks.append(chunk.encode() if isinstance(chunk, str) else bytes(chunk))
+        return b"".join(chunks)
+
+    return asyncio.run(read())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 10])
+@pytest.mark.parametrize("export_format", list(api.ExportFormat))
+@pytest.mark.parametrize("use_gzip", [False, True])
+def test__download_response(chunk_size: int, export_format: api.ExportFormat, use_gzip: bool) -> None:
+    response = download_response(chunked(DF, chunk_size), ["prompt", "response"], "x", export_format, gzip=use_gzip)
+    extension = f"{export_format.value}.gz" if use_gzip else export_format.value
+    assert response.headers["content-disposition"] == f'attachment; filename="x.{extension}"'
+    body = read_body(response)
+    text = (gzip.decompress(body) if use_gzip else body).decode(errors="replace")
+    if export_format is api.ExportFormat.PARQUET:
+        parquet_file = pq.ParquetFile(BytesIO(gzip.decompress(body) if use_gzip else body))
+        assert parquet_file.num_row_groups == -(-len(DF) // chunk_size)  # one per chunk
+        df = parquet_file.read().to_pandas()
+    elif export_format is api.ExportFormat.CSV:
+        df = pd.read_csv(StringIO(text))
+    else:
+        df = pd.DataFrame([json.loads(line) for line in text.splitlines()])
+    assert df.equals(DF[["prompt", "response"]])
+
+
+def test__download_response__empty() -> None:
+    df_empty = DF.iloc[:0]
+    assert read_body(download_response(iter([df_empty]), ["prompt"], "x")) == b"prompt\n"
+    assert read_body(download_response(iter([df_empty]), ["prompt"], "x", api.ExportFormat.NDJSON)) == b""
+    body = read_body(download_response(iter([df_empty]), ["prompt"], "x", api.ExportFormat.PARQUET))
+    assert list(pd.read_parquet(BytesIO(body)).columns) == ["prompt"]
@@ -1,6 +1,18 @@
+import dataclasses
+
+import numpy as np
 import pandas as pd
+import pytest
 
-from autoarena.service.elo import EloService, DEFAULT_ELO_CONFIG
+from autoarena.service.elo import (
+    EloService,
+    DEFAULT_ELO_CONFIG,
+    EloConfig,
+    HeadToHeadArrays,
+    RatingMethod,
+    RATING_METHOD_ENV,
+    get_rating_method,
+)
 
 DF_H2H = pd.DataFrame(
     [("a", "b", "A"), ("b", "a", "B"), ("a", "c", "-"), ("b", "c", "-")],
@@ -23,3 +35,107 @@ def test__elo_service__compute_elo() -> None:
     assert all(df_elo["q975"].notna())
     assert df_elo.iloc[0].q025 >= DEFAULT_ELO_CONFIG.default_score  # can't be lower, didn't lose any
     assert df_elo.iloc[-1].q975 <= DEFAULT_ELO_CONFIG.default_score  # can't be higher, didn't win any
+
+
+def test__elo_service__compute_elo__matches_sequential_bootstrap() -> None:
+    rng = np.random.default_rng(0)
+    models = np.array(["a", "b", "c", "d"])
+    index_a = rng.integers(0, len(models), 500)
+    index_b = (index_a + rng.integers(1, len(models), 500)) % len(models)
+    # stronger models have higher indices; ties are thrown in at random
+    winner = np.where(rng.random(500) < 0.2, "-", np.where(index_a > index_b, "A", "B"))
+    df_h2h = pd.DataFrame(dict(model_a=models[index_a], model_b=models[index_b], winner=winner))
+
+    df_elo = EloService.compute_elo(df_h2h).set_index("model")
+    df_reference = pd.DataFrame(
+        [
+            EloService._compute_elo_once(df_h2h.sample(frac=1.0, replace=True)).set_index("model")["elo"]
+            for _ in range(DEFAULT_ELO_CONFIG.n_bootstrap_rounds)
+        ]
+    )
+
+    assert list(df_elo.index) == ["d", "c", "b", "a"]
+    for model in models:
+        assert abs(df_elo.loc[model].elo - df_reference[model].quantile(0.5)) < 10
+        assert abs(df_elo.loc[model].q025 - df_reference[model].quantile(0.025)) < 15
+        assert abs(df_elo.loc[model].q975 - df_reference[model].quantile(0.975)) < 15
+
+
+def test__elo_service__compute_elo__parallel() -> None:
+    df_h2h = pd.concat([DF_H2H] * 10)
+    config = EloConfig(n_bootstrap_rounds=20, seed=42, min_head_to_heads_per_worker=1)
+    df_elo_serial = EloService.compute_elo(df_h2h, config=dataclasses.replace(config, n_workers=1))
+    df_elo_parallel = EloService.compute_elo(df_h2h, config=dataclasses.replace(config, n_workers=2))
+    pd.testing.assert_frame_equal(df_elo_serial, df_elo_parallel)  # per-round seeds don't depend on worker count
+
+
+@pytest.mark.parametrize("method", list(RatingMethod))
+def test__elo_service__compute_elo_from_arrays(method: RatingMethod) -> None:
+    model_ids = dict(a=11, b=22, c=33)
+    h2h = HeadToHeadArrays(
+        head_to_head_id=np.arange(len(DF_H2H)),
+        model_a_id=DF_H2H["model_a"].map(model_ids).to_numpy(),
+        model_b_id=DF_H2H["model_b"].map(model_ids).to_numpy(),
+        judge_id=np.ones(len(DF_H2H), dtype=np.int64),
+        winner=DF_H2H["winner"].map({"A": 1, "B": -1, "-": 0}).to_numpy(dtype=np.int8),
+        model_names={model_id: name for name, model_id in model_ids.items()},
+        judge_names={1: "judge"},
+    )
+    config = EloConfig(method=method, n_bootstrap_rounds=50, seed=0)
+    df_elo = EloService.compute_elo_from_arrays(h2h, config=config)
+    df_elo_expected = EloService.compute_elo(DF_H2H, config=config)
+    assert list(df_elo.model) == list(df_elo_expected.model)
+    assert list(df_elo.model_id) == [model_ids[model] for model in df_elo.model]
+    cols = ["elo", "q025", "q975"]
+    assert np.allclose(df_elo[cols].to_numpy(dtype=float), df_elo_expected[cols].to_numpy(dtype=float))
+
+
+def test__elo_service__compute_elo__bradley_terry() -> None:
+    config = EloConfig(method=RatingMethod.BRADLEY_TERRY)
+    df_elo = EloService.compute_elo(DF_H2H, config=config)
+    assert list(df_elo.model) == ["a", "c", "b"]
+    assert df_elo.elo.mean() == pytest.approx(config.default_score)  # ratings are anchored around the default
+    assert all(df_elo["elo"] > df_elo["q025"])
+    assert all(df_elo["elo"] < df_elo["q975"])
+
+    # fit on aggregate counts, so the order of the head-to-heads doesn't matter
+    df_elo_shuffled = EloService.compute_elo(DF_H2H.sample(frac=1.0), config=config)
+    pd.testing.assert_frame_equal(df_elo.reset_index(drop=True), df_elo_shuffled.reset_index(drop=True))
+
+
+def test__elo_service__compute_elo__bradley_terry_bootstrap() -> None:
+    config = EloConfig(method=RatingMethod.BRADLEY_TERRY_BOOTSTRAP, seed=0)
+    df_elo = EloService.compute_elo(pd.concat([DF_H2H] * 25), config=config)
+    config_hessian = EloConfig(method=RatingMethod.BRADLEY_TERRY)
+    df_elo_hessian = EloService.compute_elo(pd.concat([DF_H2H] * 25), config=config_hessian)
+    assert list(df_elo.model) == ["a", "c", "b"]
+    assert np.allclose(df_elo.elo, df_elo_hessian.elo)  # same point estimate, only intervals are bootstrapped
+    assert all(df_elo["elo"] > df_elo["q025"])
+    assert all(df_elo["elo"] < df_elo["q975"])
+    pd.testing.assert_frame_equal(df_elo, EloService.compute_elo(pd.concat([DF_H2H] * 25), config=config))
+
+
+@pytest.mark.parametrize("method", list(RatingMethod))
+def test__get_rating_method(method: RatingMethod, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(RATING_METHOD_ENV, method.value)
+    assert get_rating_method() is method
+
+
+def test__get_rating_method__default(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(RATING_METHOD_ENV, raising=False)
+    assert get_rating_method() is RatingMethod.ELO
+
+
+def test__elo_service__compute_elo__rating_method_from_environment(monkeypatch: pytest.MonkeyPatch) -> None:
+    df_h2h = pd.concat([DF_H2H] * 25)
+    monkeypatch.setenv(RATING_METHOD_ENV, RatingMethod.BRADLEY_TERRY.value)
+    assert DEFAULT_ELO_CONFIG.method is None  # read when scores are computed rather than when imported
+    df_elo = EloService.compute_elo(df_h2h)
+    df_elo_explicit = EloService.compute_elo(df_h2h, config=EloConfig(method=RatingMethod.BRADLEY_TERRY))
+    assert df_elo.equals(df_elo_explicit)
+
+
+def test__get_rating_method__unrecognized(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(RATING_METHOD_ENV, "does-not-exist")
+    with pytest.raises(ValueError):
+        get_rating_method()
@@ -0,0 +1,39 @@
+import pandas as pd
+
+from autoarena.store.compression import (
+    compress_text,
+    compress_text_if_smaller,
+    decompress_text,
+    decompress_texts,
+    train_dictionary,
+)
+
+TEXTS = [
+    f"Sure! Here is a step-by-step explanation of problem {i}. First, we consider the inputs. Then, we compute {i} * 2."
+    for i in range(100)
+]
+
+
+def test__compress_text__round_trip() -> None:
+    dictionary = train_dictionary(TEXTS)
+    dictionaries = {7: dictionary}
+    for text in [*TEXTS[:3], "", "unicode: ✓ ünïcödé"]:
+        assert decompress_text(compress_text(text), dictionaries) == text
+        assert decompress_text(compress_text(text, 7, dictionary), dictionaries) == text
+    values = pd.Series([compress_text("a"), "b", compress_text("c", 7, dictionary)])
+    assert decompress_texts(values, dictionaries).tolist() == ["a", "b", "c"]
+
+
+def test__compress_text_if_smaller() -> None:
+    assert compress_text_if_smaller("a") == "a"
+    assert compress_text_if_smaller("") == ""
+    assert compress_text_if_smaller(TEXTS[0] * 3) == compress_text(TEXTS[0] * 3)
+
+
+def test__train_dictionary() -> None:
+    dictionary = train_dictionary(TEXTS, size=1_024)
+    assert 0 < len(dictionary) <= 1_024
+    n_bytes_without = sum(len(compress_text(text)) for text in TEXTS)
+    n_bytes_with = sum(len(compress_text(text, 1, dictionary)) for text in TEXTS)
+    assert n_bytes_with < 0.5 * n_bytes_without
+    assert train_dictionary(["no repeats here"]) == b""
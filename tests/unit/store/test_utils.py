@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from autoarena.store.utils import decode_winners, encode_winners, ordered_pairs
+
+
+def test__ordered_pairs() -> None:
+    a = pd.Series([1, 20, 3, 4])
+    b = pd.Series([10, 2, 3, 40.0])  # floats, as can be parsed from uploaded CSVs
+    low, high = ordered_pairs(a, b)
+    assert list(low) == [1, 2, 3, 4]
+    assert list(high) == [10, 20, 3, 40]
+
+
+def test__encode_winners() -> None:
+    assert list(encode_winners(pd.Series(["A", "B", "-", "A"]))) == [1, -1, 0, 1]
+    with pytest.raises(ValueError):
+        encode_winners(pd.Series(["A", "tie"]))
+
+
+def test__decode_winners() -> None:
+    winners = pd.Series(["A", "B", "-", "A"])
+    assert list(decode_winners(encode_winners(winners))) == list(winners)
+    assert list(decode_winners(-encode_winners(winners))) == ["B", "A", "-", "B"]
@@ -80,16 +80,17 @@ export function AddModelButton({ variant, size }: Props) {
             label="Model Responses File"
             description={
               <Text inherit>
-                One or more <Code>.csv</Code> files containing <Code>prompt</Code> and <Code>response</Code> columns
+                One or more <Code>.csv</Code> or <Code>.parquet</Code> files containing <Code>prompt</Code> and{' '}
+                <Code>response</Code> columns
               </Text>
             }
             placeholder="Select file with model responses..."
-            accept="text/csv"
+            accept="text/csv,.parquet"
             value={files}
             multiple
             onChange={(f: File[]) => {
               setFiles(f);
-              setNames(f.map(file => file.name.slice(0, -4)));
+              setNames(f.map(file => file.name.replace(/\.(csv|parquet)$/, '')));
             }}
           />
           <Transition mounted={files.length > 0} transition="slide-right" duration={200} timingFunction="ease">
@@ -1,5 +1,5 @@
 import moment from 'moment/moment';
-import { IconBooks, IconCalculator, IconGavel } from '@tabler/icons-react';
+import { IconBooks, IconCalculator, IconDatabaseCog, IconGavel } from '@tabler/icons-react';
 import { Accordion, Badge, Button, Code, Group, Progress, Stack, Text } from '@mantine/core';
 import { useMemo, useState } from 'react';
 import { Task, useTaskStream, useUrlState } from '../../hooks';
@@ -25,19 +25,25 @@ export function TaskAccordionItem({ task: inputTask }: Props) {
       ? IconCalculator
       : task.task_type === 'auto-judge'
         ? IconGavel
-        : IconBooks;
+        : task.task_type === 'maintenance'
+          ? IconDatabaseCog
+          : IconBooks;
   const taskTitle =
     task.task_type === 'recompute-leaderboard'
       ? 'Recompute Leaderboard Rankings'
       : task.task_type === 'auto-judge'
         ? 'Automated Head-to-Head Judging'
-        : 'Custom Judge Fine-Tuning';
+        : task.task_type === 'maintenance'
+          ? 'Database Maintenance'
+          : 'Custom Judge Fine-Tuning';
   const iconColor =
     task.task_type === 'recompute-leaderboard'
       ? 'var(--mantine-color-blue-6)'
       : task.task_type === 'auto-judge'
         ? 'var(--mantine-color-orange-6)'
-        : 'var(--mantine-color-green-6)';
+        : task.task_type === 'maintenance'
+          ? 'var(--mantine-color-gray-6)'
+          : 'var(--mantine-color-green-6)';
 
   const [startLogs, endLogs]: [string[], string[]] = useMemo(() => {
     const logLines = task.logs.split('\n');
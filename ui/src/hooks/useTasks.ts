@@ -4,7 +4,7 @@ import { useAppRoutes } from './useAppRoutes.ts';
 
 export type Task = {
   id: number;
-  task_type: 'auto-judge' | 'recompute-leaderboard' | 'fine-tune';
+  task_type: 'auto-judge' | 'recompute-leaderboard' | 'fine-tune' | 'maintenance';
   created: string;
   progress: number;
   status: 'started' | 'in-progress' | 'completed' | 'failed';